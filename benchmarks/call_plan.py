@@ -0,0 +1,41 @@
+"""
+Compares binding a job's arguments by introspecting its signature on every call
+(`convert_kwargs`) against applying a `CallPlan` compiled once ahead of time.
+
+    python -m benchmarks.call_plan
+"""
+
+from timeit import repeat
+
+from just_jobs import Context
+from just_jobs.utils import CallPlan, convert_kwargs
+
+NUMBER = 100_000
+
+
+def target(ctx: Context, a: int, b: str, c: float = 0.0, *, d: bool = False) -> None:
+    pass
+
+
+def main() -> None:
+    args, kwargs, ctx = (1, "b"), {"c": 2.0}, {"job_id": "abc"}
+    plan = CallPlan.compile(target)
+
+    timings = {
+        "convert_kwargs": lambda: convert_kwargs(ctx, target, args, kwargs),
+        "CallPlan.bind": lambda: plan.bind(ctx, args, kwargs),
+    }
+    results = {
+        name: min(repeat(stmt, number=NUMBER, repeat=5)) / NUMBER * 1e9
+        for name, stmt in timings.items()
+    }
+
+    for name, ns in results.items():
+        print(f"{name:>16}: {ns:8.0f} ns/call")
+    print(
+        f"{'speedup':>16}: {results['convert_kwargs'] / results['CallPlan.bind']:8.1f}x"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""
+Compares the enqueue (serialize and sign) and decode (verify and deserialize)
+throughput of each built-in codec for typical job payloads.
+
+    python -m benchmarks.codecs
+"""
+
+from time import perf_counter
+from typing import Any, Dict
+
+from just_jobs import BaseSettings
+
+DURATION = 0.5
+CODECS = ["dill", "pickle", "pickle-dill", "msgpack"]
+
+
+def _job(*args: Any, **kwargs: Any) -> Dict[str, Any]:
+    # the shape of the job definitions arq serializes
+    return {"t": 1, "f": "task", "a": args, "k": kwargs, "et": 1690000000000}
+
+
+PAYLOADS = {
+    "scalars": _job(42, "user@example.com", retry=True),
+    "records": _job(
+        [{"id": i, "name": f"row {i}", "score": i * 0.5} for i in range(100)]
+    ),
+    "blob": _job(b"x" * (1 << 20)),
+}
+
+
+def _rate(func: Any, arg: Any) -> float:
+    calls, start = 0, perf_counter()
+    while perf_counter() - start < DURATION:
+        func(arg)
+        calls += 1
+    return calls / (perf_counter() - start)
+
+
+def main() -> None:
+    print(
+        f"{'payload':>8} {'codec':>12} {'enqueue/s':>12} {'decode/s':>12} {'bytes':>9}"
+    )
+    for payload, job in PAYLOADS.items():
+        for codec in CODECS:
+            try:
+                Settings = BaseSettings("Settings", (), {"job_codec": codec})
+                packed = Settings.job_serializer(job)
+            except ImportError:
+                print(f"{payload:>8} {codec:>12} {'(not installed)':>26}")
+                continue
+
+            enqueue = _rate(Settings.job_serializer, job)
+            decode = _rate(Settings.job_deserializer, packed)
+            print(
+                f"{payload:>8} {codec:>12} {enqueue:12.0f} {decode:12.0f}"
+                f" {len(packed):9d}"
+            )
+
+
+if __name__ == "__main__":
+    main()
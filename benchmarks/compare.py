@@ -0,0 +1,72 @@
+"""
+Compares two runs of `benchmarks.suite`, printing the change of every measurement
+between them. Exits with an error if any got worse by more than the threshold.
+
+    python -m benchmarks.compare baseline.json results.json --threshold 10
+"""
+
+import argparse
+import json
+import sys
+from typing import Dict, List, Optional, Tuple
+
+
+def load(path: str) -> Dict[str, Dict[str, float]]:
+    with open(path) as f:
+        report = json.load(f)
+
+    return {
+        result["name"]: {k: v for k, v in result.items() if k != "name"}
+        for result in report["results"]
+    }
+
+
+def change(metric: str, before: float, after: float) -> float:
+    """The improvement, in percent, from before to after. Times are better lower."""
+    if not before:
+        return 0.0
+
+    delta = (after - before) / before * 100
+    return -delta if metric.endswith("_ms") else delta
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.compare")
+    parser.add_argument("baseline")
+    parser.add_argument("results")
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=10.0,
+        help="the percentage by which a measurement may get worse",
+    )
+    options = parser.parse_args(argv)
+
+    baseline, results = load(options.baseline), load(options.results)
+    regressions: List[Tuple[str, str]] = []
+    print(f"{'benchmark':>24} {'metric':>22} {'baseline':>10} {'results':>10} {'':>8}")
+    for name, metrics in results.items():
+        for metric, after in metrics.items():
+            before = baseline.get(name, {}).get(metric)
+            if before is None:
+                continue
+
+            improvement = change(metric, before, after)
+            flag = ""
+            if improvement < -options.threshold:
+                regressions.append((name, metric))
+                flag = " !"
+            print(
+                f"{name:>24} {metric:>22} {before:10.2f} {after:10.2f}"
+                f" {improvement:+7.1f}%{flag}"
+            )
+
+    if regressions:
+        sys.exit(
+            f"{len(regressions)} measurements regressed by over"
+            f" {options.threshold}%."
+        )
+
+
+if __name__ == "__main__":
+    main()
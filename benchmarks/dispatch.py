@@ -0,0 +1,80 @@
+"""
+Measures the per-job cost of dispatching synchronous jobs to their executors,
+comparing the dill round-trip every job used to take against the current path,
+for small and multi-megabyte arguments.
+
+    python -m benchmarks.dispatch
+"""
+
+import asyncio
+from contextlib import redirect_stdout
+from functools import partial
+from io import StringIO
+from time import perf_counter
+from typing import Any, Awaitable, Callable, Dict
+
+import dill  # type: ignore
+
+from just_jobs import BaseSettings, Context, JobType, job
+from just_jobs.jobs import _job
+
+ROUNDS = {JobType.IO_BOUND: 200, JobType.CPU_BOUND: 50}
+PAYLOADS = {"64B": b"x" * 64, "8MB": b"x" * (8 << 20)}
+
+
+class Settings(metaclass=BaseSettings):
+    pass
+
+
+def _length(payload: bytes) -> int:
+    return len(payload)
+
+
+io_length = job(job_type=JobType.IO_BOUND, name="io_length")(_length)
+cpu_length = job(job_type=JobType.CPU_BOUND, name="cpu_length")(_length)
+
+
+async def _dill_roundtrip(func: _job[Any], ctx: Context, payload: bytes) -> Any:
+    # the dispatch path every synchronous job took before
+    executor = ctx["_executors"][func.job_type]
+    serialized = dill.dumps(partial(func.func, payload))
+    return await asyncio.get_running_loop().run_in_executor(
+        executor, _job._dill_executor_func, serialized
+    )
+
+
+async def _time(dispatch: Callable[[], Awaitable[Any]], rounds: int) -> float:
+    await dispatch()  # warm up the executor
+    start = perf_counter()
+    for _ in range(rounds):
+        await dispatch()
+    return (perf_counter() - start) / rounds * 1e6
+
+
+async def main() -> None:
+    ctx: Dict[Any, Any] = {}
+
+    with redirect_stdout(StringIO()):
+        await Settings.on_startup(ctx)
+
+    try:
+        for func in (io_length, cpu_length):
+            rounds = ROUNDS[func.job_type]  # type: ignore[index]
+            for size, payload in PAYLOADS.items():
+                with redirect_stdout(StringIO()):
+                    before = await _time(
+                        lambda: _dill_roundtrip(func, ctx, payload), rounds
+                    )
+                    after = await _time(lambda: func.run(ctx, payload), rounds)
+
+                print(
+                    f"{func.name:>10} {size:>4}: dill round-trip {before:9.0f} us/job,"
+                    f" current {after:9.0f} us/job ({before / after:5.1f}x)"
+                )
+    finally:
+        with redirect_stdout(StringIO()):
+            await Settings.on_shutdown(ctx)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
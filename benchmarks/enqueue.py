@@ -0,0 +1,64 @@
+"""
+Compares enqueueing a fan-out of jobs one `enqueue_job` at a time against enqueueing
+them with `Broker.enqueue_jobs`. Requires a Redis server, at `REDIS_HOST` or
+localhost.
+
+    python -m benchmarks.enqueue
+"""
+
+import asyncio
+import os
+from time import perf_counter
+
+from arq.connections import ArqRedis, RedisSettings
+from arq.constants import job_key_prefix
+
+from just_jobs import BaseSettings
+from just_jobs.broker import JobRequest
+
+JOBS = (1000, 10_000, 50_000)
+QUEUE = "benchmarks:enqueue"
+
+
+async def main() -> None:
+    Settings = BaseSettings(
+        "Settings",
+        (),
+        {"redis_settings": RedisSettings(host=os.getenv("REDIS_HOST", "localhost"))},
+    )
+
+    print(f"{'jobs':>8} {'loop (s)':>10} {'bulk (s)':>10} {'offloaded (s)':>14}")
+    broker = Settings.create_pool()
+    async with broker as pool:
+        for jobs in JOBS:
+            start = perf_counter()
+            for i in range(jobs):
+                await pool.enqueue_job("task", i, _queue_name=QUEUE)
+            loop = perf_counter() - start
+            await clear(pool)
+
+            timings = []
+            for offload in (False, True):
+                start = perf_counter()
+                await broker.enqueue_jobs(
+                    (JobRequest("task", (i,)) for i in range(jobs)),
+                    queue_name=QUEUE,
+                    offload=offload,
+                )
+                timings.append(perf_counter() - start)
+                await clear(pool)
+
+            print(f"{jobs:>8} {loop:10.2f} {timings[0]:10.2f} {timings[1]:14.2f}")
+
+
+async def clear(pool: ArqRedis) -> None:
+    job_ids = await pool.zrange(QUEUE, 0, -1)
+    for start in range(0, len(job_ids), 1000):
+        keys = [job_key_prefix + job_id.decode() for job_id in job_ids[start:][:1000]]
+        await pool.delete(*keys)
+
+    await pool.delete(QUEUE)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
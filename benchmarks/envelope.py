@@ -0,0 +1,52 @@
+"""
+Compares the per-job overhead and unwrap (verify and slice) throughput of the binary
+envelope header against the hex digest prefix it replaced.
+
+    python -m benchmarks.envelope
+"""
+
+from hashlib import blake2b
+from time import perf_counter
+from typing import Any, Callable
+
+from just_jobs.envelope import seal, unseal
+
+DURATION = 0.2
+ROUNDS = 5
+KEY = b"benchmark"
+SIZES = {"64B": 64, "64KiB": 64 << 10, "8MiB": 8 << 20}
+
+
+def _seal_legacy(payload: bytes) -> bytes:
+    signer = blake2b(key=KEY)
+    signer.update(b"dill|")
+    signer.update(payload)
+    return signer.hexdigest().encode("utf-8") + b":dill|" + payload
+
+
+def _rate(func: Callable[[bytes], Any], packed: bytes) -> float:
+    # the best of several rounds, which is the least disturbed by other work
+    rates = []
+    for _ in range(ROUNDS):
+        calls, start = 0, perf_counter()
+        while perf_counter() - start < DURATION:
+            func(packed)
+            calls += 1
+        rates.append(calls / (perf_counter() - start))
+    return max(rates)
+
+
+def main() -> None:
+    print(f"{'payload':>8} {'format':>8} {'overhead':>9} {'unwrap/s':>12}")
+    for name, size in SIZES.items():
+        payload = b"x" * size
+        for format, packed in (
+            ("hex", _seal_legacy(payload)),
+            ("binary", seal(payload, "dill", None, KEY)),
+        ):
+            rate = _rate(lambda p: unseal(p, KEY), packed)
+            print(f"{name:>8} {format:>8} {len(packed) - size:9d} {rate:12.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+"""
+Compares reading the function name, try count and enqueue time of queued jobs by fully
+deserializing them, as `ArqRedis.queued_jobs` does, against reading only their headers.
+
+    python -m benchmarks.inspection
+"""
+
+from time import perf_counter
+
+from arq.jobs import deserialize_job
+
+from just_jobs import BaseSettings
+
+JOBS = 1000
+SIZES = {"64B": 64, "64KiB": 64 << 10, "1MiB": 1 << 20}
+
+
+def main() -> None:
+    Settings = BaseSettings("Settings", (), {})
+
+    print(f"{'args':>8} {'full (ms)':>10} {'header (ms)':>12}")
+    for name, size in SIZES.items():
+        packed = [
+            Settings.job_serializer(
+                {"t": 1, "f": "task", "a": (b"x" * size,), "k": {}, "et": i}
+            )
+            for i in range(JOBS)
+        ]
+
+        start = perf_counter()
+        for value in packed:
+            deserialize_job(value, deserializer=Settings.job_deserializer).function
+        full = perf_counter() - start
+
+        start = perf_counter()
+        for value in packed:
+            Settings.job_header(value).function
+        header = perf_counter() - start
+
+        print(f"{name:>8} {full * 1000:10.1f} {header * 1000:12.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""
+Measures the per-job cost of the styled output every job used to write around its
+execution, two flushed writes to stdout, against the current path, which writes
+nothing. Output is sent to the null device so only the syscalls are measured.
+
+    python -m benchmarks.output
+"""
+
+import asyncio
+import os
+from contextlib import redirect_stdout
+from time import perf_counter
+from typing import Any, Awaitable, Callable, Dict
+
+from colorama import Fore, Style
+
+from just_jobs import BaseSettings, job
+from just_jobs.utils import styled_text
+
+ROUNDS = 100_000
+
+
+class Settings(metaclass=BaseSettings):
+    pass
+
+
+@job(name="noop")
+async def noop() -> None:
+    pass
+
+
+async def _styled(ctx: Dict[Any, Any]) -> None:
+    # the output every job used to write
+    with styled_text(Fore.BLACK, Style.BRIGHT):
+        await noop.run(ctx)
+
+
+async def _time(run: Callable[[Dict[Any, Any]], Awaitable[Any]], ctx: Any) -> float:
+    start = perf_counter()
+    for _ in range(ROUNDS):
+        await run(ctx)
+    return (perf_counter() - start) / ROUNDS * 1e9
+
+
+async def main() -> None:
+    ctx: Dict[Any, Any] = {}
+    await Settings.on_startup(ctx)
+
+    try:
+        with open(os.devnull, "w") as devnull, redirect_stdout(devnull):
+            styled = await _time(_styled, ctx)
+            current = await _time(noop.run, ctx)
+    finally:
+        await Settings.on_shutdown(ctx)
+
+    print(f"{'styled':>8}: {styled:8.0f} ns/job")
+    print(f"{'current':>8}: {current:8.0f} ns/job")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,64 @@
+"""
+Measures the latency of the first CPU-bound job after a worker starts, with and
+without warming up the process pool, and the per-job cost of sending jobs to the pool
+by value and, once preloaded, by name.
+
+    python -m benchmarks.preload
+"""
+
+import asyncio
+from time import perf_counter
+from typing import Any, Dict, List
+
+from just_jobs import BaseSettings, JobType, job
+from just_jobs.jobs import _job
+
+ROUNDS = 200
+
+
+@job(job_type=JobType.CPU_BOUND, name="checksum")
+def checksum(payload: bytes) -> int:
+    return sum(payload[:64])
+
+
+async def _measure(functions: List[_job[Any]], warmup: bool) -> Dict[str, float]:
+    Settings = BaseSettings(
+        "Settings", (), {"functions": functions, "process_warmup": warmup}
+    )
+    ctx: Dict[Any, Any] = {}
+
+    start = perf_counter()
+    await Settings.on_startup(ctx)
+    startup = perf_counter() - start
+
+    try:
+        start = perf_counter()
+        await checksum.run(ctx, b"x" * 64)
+        first = perf_counter() - start
+
+        start = perf_counter()
+        for _ in range(ROUNDS):
+            await checksum.run(ctx, b"x" * 64)
+        steady = (perf_counter() - start) / ROUNDS
+    finally:
+        await Settings.on_shutdown(ctx)
+
+    return {"startup": startup * 1e3, "first": first * 1e3, "steady": steady * 1e6}
+
+
+async def main() -> None:
+    print(f"{'':>16} {'startup (ms)':>13} {'first job (ms)':>15} {'us/job':>8}")
+    for label, functions, warmup in (
+        ("cold, by value", [], False),
+        ("cold, by name", [checksum], False),
+        ("warm, by name", [checksum], True),
+    ):
+        times = await _measure(functions, warmup)
+        print(
+            f"{label:>16} {times['startup']:13.1f} {times['first']:15.1f}"
+            f" {times['steady']:8.0f}"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,492 @@
+"""
+A stand-in for Redis, serving the commands arq and just-jobs use from memory over the
+Redis protocol, so the benchmarks can run where no Redis server is available. It runs
+on its own event loop in a background thread.
+
+It isn't a faithful Redis: there's no persistence, no Lua, and only the options of
+each command that arq sends are understood. Since it shares the benchmarks' process,
+its timings are comparable between commits but not to those of a real Redis.
+
+    with StandinRedis() as server:
+        RedisSettings(host=server.host, port=server.port)
+"""
+
+import asyncio
+import threading
+from bisect import bisect_left, bisect_right, insort
+from fnmatch import fnmatchcase
+from itertools import count
+from time import monotonic
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple, Union
+
+Reply = Union[None, int, bytes, "Status", "Error", List[Any]]
+
+
+class Status(str):
+    """A simple string reply, like `OK`."""
+
+
+class Error(str):
+    """An error reply."""
+
+
+class SortedSet:
+    """The members of a sorted set, in order of their scores and then themselves."""
+
+    def __init__(self) -> None:
+        self.scores: Dict[bytes, float] = {}
+        self.items: List[Tuple[float, bytes]] = []
+
+    def add(self, member: bytes, score: float) -> bool:
+        added = member not in self.scores
+        if not added:
+            self.remove(member)
+
+        self.scores[member] = score
+        insort(self.items, (score, member))
+        return added
+
+    def remove(self, member: bytes) -> bool:
+        score = self.scores.pop(member, None)
+        if score is None:
+            return False
+
+        del self.items[bisect_left(self.items, (score, member))]
+        return True
+
+    def range_by_score(
+        self, low: Tuple[float, bool], high: Tuple[float, bool]
+    ) -> List[Tuple[float, bytes]]:
+        """The items between the bounds, each of which is a score and if it's open."""
+        (min_score, min_open), (max_score, max_open) = low, high
+        start = (
+            bisect_right(self.items, (min_score, b"\xff" * 64))
+            if min_open
+            else bisect_left(self.items, (min_score, b""))
+        )
+        stop = (
+            bisect_left(self.items, (max_score, b""))
+            if max_open
+            else bisect_right(self.items, (max_score, b"\xff" * 64))
+        )
+        return self.items[start:stop]
+
+
+class _Connection:
+    """The state of a single client's connection."""
+
+    def __init__(self) -> None:
+        self.watched: Dict[bytes, int] = {}
+        self.queued: Optional[List[List[bytes]]] = None
+
+
+class StandinRedis:
+    """
+    Serves an in-memory keyspace on `host` and an unused port, from when it's started
+    until it's stopped.
+    """
+
+    def __init__(self, host: str = "127.0.0.1") -> None:
+        self.host = host
+        self.port = 0
+        self.data: Dict[bytes, Any] = {}
+        self._expires: Dict[bytes, float] = {}
+        self._versions: Dict[bytes, int] = {}
+        """The last write to each key, to tell if a watched key was modified."""
+        self._writes = count(1)
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._commands: Dict[bytes, Callable[..., Reply]] = {
+            name[4:].encode().upper(): getattr(self, name)
+            for name in dir(self)
+            if name.startswith("cmd_")
+        }
+
+    def __enter__(self) -> "StandinRedis":
+        self.start()
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.stop()
+
+    def start(self) -> None:
+        """Starts serving in a background thread, once it's listening."""
+        started = threading.Event()
+
+        def serve() -> None:
+            self._loop = asyncio.new_event_loop()
+            server = self._loop.run_until_complete(
+                asyncio.start_server(self._serve, self.host, 0)
+            )
+            self.port = server.sockets[0].getsockname()[1]
+            started.set()
+            try:
+                self._loop.run_forever()
+            finally:
+                server.close()
+                self._loop.run_until_complete(server.wait_closed())
+                self._loop.close()
+
+        self._thread = threading.Thread(target=serve, name="standin-redis", daemon=True)
+        self._thread.start()
+        started.wait()
+
+    def stop(self) -> None:
+        """Stops serving, and waits for the thread to finish."""
+        if self._loop and self._thread:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join()
+            self._loop = self._thread = None
+
+    async def _serve(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ) -> None:
+        conn = _Connection()
+        try:
+            while True:
+                command = await _read_command(reader)
+                if command is None:
+                    break
+
+                writer.write(_encode(self.execute(conn, command)))
+                # pipelines send many commands at once, so only flush once they're read
+                if not reader._buffer:  # type: ignore[attr-defined]
+                    await writer.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    def execute(self, conn: _Connection, command: List[bytes]) -> Reply:
+        """Executes one command of the connection, or queues it in a transaction."""
+        name = command[0].upper()
+        if name == b"MULTI":
+            conn.queued = []
+            return Status("OK")
+        elif name == b"DISCARD":
+            conn.queued, conn.watched = None, {}
+            return Status("OK")
+        elif name == b"EXEC":
+            return self._exec(conn)
+        elif name == b"WATCH":
+            for key in command[1:]:
+                conn.watched[key] = self._version(key)
+            return Status("OK")
+        elif name == b"UNWATCH":
+            conn.watched = {}
+            return Status("OK")
+
+        if name not in self._commands:
+            return Error(f"ERR unknown command '{name.decode()}'")
+        elif conn.queued is not None:
+            conn.queued.append(command)
+            return Status("QUEUED")
+
+        try:
+            return self._commands[name](*command[1:])
+        except (TypeError, ValueError, IndexError):
+            return Error(f"ERR syntax error in '{name.decode()}'")
+
+    def _exec(self, conn: _Connection) -> Reply:
+        queued, conn.queued = conn.queued, None
+        watched, conn.watched = conn.watched, {}
+        if queued is None:
+            return Error("ERR EXEC without MULTI")
+        elif any(self._version(key) != v for key, v in watched.items()):
+            return None
+
+        return [self.execute(conn, command) for command in queued]
+
+    # keyspace
+
+    def _version(self, key: bytes) -> int:
+        self._get(key)
+        return self._versions.get(key, 0)
+
+    def _touch(self, key: bytes) -> None:
+        self._versions[key] = next(self._writes)
+
+    def _get(self, key: bytes) -> Any:
+        expires = self._expires.get(key)
+        if expires is not None and expires <= monotonic():
+            self._delete(key)
+
+        return self.data.get(key)
+
+    def _set(self, key: bytes, value: Any, ttl: Optional[float] = None) -> None:
+        self.data[key] = value
+        if ttl is None:
+            self._expires.pop(key, None)
+        else:
+            self._expires[key] = monotonic() + ttl
+
+        self._touch(key)
+
+    def _delete(self, key: bytes) -> bool:
+        self._expires.pop(key, None)
+        self._versions.pop(key, None)
+        return self.data.pop(key, None) is not None
+
+    def _zset(self, key: bytes, create: bool = False) -> Optional[SortedSet]:
+        zset: Optional[SortedSet] = self._get(key)
+        if zset is None and create:
+            zset = self.data[key] = SortedSet()
+        elif zset is not None and not isinstance(zset, SortedSet):
+            raise TypeError(key)
+
+        return zset
+
+    # connection and server
+
+    def cmd_ping(self, message: Optional[bytes] = None) -> Reply:
+        return Status("PONG") if message is None else message
+
+    def cmd_echo(self, message: bytes) -> Reply:
+        return message
+
+    def cmd_client(self, *args: bytes) -> Reply:
+        return Status("OK")
+
+    def cmd_select(self, db: bytes) -> Reply:
+        return Status("OK")
+
+    def cmd_info(self, *sections: bytes) -> Reply:
+        return (
+            b"redis_version:7.0.0-standin\r\nused_memory_human:0B\r\n"
+            b"connected_clients:1\r\n"
+        )
+
+    def cmd_dbsize(self) -> Reply:
+        return len(self.data)
+
+    def cmd_flushdb(self, *args: bytes) -> Reply:
+        for key in list(self.data):
+            self._delete(key)
+        return Status("OK")
+
+    def cmd_keys(self, pattern: bytes) -> Reply:
+        return [key for key in list(self.data) if fnmatchcase(key, pattern)]
+
+    # strings and keys
+
+    def cmd_get(self, key: bytes) -> Reply:
+        value = self._get(key)
+        return (
+            value if value is None or isinstance(value, bytes) else Error("WRONGTYPE")
+        )
+
+    def cmd_mget(self, *keys: bytes) -> Reply:
+        return [self.cmd_get(key) for key in keys]
+
+    def cmd_set(self, key: bytes, value: bytes, *options: bytes) -> Reply:
+        ttl, nx, xx, opts = None, False, False, [o.upper() for o in options]
+        for i, option in enumerate(opts):
+            if option == b"EX":
+                ttl = float(opts[i + 1])
+            elif option == b"PX":
+                ttl = float(opts[i + 1]) / 1000
+            nx, xx = nx or option == b"NX", xx or option == b"XX"
+
+        exists = self._get(key) is not None
+        if (nx and exists) or (xx and not exists):
+            return None
+
+        self._set(key, value, ttl)
+        return Status("OK")
+
+    def cmd_setex(self, key: bytes, seconds: bytes, value: bytes) -> Reply:
+        self._set(key, value, float(seconds))
+        return Status("OK")
+
+    def cmd_psetex(self, key: bytes, milliseconds: bytes, value: bytes) -> Reply:
+        self._set(key, value, float(milliseconds) / 1000)
+        return Status("OK")
+
+    def cmd_incr(self, key: bytes) -> Reply:
+        return self.cmd_incrby(key, b"1")
+
+    def cmd_incrby(self, key: bytes, increment: bytes) -> Reply:
+        value = int(self._get(key) or 0) + int(increment)
+        expires = self._expires.get(key)
+        self.data[key] = str(value).encode()
+        self._touch(key)
+        if expires is not None:
+            self._expires[key] = expires
+        return value
+
+    def cmd_del(self, *keys: bytes) -> Reply:
+        return sum(self._delete(key) for key in keys if self._get(key) is not None)
+
+    def cmd_exists(self, *keys: bytes) -> Reply:
+        return sum(self._get(key) is not None for key in keys)
+
+    def cmd_expire(self, key: bytes, seconds: bytes) -> Reply:
+        return self.cmd_pexpire(key, str(float(seconds) * 1000).encode())
+
+    def cmd_pexpire(self, key: bytes, milliseconds: bytes) -> Reply:
+        if self._get(key) is None:
+            return 0
+
+        self._expires[key] = monotonic() + float(milliseconds) / 1000
+        self._touch(key)
+        return 1
+
+    def cmd_pttl(self, key: bytes) -> Reply:
+        if self._get(key) is None:
+            return -2
+
+        expires = self._expires.get(key)
+        return -1 if expires is None else int((expires - monotonic()) * 1000)
+
+    def cmd_ttl(self, key: bytes) -> Reply:
+        pttl = self.cmd_pttl(key)
+        return pttl if pttl < 0 else pttl // 1000  # type: ignore[operator]
+
+    # sorted sets
+
+    def cmd_zadd(self, key: bytes, *args: bytes) -> Reply:
+        flags: Set[bytes] = set()
+        while args and args[0].upper() in (b"NX", b"XX", b"GT", b"LT", b"CH"):
+            flags.add(args[0].upper())
+            args = args[1:]
+
+        zset = self._zset(key, create=True)
+        assert zset is not None
+        added = 0
+        for score, member in zip(args[::2], args[1::2]):
+            exists = member in zset.scores
+            if (b"NX" in flags and exists) or (b"XX" in flags and not exists):
+                continue
+
+            added += zset.add(member, float(score))
+
+        self._touch(key)
+        return added
+
+    def cmd_zrem(self, key: bytes, *members: bytes) -> Reply:
+        zset = self._zset(key)
+        if zset is None:
+            return 0
+
+        removed = sum(zset.remove(member) for member in members)
+        self._cleanup(key, zset)
+        return removed
+
+    def cmd_zincrby(self, key: bytes, increment: bytes, member: bytes) -> Reply:
+        zset = self._zset(key, create=True)
+        assert zset is not None
+        score = zset.scores.get(member, 0.0) + float(increment)
+        zset.add(member, score)
+        self._touch(key)
+        return _format_score(score)
+
+    def cmd_zscore(self, key: bytes, member: bytes) -> Reply:
+        zset = self._zset(key)
+        score = zset.scores.get(member) if zset else None
+        return None if score is None else _format_score(score)
+
+    def cmd_zcard(self, key: bytes) -> Reply:
+        zset = self._zset(key)
+        return len(zset.scores) if zset else 0
+
+    def cmd_zcount(self, key: bytes, low: bytes, high: bytes) -> Reply:
+        zset = self._zset(key)
+        return len(zset.range_by_score(_bound(low), _bound(high))) if zset else 0
+
+    def cmd_zrange(
+        self, key: bytes, start: bytes, stop: bytes, *options: bytes
+    ) -> Reply:
+        zset = self._zset(key)
+        if zset is None:
+            return []
+
+        first, last = int(start), int(stop)
+        length = len(zset.items)
+        first = max(first + length if first < 0 else first, 0)
+        last = last + length if last < 0 else last
+        items = zset.items[first : last + 1]
+        return _members(items, b"WITHSCORES" in (o.upper() for o in options))
+
+    def cmd_zrangebyscore(
+        self, key: bytes, low: bytes, high: bytes, *options: bytes
+    ) -> Reply:
+        zset = self._zset(key)
+        if zset is None:
+            return []
+
+        items = zset.range_by_score(_bound(low), _bound(high))
+        opts = [o.upper() for o in options]
+        if b"LIMIT" in opts:
+            i = opts.index(b"LIMIT")
+            offset, count = int(opts[i + 1]), int(opts[i + 2])
+            items = items[offset:] if count < 0 else items[offset : offset + count]
+
+        return _members(items, b"WITHSCORES" in opts)
+
+    def cmd_zremrangebyscore(self, key: bytes, low: bytes, high: bytes) -> Reply:
+        zset = self._zset(key)
+        if zset is None:
+            return 0
+
+        items = zset.range_by_score(_bound(low), _bound(high))
+        for _, member in items:
+            zset.remove(member)
+
+        self._cleanup(key, zset)
+        return len(items)
+
+    def _cleanup(self, key: bytes, zset: SortedSet) -> None:
+        # like Redis, empty sorted sets don't exist
+        if not zset.scores:
+            self._delete(key)
+        else:
+            self._touch(key)
+
+
+async def _read_command(reader: asyncio.StreamReader) -> Optional[List[bytes]]:
+    line = await reader.readline()
+    if not line:
+        return None
+    elif not line.startswith(b"*"):
+        # an inline command, as typed into a terminal
+        return line.split()
+
+    command = []
+    for _ in range(int(line[1:])):
+        length = int((await reader.readline())[1:])
+        command.append((await reader.readexactly(length + 2))[:-2])
+
+    return command
+
+
+def _encode(reply: Reply) -> bytes:
+    if reply is None:
+        return b"$-1\r\n"
+    elif isinstance(reply, Error):
+        return b"-" + reply.encode() + b"\r\n"
+    elif isinstance(reply, Status):
+        return b"+" + reply.encode() + b"\r\n"
+    elif isinstance(reply, int):
+        return b":%d\r\n" % reply
+    elif isinstance(reply, bytes):
+        return b"$%d\r\n%s\r\n" % (len(reply), reply)
+
+    return b"*%d\r\n" % len(reply) + b"".join(_encode(item) for item in reply)
+
+
+def _bound(value: bytes) -> Tuple[float, bool]:
+    if value.startswith(b"("):
+        return float(value[1:]), True
+
+    return float(value), False
+
+
+def _format_score(score: float) -> bytes:
+    return repr(score).encode() if score % 1 else b"%d" % score
+
+
+def _members(items: List[Tuple[float, bytes]], scores: bool) -> List[Any]:
+    if not scores:
+        return [member for _, member in items]
+
+    return [x for score, member in items for x in (member, _format_score(score))]
@@ -0,0 +1,321 @@
+"""
+Measures the enqueue rate, end-to-end latency and throughput of async, IO-bound and
+CPU-bound jobs for a range of payload sizes, against a Redis server or, by default, the
+bundled in-process stand-in. Results are written as JSON, to be compared between
+commits with `benchmarks.compare`.
+
+- `enqueue`: jobs enqueued per second, one `enqueue_job` at a time and in bulk.
+- `latency`: the time from enqueueing a job to it finishing on a worker, with a fixed
+  number of jobs in flight.
+- `throughput`: jobs finished per second, from enqueueing a batch in bulk until the
+  last of it finishes.
+
+    python -m benchmarks.suite --output results.json
+    python -m benchmarks.suite --redis redis://localhost:6379 --output results.json
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import platform
+import subprocess
+import sys
+from contextlib import ExitStack
+from datetime import datetime, timezone
+from statistics import mean, median
+from time import perf_counter
+from typing import Any, Dict, List, Optional, Tuple
+from uuid import uuid4
+
+from arq import __version__ as arq_version
+from arq.connections import ArqRedis, RedisSettings
+from arq.constants import job_key_prefix
+from arq.worker import create_worker
+
+from just_jobs import BaseSettings, Context, JobType, job
+from just_jobs.broker import Broker, JobRequest
+from just_jobs.jobs import _job
+
+from .standin import StandinRedis
+
+QUEUE = "benchmarks:suite"
+PAYLOADS = {"64B": 64, "4KB": 4 << 10, "256KB": 256 << 10}
+
+
+@job(name="bench_async")
+async def async_length(payload: bytes) -> int:
+    return len(payload)
+
+
+@job(job_type=JobType.IO_BOUND, name="bench_io")
+def io_length(payload: bytes) -> int:
+    return len(payload)
+
+
+@job(job_type=JobType.CPU_BOUND, name="bench_cpu")
+def cpu_length(payload: bytes) -> int:
+    return len(payload)
+
+
+KINDS: Dict[str, _job[Any]] = {
+    "async": async_length,
+    "io": io_length,
+    "cpu": cpu_length,
+}
+
+
+class Session:
+    """A worker running the jobs of one kind, which reports when each finishes."""
+
+    def __init__(
+        self, Settings: Any, func: _job[Any], options: argparse.Namespace
+    ) -> None:
+        self.func = func
+        self.waiting: Dict[str, "asyncio.Future[float]"] = {}
+        self.worker = create_worker(
+            settings_cls=Settings,
+            functions=[func],
+            queue_name=QUEUE,
+            poll_delay=options.poll_delay,
+            max_jobs=options.max_jobs,
+            keep_result=0,
+            handle_signals=False,
+            after_job_end=self._finished,
+        )
+        self._task: Optional["asyncio.Future[None]"] = None
+
+    async def __aenter__(self) -> "Session":
+        self._task = asyncio.ensure_future(self.worker.async_run())
+        return self
+
+    async def __aexit__(self, *exc: Any) -> None:
+        await self.worker.close()
+        if self._task:
+            await asyncio.gather(self._task, return_exceptions=True)
+
+    def expect(self) -> Tuple[str, "asyncio.Future[float]"]:
+        """A new job ID, and a future of when its job finishes."""
+        job_id = uuid4().hex
+        future = self.waiting[job_id] = asyncio.get_running_loop().create_future()
+        return job_id, future
+
+    async def _finished(self, ctx: Context) -> None:
+        future = self.waiting.pop(ctx["job_id"], None)
+        if future is not None and not future.done():
+            future.set_result(perf_counter())
+
+
+async def enqueue_rate(
+    broker: Broker, pool: ArqRedis, payload: bytes, jobs: int
+) -> Dict[str, float]:
+    start = perf_counter()
+    for _ in range(jobs):
+        await pool.enqueue_job("bench_async", payload, _queue_name=QUEUE)
+    single = jobs / (perf_counter() - start)
+    await clear(pool)
+
+    start = perf_counter()
+    await broker.enqueue_jobs(
+        (JobRequest("bench_async", (payload,)) for _ in range(jobs)), queue_name=QUEUE
+    )
+    bulk = jobs / (perf_counter() - start)
+    await clear(pool)
+
+    return {"single_jobs_per_second": single, "bulk_jobs_per_second": bulk}
+
+
+async def latency(
+    session: Session, pool: ArqRedis, payload: bytes, jobs: int, concurrency: int
+) -> List[float]:
+    latencies: List[float] = []
+
+    async def producer(count: int) -> None:
+        for _ in range(count):
+            job_id, finished = session.expect()
+            sent = perf_counter()
+            await pool.enqueue_job(
+                session.func.name, payload, _job_id=job_id, _queue_name=QUEUE
+            )
+            latencies.append(await finished - sent)
+
+    share, extra = divmod(jobs, concurrency)
+    await asyncio.gather(*(producer(share + (i < extra)) for i in range(concurrency)))
+    return latencies
+
+
+async def throughput(
+    session: Session, broker: Broker, payload: bytes, jobs: int
+) -> float:
+    requests, futures = [], []
+    for _ in range(jobs):
+        job_id, finished = session.expect()
+        requests.append(JobRequest(session.func.name, (payload,), job_id=job_id))
+        futures.append(finished)
+
+    start = perf_counter()
+    await broker.enqueue_jobs(requests, queue_name=QUEUE)
+    await asyncio.gather(*futures)
+    return jobs / (perf_counter() - start)
+
+
+async def clear(pool: ArqRedis) -> None:
+    job_ids = await pool.zrange(QUEUE, 0, -1)
+    for start in range(0, len(job_ids), 1000):
+        keys = [job_key_prefix + job_id.decode() for job_id in job_ids[start:][:1000]]
+        await pool.delete(*keys)
+
+    await pool.delete(QUEUE)
+
+
+def percentiles(samples: List[float]) -> Dict[str, float]:
+    """The mean, nearest-rank percentiles and maximum of the samples, in ms."""
+    ordered = sorted(samples)
+    ranks = {
+        f"p{p}_ms": ordered[max(round(p / 100 * len(ordered)) - 1, 0)]
+        for p in (50, 90, 99)
+    }
+    return {
+        "mean_ms": mean(ordered) * 1000,
+        **{name: value * 1000 for name, value in ranks.items()},
+        "max_ms": ordered[-1] * 1000,
+    }
+
+
+async def run(
+    redis_settings: RedisSettings, options: argparse.Namespace
+) -> List[Dict[str, Any]]:
+    Settings = BaseSettings(
+        "Settings",
+        (),
+        {
+            "redis_settings": redis_settings,
+            "process_warmup": True,
+            "log_level": logging.WARNING,
+        },
+    )
+    payloads = {name: b"x" * PAYLOADS[name] for name in options.payloads}
+    results: List[Dict[str, Any]] = []
+
+    def record(name: str, **values: float) -> None:
+        results.append({"name": name, **values})
+        summary = ", ".join(f"{key} {value:.2f}" for key, value in values.items())
+        print(f"{name:>24}: {summary}", file=sys.stderr)
+
+    broker = Settings.create_pool()
+    async with broker as pool:
+        await clear(pool)
+        for size, payload in payloads.items():
+            rates = [
+                await enqueue_rate(broker, pool, payload, options.jobs)
+                for _ in range(options.repeat)
+            ]
+            record(
+                f"enqueue/{size}",
+                **{key: median(rate[key] for rate in rates) for key in rates[0]},
+            )
+
+        for kind in options.kinds:
+            async with Session(Settings, KINDS[kind], options) as session:
+                for size, payload in payloads.items():
+                    # warm up the executors and connections first
+                    await latency(
+                        session, pool, payload, options.concurrency, options.concurrency
+                    )
+
+                    samples: List[float] = []
+                    for _ in range(options.repeat):
+                        samples += await latency(
+                            session, pool, payload, options.jobs, options.concurrency
+                        )
+                    record(f"latency/{kind}/{size}", **percentiles(samples))
+
+                    throughputs = [
+                        await throughput(session, broker, payload, options.jobs)
+                        for _ in range(options.repeat)
+                    ]
+                    record(
+                        f"throughput/{kind}/{size}", jobs_per_second=median(throughputs)
+                    )
+
+    return results
+
+
+def metadata(options: argparse.Namespace) -> Dict[str, Any]:
+    try:
+        commit: Optional[str] = subprocess.run(
+            ["git", "rev-parse", "HEAD"],
+            capture_output=True,
+            check=True,
+            text=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+
+    return {
+        "commit": commit,
+        "date": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "arq": arq_version,
+        "redis": options.redis or "standin",
+        "jobs": options.jobs,
+        "repeat": options.repeat,
+        "concurrency": options.concurrency,
+        "max_jobs": options.max_jobs,
+        "poll_delay": options.poll_delay,
+    }
+
+
+def parse_args(argv: Optional[List[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.suite")
+    parser.add_argument(
+        "--redis",
+        metavar="DSN",
+        help="the Redis server to use, instead of the in-process stand-in",
+    )
+    parser.add_argument("--jobs", type=int, default=500, help="jobs per measurement")
+    parser.add_argument(
+        "--repeat", type=int, default=3, help="measurements per benchmark"
+    )
+    parser.add_argument(
+        "--concurrency", type=int, default=8, help="jobs in flight to measure latency"
+    )
+    parser.add_argument(
+        "--max-jobs", type=int, default=10, help="jobs the worker runs at once"
+    )
+    parser.add_argument(
+        "--poll-delay", type=float, default=0.005, help="the worker's poll delay"
+    )
+    parser.add_argument(
+        "--payloads", nargs="+", choices=list(PAYLOADS), default=list(PAYLOADS)
+    )
+    parser.add_argument("--kinds", nargs="+", choices=list(KINDS), default=list(KINDS))
+    parser.add_argument(
+        "--output", metavar="PATH", help="where to write the results, or stdout"
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    options = parse_args(argv)
+
+    with ExitStack() as stack:
+        if options.redis:
+            redis_settings = RedisSettings.from_dsn(options.redis)
+        else:
+            server = stack.enter_context(StandinRedis())
+            redis_settings = RedisSettings(host=server.host, port=server.port)
+
+        results = asyncio.run(run(redis_settings, options))
+
+    report = json.dumps({"meta": metadata(options), "results": results}, indent=2)
+    if options.output:
+        with open(options.output, "w") as f:
+            f.write(report + "\n")
+    else:
+        print(report)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""
+Compares passing large arguments to and results from CPU-bound jobs through the
+process pool's pipe against passing them through shared memory.
+
+    python -m benchmarks.transport
+"""
+
+import asyncio
+from contextlib import redirect_stdout
+from io import StringIO
+from time import perf_counter
+from typing import Any, Dict
+
+from just_jobs import BaseSettings, JobType, job
+
+ROUNDS = 5
+SIZES = {"1MB": 1 << 20, "64MB": 64 << 20, "256MB": 256 << 20}
+
+
+class PipeSettings(metaclass=BaseSettings):
+    pass
+
+
+class SharedSettings(metaclass=BaseSettings):
+    shared_memory_threshold = 1 << 16
+
+
+@job(job_type=JobType.CPU_BOUND, name="echo")
+def echo(blob: bytearray) -> bytearray:
+    return blob
+
+
+async def _time(settings: BaseSettings, blob: bytearray) -> float:
+    ctx: Dict[Any, Any] = {}
+
+    with redirect_stdout(StringIO()):
+        await settings.on_startup(ctx)
+        try:
+            await echo.run(ctx, blob)  # warm up the pool
+            start = perf_counter()
+            for _ in range(ROUNDS):
+                await echo.run(ctx, blob)
+            return (perf_counter() - start) / ROUNDS * 1e3
+        finally:
+            await settings.on_shutdown(ctx)
+
+
+async def main() -> None:
+    for size, nbytes in SIZES.items():
+        blob = bytearray(nbytes)
+        pipe = await _time(PipeSettings, blob)
+        shared = await _time(SharedSettings, blob)
+
+        print(
+            f"{size:>6}: pipe {pipe:8.1f} ms/job, shared memory {shared:8.1f} ms/job"
+            f" ({pipe / shared:4.1f}x)"
+        )
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,8 +1,9 @@
 """.. include:: ../README.md"""
 
-from .job_type import JobType
+from .batching import BatchCall
+from .job_type import ExecutorPool, JobType
 from .jobs import job
 from .settings import BaseSettings
 from .typing import Context
 
-__all__ = ["job", "JobType", "BaseSettings", "Context"]
+__all__ = ["job", "JobType", "ExecutorPool", "BatchCall", "BaseSettings", "Context"]
@@ -0,0 +1,138 @@
+"""
+Grows and shrinks the executors of a worker to fit its workload.
+
+Each pool's demand is the number of calls it's running and waiting to run, plus its
+share of the jobs ready in the worker's Redis queue, which is the share of the calls
+submitted since the last check that went to it. Pools grow to meet demand right away,
+but only shrink once demand has stayed below their size for a cooldown period, so they
+don't thrash when demand fluctuates.
+"""
+
+import asyncio
+import math
+from collections import deque
+from dataclasses import dataclass, field
+from time import time
+from typing import Any, Deque, Dict, List, Optional
+
+from .executors import _Pool
+from .log import logger
+
+
+@dataclass(frozen=True)
+class Bounds:
+    """The range of sizes within which a pool is scaled."""
+
+    min: int
+    max: int
+
+    def clamp(self, size: int) -> int:
+        return max(self.min, min(self.max, size))
+
+
+@dataclass(frozen=True)
+class ScalingDecision:
+    """A change to the size of a pool, and the demand that led to it."""
+
+    time: float
+    pool: str
+    size: int
+    """The size of the pool before the change."""
+    target: int
+    """The size of the pool after the change."""
+    demand: int
+    queued: int
+    """The number of jobs ready in the Redis queue at the time."""
+
+
+@dataclass
+class Autoscaler:
+    """Periodically resizes a worker's pools between their bounds."""
+
+    pools: Dict[str, _Pool]
+    bounds: Dict[str, Bounds]
+    redis: Optional[Any] = field(repr=False)
+    """The worker's ArqRedis, if the depth of its queue should be considered."""
+    queue_name: str
+    interval: float
+    cooldown: float
+
+    decisions: Deque[ScalingDecision] = field(
+        default_factory=lambda: deque(maxlen=100), init=False, repr=False
+    )
+    """The most recent scaling decisions, oldest first."""
+
+    _submitted: Dict[str, int] = field(default_factory=dict, init=False, repr=False)
+    _low_since: Dict[str, float] = field(default_factory=dict, init=False, repr=False)
+    _task: Optional["asyncio.Task[None]"] = field(default=None, init=False, repr=False)
+
+    def start(self) -> None:
+        """Sizes every pool at its minimum, then starts scaling them periodically."""
+        for name, pool in self.pools.items():
+            pool.resize(max(self.bounds[name].min, 1))
+            self._submitted[name] = pool.submitted
+
+        self._task = asyncio.ensure_future(self._run())
+
+    async def stop(self) -> None:
+        if self._task:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    async def _run(self) -> None:
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.step()
+            except Exception:
+                logger.exception("Failed to autoscale executors.")
+
+    async def _queued(self) -> int:
+        if self.redis is None:
+            return 0
+
+        now = int(time() * 1000)
+        return int(await self.redis.zcount(self.queue_name, "-inf", now))
+
+    async def step(self) -> List[ScalingDecision]:
+        """Resizes every pool that doesn't fit its demand, returning the changes."""
+        queued = await self._queued()
+        now = time()
+
+        submitted = {name: pool.submitted for name, pool in self.pools.items()}
+        recent = {name: submitted[name] - self._submitted[name] for name in submitted}
+        total = sum(recent.values())
+        self._submitted = submitted
+
+        decisions = []
+        for name, pool in self.pools.items():
+            share = recent[name] / total if total else 0
+            demand = pool.busy + pool.pending + math.ceil(queued * share)
+            size, target = pool.max_workers, self.bounds[name].clamp(demand)
+
+            if target >= size:
+                self._low_since.pop(name, None)
+                if target == size:
+                    continue
+            elif now - self._low_since.setdefault(name, now) < self.cooldown:
+                continue
+            else:
+                del self._low_since[name]
+
+            pool.resize(target)
+            decision = ScalingDecision(now, name, size, target, demand, queued)
+            logger.info(
+                "Resized the %s executor from %d to %d (demand %d, %d queued).",
+                name,
+                size,
+                target,
+                demand,
+                queued,
+            )
+            self.decisions.append(decision)
+            decisions.append(decision)
+
+        return decisions
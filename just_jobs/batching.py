@@ -0,0 +1,118 @@
+"""
+Micro-batching of small jobs. A worker collects the calls of a batched job as they
+start, and once it has `batch_size` of them, or `batch_wait` seconds after the first,
+invokes the job once with all of them. The result for each call is then handed back to
+the arq job that made it, so each still gets its own result.
+"""
+
+import asyncio
+from typing import (
+    Any,
+    Awaitable,
+    Callable,
+    Dict,
+    List,
+    NamedTuple,
+    Optional,
+    Set,
+    Tuple,
+)
+
+_JOB_CONTEXT = ("job_id", "job_try", "enqueue_time", "score")
+"""The keys of the context that describe a single job rather than the worker."""
+
+
+class BatchCall(NamedTuple):
+    """One of the calls a batched job is invoked with."""
+
+    args: Tuple[Any, ...]
+    kwargs: Dict[str, Any]
+    job_id: Optional[str] = None
+
+
+def batch_context(ctx: Dict[Any, Any]) -> Dict[Any, Any]:
+    """The given job's context, without what describes only that job."""
+    return {k: v for k, v in ctx.items() if k not in _JOB_CONTEXT}
+
+
+class Batcher:
+    """
+    Collects calls, and passes them to `invoke` in batches. `invoke` must return a
+    result for each call in order, or an exception instance to fail only that call.
+    If it raises, every call in the batch fails.
+    """
+
+    def __init__(
+        self,
+        size: int,
+        wait: float,
+        invoke: Callable[[Dict[Any, Any], List[BatchCall]], Awaitable[List[Any]]],
+    ) -> None:
+        self.size = size
+        self.wait = wait
+        self.invoke = invoke
+        self._calls: List[BatchCall] = []
+        self._futures: List["asyncio.Future[Any]"] = []
+        self._ctx: Dict[Any, Any] = {}
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._tasks: Set["asyncio.Task[None]"] = set()
+
+    async def submit(self, ctx: Dict[Any, Any], call: BatchCall) -> Any:
+        """Adds the call to the next batch, and returns its result once it's run."""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        if not self._calls:
+            # the first call's context stands in for those of the rest
+            self._ctx = batch_context(ctx)
+            self._timer = loop.call_later(self.wait, self._flush)
+
+        self._calls.append(call)
+        self._futures.append(future)
+        if len(self._calls) >= self.size:
+            self._flush()
+
+        return await future
+
+    def _flush(self) -> None:
+        if self._timer:
+            self._timer.cancel()
+            self._timer = None
+
+        calls, futures, self._calls, self._futures = self._calls, self._futures, [], []
+        task = asyncio.ensure_future(self._run(self._ctx, calls, futures))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(
+        self,
+        ctx: Dict[Any, Any],
+        calls: List[BatchCall],
+        futures: List["asyncio.Future[Any]"],
+    ) -> None:
+        try:
+            results = await self.invoke(ctx, calls)
+            if len(results) != len(calls):
+                raise ValueError(
+                    f"A batched job returned {len(results)} results for"
+                    f" {len(calls)} calls."
+                )
+        except Exception as e:
+            for future in futures:
+                if not future.done():
+                    future.set_exception(e)
+
+            return
+        except BaseException:
+            for future in futures:
+                future.cancel()
+
+            raise
+
+        for future, result in zip(futures, results):
+            if future.done():
+                # the job was cancelled, ie. because it timed out
+                continue
+            elif isinstance(result, BaseException):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
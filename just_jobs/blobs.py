@@ -0,0 +1,136 @@
+"""
+Offloading of large job payloads from Redis. The encoded arguments or result of a job
+with a `blob_threshold` are written to a blob store once they're at least that large,
+and only a signed pointer to them is kept in Redis. Blobs expire along with what points
+to them: a queued job's once its result is written or after `blob_ttl`, and a
+result's after it's no longer kept.
+"""
+
+import os
+import re
+import threading
+from abc import ABC, abstractmethod
+from time import monotonic, time
+from typing import BinaryIO, Optional
+from uuid import uuid4
+
+_FOREVER = 2.0**33
+"""The expiry of blobs that never expire, sometime in the 23rd century."""
+
+_KEY = re.compile(r"[\w.-]+")
+
+
+class BlobStore(ABC):
+    """
+    Stores the encoded payloads of jobs by key, each for a number of seconds, after
+    which it may be deleted. Stores must be reachable at the same keys wherever jobs
+    are enqueued, run, or have their results read.
+    """
+
+    @abstractmethod
+    def put(self, key: str, data: bytes, ttl: Optional[float]) -> None:
+        """Stores the blob for `ttl` seconds, or forever if None."""
+
+    @abstractmethod
+    def read(self, key: str) -> bytes:
+        """
+        Reads the whole blob into memory. Raises a KeyError if it doesn't exist or has
+        expired.
+        """
+
+    @abstractmethod
+    def open(self, key: str) -> BinaryIO:
+        """
+        Opens the blob as a stream, to read it in chunks. Raises a KeyError if it
+        doesn't exist or has expired.
+        """
+
+    @abstractmethod
+    def delete(self, key: str) -> None:
+        """Deletes the blob, if it exists."""
+
+
+class LocalBlobStore(BlobStore):
+    """
+    Stores blobs as files in a directory, which must be shared by every producer and
+    worker, ie. on a network filesystem.
+
+    Each file's modification time is set to when it expires. Expired blobs are never
+    read, and are deleted by a sweep of the directory at most every `sweep_interval`
+    seconds, while blobs are being stored. Sweeps run in a background thread, so
+    listing the directory never holds up whoever stores a blob.
+    """
+
+    def __init__(self, root: str, sweep_interval: float = 60.0) -> None:
+        self.root = root
+        self.sweep_interval = sweep_interval
+        self._next_sweep = monotonic() + sweep_interval
+        self._sweeper: Optional[threading.Thread] = None
+        os.makedirs(root, exist_ok=True)
+
+    def put(self, key: str, data: bytes, ttl: Optional[float]) -> None:
+        path = self._path(key)
+        # written aside and then moved, so a blob is never read half-written
+        partial = f"{path}.{uuid4().hex}.tmp"
+        with open(partial, "wb") as f:
+            f.write(data)
+
+        expires = _FOREVER if ttl is None else time() + ttl
+        os.utime(partial, (time(), expires))
+        os.replace(partial, path)
+
+        if monotonic() >= self._next_sweep and not (
+            self._sweeper and self._sweeper.is_alive()
+        ):
+            self._next_sweep = monotonic() + self.sweep_interval
+            self._sweeper = threading.Thread(
+                target=self.sweep, name="just-jobs-blob-sweeper", daemon=True
+            )
+            self._sweeper.start()
+
+    def read(self, key: str) -> bytes:
+        with self.open(key) as f:
+            return f.read()
+
+    def open(self, key: str) -> BinaryIO:
+        try:
+            f = open(self._path(key), "rb")
+        except FileNotFoundError:
+            raise KeyError(f"No blob with the key '{key}' exists.") from None
+
+        if os.fstat(f.fileno()).st_mtime <= time():
+            f.close()
+            raise KeyError(f"The blob with the key '{key}' has expired.")
+
+        return f
+
+    def delete(self, key: str) -> None:
+        try:
+            os.remove(self._path(key))
+        except FileNotFoundError:
+            pass
+
+    def sweep(self) -> int:
+        """Deletes every expired blob, returning how many were."""
+        now, swept = time(), 0
+        for entry in os.scandir(self.root):
+            try:
+                expires = entry.stat().st_mtime
+                # blobs being written are only abandoned once they're an hour old
+                if entry.name.endswith(".tmp"):
+                    expires += 3600
+
+                if expires <= now:
+                    os.remove(entry.path)
+                    swept += 1
+            except FileNotFoundError:
+                # deleted by another sweep
+                continue
+
+        return swept
+
+    def _path(self, key: str) -> str:
+        if not _KEY.fullmatch(key):
+            raise ValueError(f"Invalid blob key '{key}'.")
+
+        return os.path.join(self.root, key)
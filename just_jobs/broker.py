@@ -1,8 +1,56 @@
+import asyncio
 from dataclasses import dataclass, field
-from typing import Any, Callable, Dict, Generator, Optional, cast
+from datetime import datetime
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    Generator,
+    Iterable,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    cast,
+)
+from uuid import uuid4
 
 from arq import create_pool
 from arq.connections import ArqRedis, RedisSettings
+from arq.constants import default_queue_name, job_key_prefix, result_key_prefix
+from arq.jobs import Job, serialize_job
+from arq.typing import SecondsTimedelta
+from arq.utils import timestamp_ms, to_ms, to_unix_ms
+from redis.exceptions import WatchError
+
+from .serialization import JobHeader
+
+
+@dataclass(frozen=True)
+class JobRequest:
+    """
+    A job to enqueue with `Broker.enqueue_jobs`, with the same options as
+    `ArqRedis.enqueue_job`.
+    """
+
+    function: str
+    args: Tuple[Any, ...] = ()
+    kwargs: Dict[str, Any] = field(default_factory=dict)
+    job_id: Optional[str] = None
+    """The ID of the job, which isn't enqueued if a job with the same ID exists."""
+    defer_until: Optional[datetime] = None
+    defer_by: Optional[SecondsTimedelta] = None
+    expires: Optional[SecondsTimedelta] = None
+    job_try: Optional[int] = None
+
+
+@dataclass
+class _Pending:
+    index: int
+    job_id: str
+    score: int
+    expires_ms: int
+    packed: bytes = field(repr=False)
 
 
 @dataclass
@@ -16,6 +64,7 @@ class Broker:
     redis_settings: RedisSettings
     packj: Callable[[Any], bytes] = field(repr=False)
     unpackj: Callable[[bytes], Any] = field(repr=False)
+    peekj: Callable[[bytes], JobHeader] = field(repr=False)
     kwargs: Dict[str, Any]
 
     _pool: Optional[ArqRedis] = field(repr=False, init=False, default=None)
@@ -31,6 +80,176 @@ class Broker:
 
         return self._pool
 
+    async def queued_job_headers(
+        self, *, queue_name: str = default_queue_name
+    ) -> List[JobHeader]:
+        """
+        Reads the metadata of every job in the given queue in one round-trip, without
+        verifying or decoding any of their arguments. Unlike `ArqRedis.queued_jobs`, it
+        stays cheap for queues of thousands of jobs with large arguments.
+        """
+        pool = await self.pool()
+        queued = await pool.zrange(queue_name, withscores=True, start=0, end=-1)
+        if not queued:
+            return []
+
+        job_ids = [job_id.decode() for job_id, _ in queued]
+        packed = await pool.mget([job_key_prefix + job_id for job_id in job_ids])
+
+        headers = []
+        for job_id, (_, score), value in zip(job_ids, queued, packed):
+            # the job may have started and finished since the queue was read
+            if value is not None:
+                header = self.peekj(value)
+                header.job_id, header.score = job_id, int(score)
+                headers.append(header)
+
+        return headers
+
+    async def job_header(
+        self, job_id: str, *, queue_name: str = default_queue_name
+    ) -> Optional[JobHeader]:
+        """
+        Reads the metadata of the given job, or of its result if it has finished,
+        without verifying or decoding its arguments or result. Returns None if the job
+        doesn't exist.
+        """
+        pool = await self.pool()
+        async with pool.pipeline(transaction=False) as pipe:
+            pipe.get(result_key_prefix + job_id)
+            pipe.get(job_key_prefix + job_id)
+            pipe.zscore(queue_name, job_id)
+            result, queued, score = await pipe.execute()
+
+        if not (result or queued):
+            return None
+
+        header = self.peekj(result or queued)
+        header.job_id = job_id
+        if not result and score is not None:
+            header.score = int(score)
+
+        return header
+
+    async def enqueue_jobs(
+        self,
+        jobs: Iterable[JobRequest],
+        *,
+        queue_name: Optional[str] = None,
+        chunk_size: int = 1000,
+        offload: bool = False,
+    ) -> List[Optional[Job]]:
+        """
+        Enqueues many jobs in a few round-trips per chunk of `chunk_size`, rather than
+        a few per job. Each chunk is serialized in one go, in the default executor if
+        `offload` is set so large chunks don't block the event loop, and written in one
+        transaction. Like `ArqRedis.enqueue_job`, jobs whose ID already exists, either
+        queued or as a result, aren't enqueued.
+
+        Returns a Job for each enqueued job, or None for each one that wasn't, in the
+        order they were given.
+        """
+        pool = await self.pool()
+        queue_name = queue_name or pool.default_queue_name
+        requests = list(jobs)
+        enqueued: List[Optional[Job]] = [None] * len(requests)
+        loop = asyncio.get_running_loop()
+
+        for start in range(0, len(requests), chunk_size):
+            chunk = requests[start : start + chunk_size]
+            if offload:
+                pending = await loop.run_in_executor(
+                    None, self._serialize, pool, chunk, start
+                )
+            else:
+                pending = self._serialize(pool, chunk, start)
+
+            for job in await self._write(pool, queue_name, pending):
+                enqueued[job.index] = Job(
+                    job.job_id,
+                    redis=pool,
+                    _queue_name=queue_name,
+                    _deserializer=self.unpackj,
+                )
+
+        return enqueued
+
+    @staticmethod
+    def _serialize(
+        pool: ArqRedis, requests: Sequence[JobRequest], offset: int
+    ) -> List[_Pending]:
+        pending = []
+        enqueue_time_ms = timestamp_ms()
+        for index, request in enumerate(requests, offset):
+            if request.defer_until and request.defer_by:
+                raise RuntimeError(
+                    "use either 'defer_until' or 'defer_by' or neither, not both"
+                )
+
+            if request.defer_until is not None:
+                score = to_unix_ms(request.defer_until)
+            else:
+                score = enqueue_time_ms + (to_ms(request.defer_by) or 0)
+
+            expires_ms = to_ms(request.expires)
+            packed = serialize_job(
+                request.function,
+                request.args,
+                request.kwargs,
+                request.job_try,
+                enqueue_time_ms,
+                serializer=pool.job_serializer,
+            )
+            pending.append(
+                _Pending(
+                    index,
+                    request.job_id or uuid4().hex,
+                    score,
+                    expires_ms or score - enqueue_time_ms + pool.expires_extra_ms,
+                    packed,
+                )
+            )
+
+        return pending
+
+    @staticmethod
+    async def _write(
+        pool: ArqRedis, queue_name: str, pending: List[_Pending]
+    ) -> List[_Pending]:
+        # only the first of several jobs with the same ID is ever enqueued
+        unique: Dict[str, _Pending] = {}
+        for job in pending:
+            unique.setdefault(job.job_id, job)
+
+        while True:
+            async with pool.pipeline(transaction=True) as pipe:
+                # the keys are watched before they're checked, so the transaction
+                # fails if any of them are written by someone else in the meantime
+                await pipe.watch(*(job_key_prefix + job_id for job_id in unique))
+                async with pool.pipeline(transaction=False) as check:
+                    for job_id in unique:
+                        check.exists(
+                            job_key_prefix + job_id, result_key_prefix + job_id
+                        )
+                    exists = await check.execute()
+
+                fresh = [job for job, n in zip(unique.values(), exists) if not n]
+                if not fresh:
+                    await pipe.reset()  # type: ignore[no-untyped-call]
+                    return []
+
+                pipe.multi()  # type: ignore[no-untyped-call]
+                for job in fresh:
+                    pipe.psetex(job_key_prefix + job.job_id, job.expires_ms, job.packed)
+                pipe.zadd(queue_name, {job.job_id: job.score for job in fresh})
+                try:
+                    await pipe.execute()
+                except WatchError:
+                    # some were enqueued since they were checked, so check them again
+                    continue
+
+                return fresh
+
     def __await__(self) -> Generator[Any, None, ArqRedis]:
         return self.pool().__await__()
 
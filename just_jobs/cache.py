@@ -0,0 +1,130 @@
+"""
+Memoization of the results of deterministic jobs. Results are keyed on the job's name
+and a hash of its encoded arguments, and kept both in Redis, so every worker can reuse
+them, and in a small LRU cache in front of it. Concurrent calls with the same arguments
+on a worker wait for the first one, rather than each running the job.
+"""
+
+import asyncio
+from collections import OrderedDict
+from hashlib import blake2b
+from time import monotonic
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from .serialization import DeferredArgs
+
+KEY_PREFIX = "just_jobs:cache:"
+
+
+class JobCache:
+    """
+    Caches the results of jobs for a number of seconds. Memoized jobs are enqueued with
+    their arguments packed, which are hashed as they are. Otherwise, they're hashed as
+    `encode_args` encodes them, which should be the same as they're packed. Results
+    are encoded and decoded with the given functions before they're written to and
+    after they're read from Redis, so they can be signed.
+    """
+
+    hits: int = 0
+    misses: int = 0
+
+    def __init__(
+        self,
+        redis: Optional[Any],
+        encode_args: Callable[[Tuple[Any, ...], Dict[str, Any]], bytes],
+        encode: Callable[[Any], bytes],
+        decode: Callable[[bytes], Any],
+        local_size: int = 1024,
+    ) -> None:
+        self.redis = redis
+        self.encode_args = encode_args
+        self.encode = encode
+        self.decode = decode
+        self.local_size = local_size
+        self._local: "OrderedDict[str, Tuple[float, Any]]" = OrderedDict()
+        self._inflight: Dict[str, "asyncio.Future[Any]"] = {}
+
+    def key(self, name: str, args: Tuple[Any, ...], kwargs: Dict[str, Any]) -> str:
+        """The key of the result of the named job given its arguments."""
+        if len(args) == 1 and isinstance(args[0], DeferredArgs):
+            # packed when the job was enqueued, so they needn't be encoded again
+            encoded = args[0].data
+        else:
+            encoded = self.encode_args(args, kwargs)
+
+        digest = blake2b(encoded, digest_size=16).hexdigest()
+        return f"{KEY_PREFIX}{name}:{digest}"
+
+    async def get_or_run(
+        self, key: str, ttl: float, run: Callable[[], Awaitable[Any]]
+    ) -> Any:
+        """
+        Returns the cached result for the key, or else runs the job and caches its
+        result for `ttl` seconds. Errors aren't cached. If the call running the job is
+        cancelled, one of those waiting for it runs the job instead.
+        """
+        cached = self._local.get(key)
+        if cached and cached[0] > monotonic():
+            self._local.move_to_end(key)
+            self.hits += 1
+            return cached[1]
+
+        while key in self._inflight:
+            inflight = self._inflight[key]
+            try:
+                value = await asyncio.shield(inflight)
+            except asyncio.CancelledError:
+                if not inflight.cancelled():
+                    # this call was cancelled, rather than the one it waited for
+                    raise
+                continue
+
+            self.hits += 1
+            return value
+
+        future = asyncio.get_running_loop().create_future()
+        # waiters may not exist, in which case errors would be reported as unretrieved
+        future.add_done_callback(lambda f: f.cancelled() or f.exception())
+        self._inflight[key] = future
+        try:
+            value, expires = await self._get_remote(key)
+            if expires is None:
+                self.misses += 1
+                value = await run()
+                expires = ttl
+                if self.redis is not None:
+                    await self.redis.set(key, self.encode(value), px=int(ttl * 1000))
+            else:
+                self.hits += 1
+
+            self._store(key, value, expires)
+            future.set_result(value)
+            return value
+        except Exception as e:
+            future.set_exception(e)
+            raise
+        except BaseException:
+            future.cancel()
+            raise
+        finally:
+            del self._inflight[key]
+
+    async def _get_remote(self, key: str) -> Tuple[Any, Optional[float]]:
+        if self.redis is None:
+            return None, None
+
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.get(key)
+            pipe.pttl(key)
+            packed, pttl = await pipe.execute()
+
+        if packed is None or pttl <= 0:
+            return None, None
+
+        return self.decode(packed), pttl / 1000
+
+    def _store(self, key: str, value: Any, ttl: float) -> None:
+        self._local[key] = (monotonic() + ttl, value)
+        self._local.move_to_end(key)
+        while len(self._local) > self.local_size:
+            self._local.popitem(last=False)
@@ -0,0 +1,264 @@
+import asyncio
+import os
+import threading
+from collections import defaultdict
+from concurrent.futures import Future
+from dataclasses import dataclass, field, replace
+from datetime import datetime
+from typing import Any, Coroutine, Dict, List, Optional, Tuple, TypeVar, cast
+
+from arq.connections import ArqRedis
+from arq.jobs import Job
+from arq.typing import SecondsTimedelta
+
+from .broker import Broker, JobRequest, _Pending
+
+T = TypeVar("T")
+
+
+@dataclass
+class _Enqueue:
+    queue_name: Optional[str]
+    pending: _Pending
+    future: "Future[Optional[str]]" = field(repr=False)
+
+
+class SyncBroker:
+    """
+    A thread-safe, blocking client of a `Broker`, for producers that don't run an
+    event loop, like WSGI apps and scripts. It runs its own event loop in a background
+    thread, started on first use, which keeps a single connection pool for every
+    thread. Jobs are serialized in the calling thread, and those enqueued while
+    another write is in flight are written together in a single transaction.
+    """
+
+    writes: int = 0
+    """The number of transactions jobs have been written in."""
+
+    def __init__(self, broker: Broker, *, chunk_size: int = 1000) -> None:
+        self.broker = broker
+        self.chunk_size = chunk_size
+        # reentrant, so jobs can be scheduled on a loop that's (re)started under it
+        self._lock = threading.RLock()
+        self._pid = 0
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._pool: Optional[ArqRedis] = None
+        self._queued: List[_Enqueue] = []
+        self._flusher: Optional["asyncio.Task[None]"] = None
+
+    def enqueue_job(
+        self,
+        function: str,
+        *args: Any,
+        _job_id: Optional[str] = None,
+        _queue_name: Optional[str] = None,
+        _defer_until: Optional[datetime] = None,
+        _defer_by: Optional[SecondsTimedelta] = None,
+        _expires: Optional[SecondsTimedelta] = None,
+        _job_try: Optional[int] = None,
+        **kwargs: Any,
+    ) -> Optional[str]:
+        """
+        Enqueues a job with the same options as `ArqRedis.enqueue_job`, and blocks
+        until it's written. Returns its ID, or None if a job with the same ID exists.
+        """
+        return self.enqueue_job_future(
+            function,
+            *args,
+            _job_id=_job_id,
+            _queue_name=_queue_name,
+            _defer_until=_defer_until,
+            _defer_by=_defer_by,
+            _expires=_expires,
+            _job_try=_job_try,
+            **kwargs,
+        ).result()
+
+    def enqueue_job_future(
+        self,
+        function: str,
+        *args: Any,
+        _job_id: Optional[str] = None,
+        _queue_name: Optional[str] = None,
+        _defer_until: Optional[datetime] = None,
+        _defer_by: Optional[SecondsTimedelta] = None,
+        _expires: Optional[SecondsTimedelta] = None,
+        _job_try: Optional[int] = None,
+        **kwargs: Any,
+    ) -> "Future[Optional[str]]":
+        """
+        Like `enqueue_job`, but returns a future of the job's ID rather than waiting
+        for it to be written.
+        """
+        _, pool = self._start()
+        request = JobRequest(
+            function,
+            args,
+            kwargs,
+            job_id=_job_id,
+            defer_until=_defer_until,
+            defer_by=_defer_by,
+            expires=_expires,
+            job_try=_job_try,
+        )
+        (pending,) = Broker._serialize(pool, [request], 0)
+        future: "Future[Optional[str]]" = Future()
+        # the client can't close while the job is scheduled, so its loop is running and
+        # the job is queued before the client's closing flushes the queue
+        with self._lock:
+            loop, _ = self._start()
+            loop.call_soon_threadsafe(
+                self._enqueue, _Enqueue(_queue_name, pending, future)
+            )
+
+        return future
+
+    def job_result(
+        self,
+        job_id: str,
+        *,
+        timeout: Optional[float] = None,
+        poll_delay: float = 0.5,
+        queue_name: Optional[str] = None,
+    ) -> Any:
+        """
+        Blocks until the given job finishes, and returns its result or raises its
+        error, like `Job.result`.
+        """
+        return self.job_result_future(
+            job_id, timeout=timeout, poll_delay=poll_delay, queue_name=queue_name
+        ).result()
+
+    def job_result_future(
+        self,
+        job_id: str,
+        *,
+        timeout: Optional[float] = None,
+        poll_delay: float = 0.5,
+        queue_name: Optional[str] = None,
+    ) -> "Future[Any]":
+        """Like `job_result`, but returns a future of the job's result."""
+        with self._lock:
+            _, pool = self._start()
+            job = Job(
+                job_id,
+                redis=pool,
+                _queue_name=queue_name or pool.default_queue_name,
+                _deserializer=self.broker.unpackj,
+            )
+            return self._submit(job.result(timeout=timeout, poll_delay=poll_delay))
+
+    def close(self) -> None:
+        """
+        Waits for every queued job to be written and cancels the futures of pending
+        results, then closes the connection pool and stops the event loop. The client
+        starts again if it's used afterwards.
+        """
+        with self._lock:
+            loop, thread = self._loop, self._thread
+            if loop is None or thread is None or self._pid != os.getpid():
+                return
+
+            asyncio.run_coroutine_threadsafe(self._close(), loop).result()
+            loop.call_soon_threadsafe(loop.stop)
+            thread.join()
+            loop.close()
+            self._loop = self._thread = self._pool = None
+
+    def __enter__(self) -> "SyncBroker":
+        return self
+
+    def __exit__(self, *_: Any) -> None:
+        self.close()
+
+    def _start(self) -> Tuple[asyncio.AbstractEventLoop, ArqRedis]:
+        # a forked process doesn't inherit the thread, so it needs its own
+        if self._pool is not None and self._pid == os.getpid():
+            return self._loop, self._pool  # type: ignore[return-value]
+
+        with self._lock:
+            if self._pool is None or self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._queued, self._flusher = [], None
+                self._loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(
+                    target=self._loop.run_forever, name="just-jobs-client", daemon=True
+                )
+                self._thread.start()
+                # a pool belongs to the loop it's created in, so the broker's own
+                # cached pool can't be shared
+                self._pool = self._submit(replace(self.broker).pool()).result()
+
+            return self._loop, self._pool  # type: ignore[return-value]
+
+    def _submit(self, coro: Coroutine[Any, Any, T]) -> "Future[T]":
+        loop = cast(asyncio.AbstractEventLoop, self._loop)
+        return asyncio.run_coroutine_threadsafe(coro, loop)
+
+    def _enqueue(self, job: _Enqueue) -> None:
+        self._queued.append(job)
+        if self._flusher is None:
+            self._flusher = asyncio.ensure_future(self._flush())
+
+    async def _flush(self) -> None:
+        # runs until the queue is empty, so jobs enqueued during a write are batched
+        pool = cast(ArqRedis, self._pool)
+        try:
+            while self._queued:
+                # futures cancelled by their callers aren't written, and the rest can't
+                # be cancelled once they're being written
+                batch = [
+                    job
+                    for job in self._queued[: self.chunk_size]
+                    if job.future.set_running_or_notify_cancel()
+                ]
+                del self._queued[: self.chunk_size]
+
+                queues: Dict[str, List[_Enqueue]] = defaultdict(list)
+                for job in batch:
+                    queues[job.queue_name or pool.default_queue_name].append(job)
+
+                for queue_name, jobs in queues.items():
+                    await self._write(pool, queue_name, jobs)
+        finally:
+            self._flusher = None
+
+    async def _write(
+        self, pool: ArqRedis, queue_name: str, jobs: List[_Enqueue]
+    ) -> None:
+        for index, job in enumerate(jobs):
+            job.pending.index = index
+
+        try:
+            written = await Broker._write(
+                pool, queue_name, [job.pending for job in jobs]
+            )
+            self.writes += 1
+        except Exception as e:
+            for job in jobs:
+                job.future.set_exception(e)
+            return
+
+        fresh = {pending.index for pending in written}
+        for index, job in enumerate(jobs):
+            job.future.set_result(job.pending.job_id if index in fresh else None)
+
+    async def _close(self) -> None:
+        if self._flusher is not None:
+            await asyncio.gather(self._flusher, return_exceptions=True)
+
+        # only left queued if the flush failed
+        error = RuntimeError("The client was closed before this job was written.")
+        for job in self._queued:
+            if job.future.set_running_or_notify_cancel():
+                job.future.set_exception(error)
+        self._queued = []
+
+        tasks = asyncio.all_tasks() - {asyncio.current_task()}
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+        if self._pool is not None:
+            await self._pool.close(close_connection_pool=True)
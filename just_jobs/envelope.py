@@ -0,0 +1,228 @@
+"""
+The signed envelope wrapping every serialized job and result. Envelopes start with a
+fixed-length binary header, so they can be verified and unwrapped without copying the
+payload they carry:
+
+| offset        | size | field                                        |
+| ------------- | ---- | -------------------------------------------- |
+| 0             | 2    | magic, `JJ`                                  |
+| 2             | 1    | version                                      |
+| 3             | 1    | flags                                        |
+| 4             | 1    | digest size, `n`                             |
+| 5             | n    | blake2b digest of the header                 |
+| 5 + n         | n    | blake2b digest of the payload                |
+| 5 + 2n        | 1    | codec name length, `c`                       |
+| 6 + 2n        | c    | codec name                                   |
+| 6 + 2n + c    | 1    | compressor name length, `z`, if compressed   |
+| 7 + 2n + c    | z    | compressor name, if compressed               |
+| ...           | 4    | metadata length, `m`, big-endian             |
+| ...           | m    | metadata                                     |
+| ...           |      | payload                                      |
+
+The header's digest covers every byte before the payload, including the payload's
+digest, so the metadata can be verified and read without hashing the payload.
+
+Envelopes from before the binary header, which were prefixed by a hex digest and `|`,
+can still be unwrapped.
+"""
+
+import struct
+from hashlib import blake2b
+from secrets import compare_digest
+from typing import Dict, NamedTuple, Optional, Tuple, Union
+
+MAGIC = b"JJ"
+VERSION = 1
+
+COMPRESSED = 0x01
+"""Set if the payload is compressed, in which case the compressor is named."""
+
+_PREFIX = len(MAGIC) + 3
+_LENGTH = struct.Struct(">I")
+
+_signers: Dict[Tuple[bytes, int], "blake2b"] = {}
+"""Signers already keyed, by their key and digest size, to be copied."""
+
+
+class Envelope(NamedTuple):
+    """The contents of an envelope whose header has been verified."""
+
+    codec: str
+    compressor: Optional[str]
+    metadata: bytes
+    payload: Union[bytes, memoryview]
+    digest: Optional[bytes] = None
+    """The payload's digest, if the payload is yet to be verified."""
+
+
+def seal(
+    payload: bytes,
+    codec: str,
+    compressor: Optional[str],
+    key: bytes,
+    digest_size: int = 32,
+    metadata: bytes = b"",
+) -> bytes:
+    """
+    Wraps the given payload and metadata in an envelope signed with the given key.
+    The metadata is kept out of the payload, so it can be read on its own.
+    """
+    flags = COMPRESSED if compressor else 0
+    prefix = MAGIC + bytes((VERSION, flags, digest_size))
+    fields = b"".join(
+        (
+            _name(codec),
+            _name(compressor) if compressor else b"",
+            _LENGTH.pack(len(metadata)),
+            metadata,
+        )
+    )
+
+    signer = _signer(key, digest_size)
+    signer.update(payload)
+    digest = signer.digest()
+
+    signer = _signer(key, digest_size)
+    signer.update(prefix)
+    signer.update(digest)
+    signer.update(fields)
+    return b"".join((prefix, signer.digest(), digest, fields, payload))
+
+
+def peek(packed: bytes, key: bytes, digest_size: int = 32) -> Envelope:
+    """
+    Verifies the signature of the given envelope's header and returns its contents,
+    without verifying its payload. The payload must be verified before it's trusted.
+    Raises an error if the signature is invalid, or isn't `digest_size` bytes long.
+    """
+    if packed[:2] != MAGIC:
+        return _unseal_legacy(packed, key)
+
+    codec, compressor, metadata, end = _read_header(packed, key, digest_size)
+    offset = _PREFIX + digest_size
+    return Envelope(
+        codec,
+        compressor,
+        metadata,
+        memoryview(packed)[end:],
+        packed[offset : offset + digest_size],
+    )
+
+
+def verify(envelope: Envelope, key: bytes, digest_size: int = 32) -> Envelope:
+    """
+    Verifies the signature of the given envelope's payload. Raises an error if the
+    signature is invalid, or isn't `digest_size` bytes long.
+    """
+    if envelope.digest is None:
+        return envelope
+
+    _verify_payload(envelope.payload, envelope.digest, key, digest_size)
+    return envelope._replace(digest=None)
+
+
+def unseal(packed: bytes, key: bytes, digest_size: int = 32) -> Envelope:
+    """
+    Verifies the signatures of the given envelope and returns its contents. The
+    payload is a view of the envelope rather than a copy. Raises an error if either
+    signature is invalid, or isn't `digest_size` bytes long.
+    """
+    if packed[:2] != MAGIC:
+        return _unseal_legacy(packed, key)
+
+    # the same as verifying a peeked envelope, without building it twice
+    codec, compressor, metadata, end = _read_header(packed, key, digest_size)
+    offset = _PREFIX + digest_size
+    payload = memoryview(packed)[end:]
+    _verify_payload(payload, packed[offset : offset + digest_size], key, digest_size)
+    return Envelope(codec, compressor, metadata, payload)
+
+
+def _read_header(
+    packed: bytes, key: bytes, digest_size: int
+) -> Tuple[str, Optional[str], bytes, int]:
+    # returns the codec, compressor and metadata, and where the payload starts
+    if packed[2] != VERSION:
+        raise ValueError(f"Unsupported job envelope version {packed[2]}.")
+    elif packed[4] != digest_size:
+        # the size is attacker-controlled, and a short enough digest can be guessed
+        raise _tampered()
+
+    offset = _PREFIX + digest_size
+    try:
+        # the lengths are read before they're verified, so they may be garbage
+        start = offset + digest_size
+        end = start + 1 + packed[start]
+        codec = packed[start + 1 : end].decode("utf-8")
+        compressor = None
+        if packed[3] & COMPRESSED:
+            start, end = end, end + 1 + packed[end]
+            compressor = packed[start + 1 : end].decode("utf-8")
+
+        (size,) = _LENGTH.unpack_from(packed, end)
+        end += 4 + size
+    except (IndexError, UnicodeDecodeError, struct.error):
+        raise _tampered() from None
+
+    signer = _signer(key, digest_size)
+    signer.update(packed[:_PREFIX])
+    signer.update(packed[offset:end])
+    if end > len(packed) or not compare_digest(packed[_PREFIX:offset], signer.digest()):
+        raise _tampered()
+
+    return codec, compressor, packed[end - size : end], end
+
+
+def _verify_payload(
+    payload: Union[bytes, memoryview], digest: bytes, key: bytes, digest_size: int
+) -> None:
+    if len(digest) != digest_size:
+        raise _tampered()
+
+    signer = _signer(key, digest_size)
+    signer.update(payload)
+    if not compare_digest(digest, signer.digest()):
+        raise _tampered()
+
+
+def _signer(key: bytes, digest_size: int) -> "blake2b":
+    # keying a signer hashes a whole block, which copying an already keyed one skips
+    signer = _signers.get((key, digest_size))
+    if signer is None:
+        signer = _signers[key, digest_size] = blake2b(key=key, digest_size=digest_size)
+
+    return signer.copy()
+
+
+def _tampered() -> ValueError:
+    return ValueError(
+        "Invalid job signature! Has someone tampered with your job queue?"
+    )
+
+
+def _name(name: str) -> bytes:
+    encoded = name.encode("utf-8")
+    return bytes((len(encoded),)) + encoded
+
+
+def _unseal_legacy(packed: bytes, key: bytes) -> Envelope:
+    # a hex digest, optionally followed by `:codec[:compressor]`, then `|`. the digest
+    # covers the whole payload, which carries its own metadata
+    header, payload = packed.split(b"|", 1)
+    sig, _, fields = header.partition(b":")
+    signer = blake2b(key=key)
+    if fields:
+        signer.update(fields + b"|")
+    signer.update(payload)
+
+    if not compare_digest(sig.decode("utf-8"), signer.hexdigest()):
+        raise _tampered()
+
+    # payloads from before codecs were recorded are always dill
+    codec, _, compressor = fields.partition(b":")
+    return Envelope(
+        codec.decode("utf-8") if codec else "dill",
+        compressor.decode("utf-8") if compressor else None,
+        b"",
+        payload,
+    )
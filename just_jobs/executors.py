@@ -0,0 +1,688 @@
+"""
+The executors that run synchronous jobs outside of the event loop.
+
+Both pools are made up of slots, each a thread that runs one call at a time. A
+`ThreadPool` runs calls in its slots directly. A `ProcessPool` pairs each slot with a
+child process, to which it hands calls and whose results it waits for, so the worker
+always knows which child is running which call. Children can be replaced between
+calls, ie. once they've run too many or grown too large, without affecting any others.
+
+Cancelling the future of a running call frees its slot immediately. A child running
+the call is killed and replaced. A thread can't be killed, so its slot is abandoned and
+replaced instead, and the call is left to notice its `CancelToken` and return.
+
+Either pool may be given a factory of resources, ie. database connections, which is
+entered once in each of its threads or children and exited when they stop. The calls
+running in a thread or child read its resources via `current_resources`.
+"""
+
+import asyncio
+import multiprocessing
+import os
+import sys
+import threading
+from abc import ABC, abstractmethod
+from concurrent.futures import CancelledError, Executor, Future
+from concurrent.futures._base import CANCELLED_AND_NOTIFIED
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import ExitStack
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from multiprocessing.connection import Connection
+from queue import SimpleQueue
+from time import monotonic
+from typing import (
+    Any,
+    Callable,
+    ContextManager,
+    Coroutine,
+    Dict,
+    FrozenSet,
+    List,
+    Optional,
+    Tuple,
+    cast,
+)
+
+Resources = Callable[[], ContextManager[Dict[str, Any]]]
+"""Creates the resources of a thread or child on entry, and frees them on exit."""
+
+_local = threading.local()
+
+
+def current_resources() -> Dict[str, Any]:
+    """The resources of the pool thread or child this is called from, if any."""
+    return cast(Dict[str, Any], getattr(_local, "resources", {}))
+
+
+def run_coroutine(coro: Coroutine[Any, Any, Any]) -> Any:
+    """
+    Runs the coroutine on this thread's event loop, which is created by the first call
+    and kept for all later ones, so state bound to it (ie. client sessions) can be
+    reused between them.
+    """
+    loop = getattr(_local, "loop", None)
+    if loop is None or loop.is_closed():
+        loop = _local.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+
+    return loop.run_until_complete(coro)
+
+
+class CancelToken:
+    """
+    Set once the call it was given to is cancelled, ie. because its job timed out or was
+    aborted. Calls that can't be interrupted, like those running in threads, should
+    check it periodically and return early once it's set.
+    """
+
+    def __init__(self) -> None:
+        self._event = threading.Event()
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def cancel(self) -> None:
+        self._event.set()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """
+        Blocks until the token is set or the timeout elapses, returning if it was set.
+        Useful in place of `time.sleep`.
+        """
+        return self._event.wait(timeout)
+
+    def raise_if_cancelled(self) -> None:
+        if self.cancelled:
+            raise CancelledError()
+
+
+class _PoolFuture(Future):  # type: ignore[type-arg]
+    def __init__(self, pool: "_Pool") -> None:
+        super().__init__()
+        self._pool = pool
+
+    def cancel(self) -> bool:
+        # unlike other futures, running calls can be cancelled too
+        return super().cancel() or self._pool._abort(self)
+
+    def _cancel_running(self) -> None:
+        """Cancels the future of a running call once it's been aborted."""
+        with self._condition:
+            # the pool won't check the future's state again, so waiters are notified now
+            self._state = CANCELLED_AND_NOTIFIED
+            for waiter in self._waiters:
+                waiter.add_cancelled(self)
+            self._condition.notify_all()
+
+        self._invoke_callbacks()  # type: ignore[attr-defined]
+
+
+@dataclass
+class CallTimings:
+    """When a call was submitted to a pool, started running, and finished."""
+
+    submitted: float = 0.0
+    started: Optional[float] = None
+    finished: Optional[float] = None
+
+    @property
+    def queued(self) -> Optional[float]:
+        """The seconds the call waited for a slot, once it's started."""
+        return None if self.started is None else self.started - self.submitted
+
+    @property
+    def ran(self) -> Optional[float]:
+        """The seconds the call ran for, once it's finished."""
+        if self.started is None or self.finished is None:
+            return None
+
+        return self.finished - self.started
+
+
+timings: ContextVar[Optional[CallTimings]] = ContextVar("timings", default=None)
+"""If set, the timings of the next call submitted to a pool are recorded in it."""
+
+
+@dataclass
+class _WorkItem:
+    future: "Future[Any]"
+    fn: Callable[..., Any]
+    args: Tuple[Any, ...]
+    kwargs: Dict[str, Any] = field(default_factory=dict)
+    timings: Optional[CallTimings] = None
+
+
+@dataclass(eq=False)
+class _Slot:
+    thread: threading.Thread = field(init=False)
+    item: Optional[_WorkItem] = None
+    """The call the slot is running, if any."""
+    abandoned: bool = False
+    """
+    If the slot's call was aborted and the slot replaced, so it should stop once its
+    call returns, or not start it if it's still being prepared.
+    """
+    child: Optional["_Child"] = None
+    resources: Optional[ExitStack] = None
+    """The exit stack of the thread's resources, once they're created."""
+
+
+def _rss() -> Optional[int]:
+    """The resident set size of this process in bytes, if it can be measured."""
+    try:
+        with open("/proc/self/statm", "rb") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        pass
+
+    try:
+        import resource
+    except ImportError:  # pragma: no cover
+        return None
+
+    # elsewhere only the peak is available, which is in kilobytes except on macOS
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+def _serve(
+    conn: Connection,
+    initializer: Optional[Callable[..., Any]],
+    initargs: Tuple[Any, ...],
+    resources: Optional[Resources],
+    measure: bool,
+) -> None:
+    # the main loop of each child. the outcome of the initializer and resources is
+    # always sent first, so the worker knows when the child is ready. every outcome is
+    # followed by the child's size, if the worker is keeping track of it
+    with ExitStack() as stack:
+        try:
+            if initializer:
+                initializer(*initargs)
+            if resources:
+                _local.resources = stack.enter_context(resources())
+        except BaseException as e:
+            _send(conn, (False, e, None))
+            return
+
+        _send(conn, (True, None, None))
+        while True:
+            try:
+                work = conn.recv()
+            except EOFError:
+                return
+
+            if work is None:
+                return
+
+            fn, args, kwargs = work
+            try:
+                ok, value = True, fn(*args, **kwargs)
+            except BaseException as e:
+                ok, value = False, e
+
+            del fn, args, kwargs, work
+            _send(conn, (ok, value, _rss() if measure else None))
+            del value
+
+
+def _send(conn: Connection, outcome: Tuple[bool, Any, Optional[int]]) -> None:
+    try:
+        conn.send(outcome)
+    except Exception as e:
+        # the result or exception couldn't be pickled, which is only reported
+        error = RuntimeError(f"Unable to send the outcome of a call: {e!r}")
+        conn.send((False, error, outcome[2]))
+
+
+class _Child:
+    """A process of the pool, and the pipe through which it's handed calls."""
+
+    tasks: int = 0
+    """The number of calls the child has run."""
+    rss: Optional[int] = None
+    """The child's resident set size in bytes after its last call, if measured."""
+
+    def __init__(self, pool: "ProcessPool") -> None:
+        conn, child_conn = pool._mp.Pipe()
+        self.process = pool._mp.Process(
+            target=_serve,
+            args=(
+                child_conn,
+                pool._initializer,
+                pool._initargs,
+                pool.resources,
+                pool.max_memory_per_child is not None,
+            ),
+            daemon=True,
+        )
+        self.process.start()
+        child_conn.close()
+        self.conn = conn
+
+        ok, error = self._recv()
+        if not ok:
+            self.close()
+            raise error
+
+    def call(self, item: _WorkItem) -> Tuple[bool, Any]:
+        self.conn.send((item.fn, item.args, item.kwargs))
+        self.tasks += 1
+        return self._recv()
+
+    def _recv(self) -> Tuple[bool, Any]:
+        try:
+            ok, value, self.rss = self.conn.recv()
+        except (EOFError, OSError):
+            raise BrokenProcessPool(
+                "A child process terminated abruptly while running a call."
+            ) from None
+
+        return ok, value
+
+    def kill(self) -> None:
+        """Kills the child immediately, interrupting any call it's running."""
+        self.process.kill()
+
+    def close(self) -> None:
+        try:
+            self.conn.send(None)
+        except OSError:
+            pass
+
+        self.process.join(timeout=5)
+        if self.process.is_alive():
+            self.process.terminate()
+            self.process.join()
+
+        self.conn.close()
+
+
+@dataclass(frozen=True)
+class PoolStats:
+    """A snapshot of the load on, and the calls run by, a pool."""
+
+    max_workers: int
+    size: int
+    busy: int
+    pending: int
+    submitted: int
+    completed: int
+    """The number of calls that returned, whether or not they raised an error."""
+    failed: int
+    """The number of calls that raised an error."""
+    cancelled: int
+    """The number of running calls that were cancelled, freeing their slot."""
+
+
+class _Pool(Executor, ABC):
+    """The bookkeeping common to both pools: a queue of calls, and slots to run them."""
+
+    submitted: int = 0
+    """The number of calls submitted to the pool."""
+    completed: int = 0
+    failed: int = 0
+    cancelled: int = 0
+
+    def __init__(self, max_workers: int, resources: Optional[Resources] = None) -> None:
+        self.max_workers = max_workers
+        self.resources = resources
+        self._queue: "SimpleQueue[Optional[_WorkItem]]" = SimpleQueue()
+        self._idle = threading.Semaphore(0)
+        self._slots: List[_Slot] = []
+        self._lock = threading.Lock()
+        self._shutdown = False
+        self._warm = False
+        self._pending = 0
+        self._retiring = 0
+
+    @property
+    def size(self) -> int:
+        """The number of slots, excluding those being retired."""
+        return len(self._slots) - self._retiring
+
+    @property
+    def busy(self) -> int:
+        """The number of slots running a call."""
+        return sum(1 for slot in self._slots if slot.item)
+
+    @property
+    def pending(self) -> int:
+        """The number of calls waiting for a slot."""
+        return self._pending
+
+    def stats(self) -> PoolStats:
+        with self._lock:
+            return PoolStats(
+                self.max_workers,
+                self.size,
+                self.busy,
+                self.pending,
+                self.submitted,
+                self.completed,
+                self.failed,
+                self.cancelled,
+            )
+
+    def resize(self, max_workers: int) -> None:
+        """
+        Changes the number of slots the pool may have. If there are now too many, the
+        excess are retired once the calls already queued have been picked up, and if
+        calls are waiting, slots are added for them right away.
+        """
+        with self._lock:
+            self.max_workers = max_workers
+            for _ in range(self.size - max_workers):
+                self._retiring += 1
+                self._queue.put(None)
+
+            for _ in range(min(self._pending, max_workers - self.size)):
+                self._add_slot(eager=self._warm)
+
+    def start(self) -> None:
+        """
+        Prepares every slot now, rather than as calls need them. Raises the first error
+        raised while preparing them.
+        """
+        with self._lock:
+            self._warm = True
+            prepared = [
+                self._add_slot(eager=True) for _ in range(self.max_workers - self.size)
+            ]
+
+        errors = [error for error in (ready.result() for ready in prepared) if error]
+        if errors:
+            raise errors[0]
+
+    def submit(  # type: ignore[override]
+        self, fn: Callable[..., Any], *args: Any, **kwargs: Any
+    ) -> "Future[Any]":
+        with self._lock:
+            if self._shutdown:
+                raise RuntimeError("cannot schedule new futures after shutdown")
+
+            future = _PoolFuture(self)
+            timed = timings.get()
+            if timed:
+                timed.submitted = monotonic()
+
+            self._queue.put(_WorkItem(future, fn, args, kwargs, timed))
+            self._pending += 1
+            self.submitted += 1
+
+            # reuse an idle slot if there is one, otherwise add one if there's room
+            if not self._idle.acquire(blocking=False):
+                if self.size < self.max_workers:
+                    self._add_slot(eager=False)
+
+            return future
+
+    def shutdown(self, wait: bool = True, *, cancel_futures: bool = False) -> None:
+        with self._lock:
+            self._shutdown = True
+            slots = list(self._slots)
+
+        if cancel_futures:
+            while not self._queue.empty():
+                item = self._queue.get()
+                if item:
+                    with self._lock:
+                        self._pending -= 1
+
+                    item.future.cancel()
+
+        for _ in slots:
+            self._queue.put(None)
+
+        if wait:
+            for slot in slots:
+                slot.thread.join()
+
+    def _add_slot(self, eager: bool) -> "Future[Optional[BaseException]]":
+        ready: "Future[Optional[BaseException]]" = Future()
+        slot = _Slot()
+        slot.thread = threading.Thread(
+            target=self._work,
+            args=(slot, ready, eager),
+            name=f"{type(self).__name__}-{len(self._slots)}",
+            daemon=True,
+        )
+        self._slots.append(slot)
+        slot.thread.start()
+        return ready
+
+    def _work(
+        self, slot: _Slot, ready: "Future[Optional[BaseException]]", eager: bool
+    ) -> None:
+        if eager:
+            try:
+                self._prepare(slot)
+            except BaseException as e:
+                ready.set_result(e)
+            else:
+                ready.set_result(None)
+                self._idle.release()
+        else:
+            ready.set_result(None)
+
+        try:
+            while True:
+                item = self._queue.get()
+                if item is None:
+                    return
+
+                with self._lock:
+                    self._pending -= 1
+                    if not item.future.set_running_or_notify_cancel():
+                        self._idle.release()
+                        continue
+
+                    slot.item = item
+
+                if item.timings:
+                    item.timings.started = monotonic()
+                try:
+                    ok, value = self._run(slot, item)
+                except BaseException as e:
+                    ok, value = False, e
+                if item.timings:
+                    item.timings.finished = monotonic()
+
+                with self._lock:
+                    slot.item = None
+                    if slot.abandoned:
+                        # the call's future was cancelled and the slot replaced
+                        return
+
+                    self.completed += 1
+                    self.failed += not ok
+
+                if ok:
+                    item.future.set_result(value)
+                else:
+                    item.future.set_exception(value)
+
+                del item, value
+                self._after(slot)
+                self._idle.release()
+        finally:
+            with self._lock:
+                if slot in self._slots:
+                    self._slots.remove(slot)
+                    if self._retiring:
+                        # the slot was idle, and won't be anymore
+                        self._retiring -= 1
+                        self._idle.acquire(blocking=False)
+
+            self._release(slot)
+
+    def _abort(self, future: _PoolFuture) -> bool:
+        with self._lock:
+            slot = next(
+                (s for s in self._slots if s.item and s.item.future is future), None
+            )
+            if not slot:
+                return False
+
+            slot.abandoned = True
+            self.cancelled += 1
+            self._slots.remove(slot)
+            self._interrupt(slot)
+            if not self._shutdown and self.size < self.max_workers:
+                # keep the pool's capacity, rather than waiting for the call to return
+                self._add_slot(eager=self._warm)
+
+        future._cancel_running()
+        return True
+
+    def _prepare(self, slot: _Slot) -> None:
+        """Readies a slot before it runs any calls."""
+
+    @abstractmethod
+    def _run(self, slot: _Slot, item: _WorkItem) -> Tuple[bool, Any]:
+        """
+        Runs a call in a slot, returning if it succeeded and its result or error. Slots
+        that are aborted while being prepared must not start the call.
+        """
+
+    def _after(self, slot: _Slot) -> None:
+        """Tidies up a slot after its call returns."""
+
+    def _interrupt(self, slot: _Slot) -> None:
+        """Stops the call a slot is running as best as possible."""
+
+    def _release(self, slot: _Slot) -> None:
+        """Frees anything a slot holds once it stops."""
+
+
+class ThreadPool(_Pool):
+    """
+    An executor that runs calls in a pool of threads, like a `ThreadPoolExecutor`.
+    Cancelling a running call replaces its thread, which is left to finish the call.
+    Each thread creates its resources before running its first call.
+    """
+
+    def __init__(
+        self, max_workers: Optional[int] = None, resources: Optional[Resources] = None
+    ) -> None:
+        super().__init__(max_workers or min(32, (os.cpu_count() or 1) + 4), resources)
+
+    def _prepare(self, slot: _Slot) -> None:
+        if self.resources:
+            # prepared in the slot's own thread, so its resources are local to it
+            with ExitStack() as stack:
+                _local.resources = stack.enter_context(self.resources())
+                slot.resources = stack.pop_all()
+
+    def _run(self, slot: _Slot, item: _WorkItem) -> Tuple[bool, Any]:
+        if self.resources and slot.resources is None:
+            self._prepare(slot)
+            if slot.abandoned:
+                raise CancelledError()
+
+        return True, item.fn(*item.args, **item.kwargs)
+
+    def _release(self, slot: _Slot) -> None:
+        if slot.resources:
+            slot.resources.close()
+            slot.resources = None
+            _local.resources = {}
+
+
+class ProcessPool(_Pool):
+    """
+    An executor that runs calls in a pool of child processes, like a
+    `ProcessPoolExecutor`. Children are spawned as calls need them unless the pool is
+    started ahead of time, and each runs the initializer and creates its resources
+    before accepting any calls.
+
+    Children are replaced once they've run `max_tasks_per_child` calls, or once their
+    resident set size exceeds `max_memory_per_child` bytes after a call. Since they
+    only ever run one call at a time, no call is interrupted by their replacement.
+    Cancelling a running call kills and replaces its child.
+    """
+
+    preloaded: FrozenSet[str] = frozenset()
+    """
+    The names of the jobs the initializer declares in every child, so they can be sent
+    by name rather than by value.
+    """
+
+    recycled: int = 0
+    """The number of children replaced for running too many calls or growing too big."""
+
+    killed: int = 0
+    """The number of children killed because their call was cancelled."""
+
+    def __init__(
+        self,
+        max_workers: Optional[int] = None,
+        initializer: Optional[Callable[..., Any]] = None,
+        initargs: Tuple[Any, ...] = (),
+        max_tasks_per_child: Optional[int] = None,
+        max_memory_per_child: Optional[int] = None,
+        resources: Optional[Resources] = None,
+    ) -> None:
+        super().__init__(max_workers or os.cpu_count() or 1, resources)
+        self.max_tasks_per_child = max_tasks_per_child
+        self.max_memory_per_child = max_memory_per_child
+        self._initializer = initializer
+        self._initargs = initargs
+        self._mp = multiprocessing.get_context()
+
+    def _prepare(self, slot: _Slot) -> None:
+        slot.child = _Child(self)
+
+    def _run(self, slot: _Slot, item: _WorkItem) -> Tuple[bool, Any]:
+        if slot.child is None:
+            self._prepare(slot)
+            # the child couldn't be killed while it was spawning, so the call would
+            # otherwise still run. aborts from here on kill it
+            if slot.abandoned:
+                raise CancelledError()
+
+        try:
+            return cast(_Child, slot.child).call(item)
+        except BrokenProcessPool:
+            # replace the child the next time it's needed
+            self._release(slot)
+            raise
+
+    def _after(self, slot: _Slot) -> None:
+        child = slot.child
+        if not (child and self._exhausted(child)):
+            return
+
+        self._release(slot)
+        with self._lock:
+            self.recycled += 1
+
+        if self._warm:
+            # keep a warmed up pool warm. if the replacement can't be spawned, it's
+            # retried by the next call
+            try:
+                self._prepare(slot)
+            except BaseException:
+                pass
+
+    def _interrupt(self, slot: _Slot) -> None:
+        if slot.child:
+            slot.child.kill()
+            self.killed += 1
+
+    def _release(self, slot: _Slot) -> None:
+        if slot.child:
+            slot.child.close()
+            slot.child = None
+
+    def _exhausted(self, child: _Child) -> bool:
+        return (
+            self.max_tasks_per_child is not None
+            and child.tasks >= self.max_tasks_per_child
+        ) or (
+            self.max_memory_per_child is not None
+            and child.rss is not None
+            and child.rss > self.max_memory_per_child
+        )
@@ -1,4 +1,6 @@
+from dataclasses import dataclass
 from enum import Enum
+from typing import Optional
 
 
 class JobType(Enum):
@@ -16,5 +18,23 @@ class JobType(Enum):
     """
     CPU-bound tasks typically perform many contiguous operations (like complex
     calculations) rather than wait for external services. Because they operate 
-    continuously and hold the GIL, CPU-bound jobs run in a ProcessPoolExecutor.
+    continuously and hold the GIL, CPU-bound jobs run in a process pool.
     """
+
+
+@dataclass(frozen=True)
+class ExecutorPool:
+    """
+    A named executor declared on WorkerSettings, which jobs may target to run apart
+    from all others of their type. It's a thread pool if its jobs are IO-bound, or a
+    process pool if they're CPU-bound.
+    """
+
+    job_type: JobType
+    max_workers: Optional[int] = None
+    """
+    The most threads or processes the pool may have. Defaults to the same number as
+    the shared pool of its type.
+    """
+    min_workers: int = 1
+    """The fewest threads or processes to which the pool is scaled, if autoscaling."""
@@ -1,23 +1,72 @@
 import asyncio
+import importlib
 import inspect
+import pickle
 import warnings
 from dataclasses import dataclass, field
 from functools import partial, update_wrapper
-from typing import Any, Awaitable, Callable, Generic, Optional, Union, cast
+from itertools import islice
+from time import monotonic, perf_counter
+from typing import (
+    Any,
+    AsyncIterator,
+    Awaitable,
+    Callable,
+    Dict,
+    Generic,
+    Iterable,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
+    cast,
+)
 
 import dill  # type: ignore
+from arq.jobs import Job
 from arq.typing import SecondsTimedelta, WorkerCoroutine
 from arq.utils import to_seconds
 from arq.worker import Function
-from colorama import Fore, Style
 
+from .batching import BatchCall, Batcher
+from .broker import Broker, JobRequest
+from .cache import JobCache
+from .executors import (
+    CallTimings,
+    CancelToken,
+    ProcessPool,
+    current_resources,
+    run_coroutine,
+    timings,
+)
 from .job_type import JobType
+from .metrics import MetricsSink
+from .serialization import DeferredArgs, MapChunk
+from .sharding import ShardedBroker
+from .transport import SharedMemoryTransport
 from .typing import (
     ArqCallable,
     Context,
     ReturnType,
 )
-from .utils import convert_kwargs, styled_text
+from .utils import CallPlan
+
+_PRIVATE_CONTEXT = frozenset(
+    (
+        "redis",
+        "_executors",
+        "_transport",
+        "_logging",
+        "_autoscaler",
+        "_batches",
+        "_cache",
+        "_metrics",
+    )
+)
+
+registry: Dict[str, "_job[Any]"] = {}
+"""Every declared job by name, so serializers can look up how to handle its payload."""
 
 
 @dataclass
@@ -27,15 +76,22 @@ class _job(Function, Generic[ReturnType]):
     func: ArqCallable[ReturnType]
     iscoro: bool = field(init=False, default=False)
     job_type: Optional[JobType] = None
+    defer_args: bool = False
+    executor: Optional[str] = None
+    batch_size: Optional[int] = None
+    batch_wait: float = 0.05
+    cache_ttl: Optional[float] = None
+    blob_threshold: Optional[int] = None
+    plan: CallPlan = field(init=False, repr=False)
 
     def __post_init__(self) -> None:
         if inspect.iscoroutinefunction(self.func):
-            # async jobs always run in the thread of the event loop, even if
-            # they're CPU-bound.
-            if self.job_type:
+            # async jobs run in the thread of the event loop unless they're CPU-bound,
+            # in which case they run in the event loop of a process
+            if self.job_type is JobType.IO_BOUND:
                 warnings.warn(
-                    "Specifying a JobType on an asynchronous job does not affect how"
-                    " it is executed.",
+                    "Specifying an IO-bound JobType on an asynchronous job does not"
+                    " affect how it is executed.",
                     stacklevel=2,
                 )
 
@@ -46,8 +102,42 @@ class _job(Function, Generic[ReturnType]):
                 " or CPU-bound via a JobType."
             )
 
+        if self.executor and self.iscoro and self.job_type is not JobType.CPU_BOUND:
+            raise TypeError(
+                "Asynchronous jobs run in the event loop unless they're CPU-bound, so"
+                " they can't target an executor pool."
+            )
+
+        if self.defer_args and self.job_type is not JobType.CPU_BOUND:
+            raise TypeError(
+                "Only CPU-bound jobs can defer decoding their arguments to the process"
+                " that runs them."
+            )
+
+        if self.batch_size is not None:
+            if self.batch_size < 1:
+                raise ValueError("Jobs must be batched in batches of at least 1 call.")
+            elif self.defer_args:
+                raise TypeError(
+                    "Batched jobs can't defer decoding their arguments, since the"
+                    " worker collects them into a batch."
+                )
+
+        if self.blob_threshold is not None and self.blob_threshold < 0:
+            raise ValueError("Jobs can't offload payloads smaller than 0 bytes.")
+
+        self.plan = CallPlan.compile(self.func)
         self.coroutine = self.run
         update_wrapper(self, self.func)
+        registry[self.name] = self
+
+    @property
+    def packs_args(self) -> bool:
+        """
+        If the job's arguments are enqueued still encoded, either to be forwarded to the
+        process that runs it as-is, or to be hashed as-is into its cache key.
+        """
+        return self.defer_args or self.cache_ttl is not None
 
     async def now(self, *args: Any, **kwargs: Any) -> ReturnType:
         warnings.warn(
@@ -71,24 +161,264 @@ class _job(Function, Generic[ReturnType]):
         the job or the result of the job is an asynchronous coroutine, it will
         be also be awaited.
         """
-        nkwargs = convert_kwargs(None, self.func, args, kwargs)
-        return self.func(**nkwargs)
+        nargs, nkwargs = self.plan.bind(None, args, kwargs)
+        return self.func(*nargs, **nkwargs)
 
     async def run(self, ctx: Context, *args: Any, **kwargs: Any) -> ReturnType:
+        metrics: Optional[MetricsSink] = ctx.get("_metrics")
+        if metrics is None:
+            return await self._memoize(ctx, args, kwargs)
+
+        start, outcome = perf_counter(), "failure"
+        try:
+            result = await self._memoize(ctx, args, kwargs)
+            outcome = "success"
+            return result
+        except asyncio.CancelledError:
+            outcome = "cancelled"
+            raise
+        finally:
+            metrics.observe(self.name, "total", perf_counter() - start)
+            metrics.count(self.name, outcome)
+
+    async def _memoize(
+        self, ctx: Context, args: Tuple[Any, ...], kwargs: Dict[str, Any]
+    ) -> ReturnType:
+        cache: Optional[JobCache] = ctx.get("_cache")
+        if self.cache_ttl is None or cache is None:
+            return await self._dispatch(ctx, args, kwargs)
+
+        return cast(
+            ReturnType,
+            await cache.get_or_run(
+                cache.key(self.name, args, kwargs),
+                self.cache_ttl,
+                lambda: self._dispatch(ctx, args, kwargs),
+            ),
+        )
+
+    async def _dispatch(
+        self, ctx: Context, args: Tuple[Any, ...], kwargs: Dict[str, Any]
+    ) -> ReturnType:
+        if self.batch_size is None:
+            return await self._execute(ctx, args, kwargs)
+
+        # batched jobs are invoked with many calls at once, collected by the worker
+        batches = ctx.get("_batches")
+        if batches is None:
+            batcher = Batcher(1, 0, self._invoke_batch)
+        elif self.name in batches:
+            batcher = batches[self.name]
+        else:
+            batcher = batches[self.name] = Batcher(
+                self.batch_size, self.batch_wait, self._invoke_batch
+            )
+
+        if len(args) == 1 and isinstance(args[0], DeferredArgs):
+            # packed for the cache key, but the worker collects the batch's arguments
+            args, kwargs = args[0].load()
+
+        call = BatchCall(args, kwargs, ctx.get("job_id"))
+        return cast(ReturnType, await batcher.submit(ctx, call))
+
+    async def _invoke_batch(self, ctx: Context, calls: List[BatchCall]) -> List[Any]:
+        return cast(List[Any], await self._execute(ctx, (calls,), {}))
+
+    async def _execute(
+        self, ctx: Context, args: Tuple[Any, ...], kwargs: Dict[str, Any]
+    ) -> ReturnType:
+        metrics: Optional[MetricsSink] = ctx.get("_metrics")
+        if metrics is None:
+            return await self._submit(ctx, args, kwargs)
+
+        # the executor records when the job waited and ran, if it's submitted to one
+        start, timed = monotonic(), CallTimings()
+        reset = timings.set(timed)
+        try:
+            return await self._submit(ctx, args, kwargs)
+        finally:
+            timings.reset(reset)
+            if not timed.submitted:
+                metrics.observe(self.name, "execute", monotonic() - start)
+            elif timed.queued is not None:
+                metrics.observe(self.name, "queue", timed.queued)
+                if timed.ran is not None:
+                    metrics.observe(self.name, "execute", timed.ran)
+
+    async def _submit(
+        self, ctx: Context, args: Tuple[Any, ...], kwargs: Dict[str, Any]
+    ) -> ReturnType:
         # we shouldn't / cannot pickle the redis instance nor underlying context
         # executors, so remove them from the context
-        nctx = {k: ctx[k] for k in ctx if k not in ["redis", "_executors"]}
-        nkwargs = convert_kwargs(nctx, self.func, args, kwargs)
-
-        with styled_text(Fore.BLACK, Style.BRIGHT):
-            if not self.iscoro:
-                executor = ctx["_executors"][self.job_type]
-                serialized = dill.dumps(partial(self.func, **nkwargs))
-                return await asyncio.get_running_loop().run_in_executor(
-                    executor, _job._dill_executor_func, serialized
+        nctx = {k: ctx[k] for k in ctx if k not in _PRIVATE_CONTEXT}
+        inloop = self.iscoro and self.job_type is not JobType.CPU_BOUND
+        executor = None if inloop else ctx["_executors"][self.executor or self.job_type]
+        transport: Optional[SharedMemoryTransport] = ctx.get("_transport")
+
+        deferred = None
+        if len(args) == 1 and isinstance(args[0], DeferredArgs):
+            if isinstance(executor, ProcessPool):
+                # forward the arguments as they were enqueued, so they're only
+                # ever decoded in the process that runs the job
+                data = args[0].data
+                deferred = pickle.PickleBuffer(data) if transport else data
+                args, kwargs = (), {}
+            else:
+                args, kwargs = args[0].load()
+
+        if isinstance(executor, ProcessPool):
+            if self.name in executor.preloaded:
+                # the pool's processes have declared this job too, so it's sent by
+                # name rather than shipping the function itself
+                call = partial(
+                    _job._call_named, self.name, nctx, args, kwargs, deferred
                 )
             else:
-                return await cast(Awaitable[ReturnType], self.func(**nkwargs))
+                call = partial(
+                    _job._call,
+                    cast(Callable[..., ReturnType], self.func),
+                    self.plan,
+                    nctx,
+                    args,
+                    kwargs,
+                    deferred,
+                )
+
+            return await self._run_in_process(
+                executor, transport, call, ctx.get("_metrics")
+            )
+
+        if inloop:
+            if len(args) == 1 and isinstance(args[0], MapChunk):
+                return cast(ReturnType, await self._apply(args[0], nctx, kwargs))
+
+            nargs, nkwargs = self.plan.bind(nctx, args, kwargs)
+            return await cast(Awaitable[ReturnType], self.func(*nargs, **nkwargs))
+
+        # threads can't be interrupted, so they're told when to stop instead
+        token = nctx["cancel_token"] = CancelToken()
+
+        # threads share our address space, so the job can be handed over as-is
+        bound = partial(
+            _job._call,
+            cast(Callable[..., ReturnType], self.func),
+            self.plan,
+            nctx,
+            args,
+            kwargs,
+        )
+        try:
+            return await asyncio.get_running_loop().run_in_executor(executor, bound)
+        except asyncio.CancelledError:
+            token.cancel()
+            raise
+
+    async def _apply(
+        self, chunk: MapChunk, ctx: Context, kwargs: Dict[str, Any]
+    ) -> List[Tuple[bool, Any]]:
+        # the coroutine equivalent of `MapChunk.apply`
+        outcomes: List[Tuple[bool, Any]] = []
+        for item in chunk.items:
+            nargs, nkwargs = self.plan.bind(ctx, (item,), kwargs)
+            try:
+                result = await cast(Awaitable[Any], self.func(*nargs, **nkwargs))
+                outcomes.append((True, result))
+            except Exception as e:
+                outcomes.append((False, e))
+
+        return outcomes
+
+    async def map(
+        self,
+        broker: Union[Broker, ShardedBroker],
+        iterable: Iterable[Any],
+        *,
+        chunksize: int = 1,
+        ordered: bool = True,
+        max_in_flight: int = 16,
+        poll_delay: float = 0.5,
+        queue_name: Optional[str] = None,
+        **kwargs: Any,
+    ) -> AsyncIterator[ReturnType]:
+        """
+        Calls the job with each item of the iterable as its first argument, and the
+        given keyword arguments, yielding the result of each call. The items are split
+        into chunks of `chunksize`, each of which is enqueued as one job, and at most
+        `max_in_flight` chunks are enqueued at once. Results are yielded in the order of
+        the iterable, or as soon as their chunk completes if not `ordered`.
+
+        An error raised by a call is raised when its result would have been yielded.
+        Results of the other calls in its chunk are unaffected.
+        """
+        if chunksize < 1:
+            raise ValueError("Jobs must be mapped in chunks of at least 1 item.")
+        elif max_in_flight < 1:
+            raise ValueError("Jobs must be mapped with at least 1 chunk in flight.")
+
+        items = iter(iterable)
+        chunks = iter(lambda: list(islice(items, chunksize)), [])
+        pending: Dict["asyncio.Future[Any]", int] = {}
+        completed: Dict[int, List[Tuple[bool, Any]]] = {}
+        enqueued = yielded = 0
+
+        try:
+            while True:
+                batch = list(islice(chunks, max_in_flight - len(pending)))
+                if batch:
+                    jobs = await broker.enqueue_jobs(
+                        [self._map_request(chunk, kwargs) for chunk in batch],
+                        queue_name=queue_name,
+                    )
+                    for job in jobs:
+                        result = cast(Job, job).result(poll_delay=poll_delay)
+                        pending[asyncio.ensure_future(result)] = enqueued
+                        enqueued += 1
+
+                if not pending:
+                    return
+
+                done, _ = await asyncio.wait(
+                    pending, return_when=asyncio.FIRST_COMPLETED
+                )
+                for future in done:
+                    completed[pending.pop(future)] = future.result()
+
+                # yield the results of every chunk that can be, in order if need be
+                while completed:
+                    index = yielded if ordered else next(iter(completed))
+                    if index not in completed:
+                        break
+
+                    for ok, value in completed.pop(index):
+                        if not ok:
+                            raise value
+                        yield value
+
+                    yielded += 1
+        finally:
+            for future in pending:
+                future.cancel()
+
+    def _map_request(self, chunk: List[Any], kwargs: Dict[str, Any]) -> JobRequest:
+        return JobRequest(self.name, (MapChunk(chunk),), kwargs)
+
+    async def _run_in_process(
+        self,
+        executor: ProcessPool,
+        transport: Optional[SharedMemoryTransport],
+        call: Callable[[], ReturnType],
+        metrics: Optional[MetricsSink] = None,
+    ) -> ReturnType:
+        if transport:
+            return cast(ReturnType, await transport.run(executor, call))
+
+        start = perf_counter()
+        serialized = dill.dumps(call)
+        if metrics:
+            metrics.observe(self.name, "serialize", perf_counter() - start)
+        return await asyncio.get_running_loop().run_in_executor(
+            executor, _job._dill_executor_func, serialized
+        )
 
     @staticmethod
     def _dill_executor_func(serialized: bytes) -> ReturnType:
@@ -96,6 +426,55 @@ class _job(Function, Generic[ReturnType]):
         partial: Callable[[], ReturnType] = dill.loads(serialized)
         return partial()
 
+    @staticmethod
+    def _call(
+        func: Callable[..., ReturnType],
+        plan: CallPlan,
+        ctx: Context,
+        args: Tuple[Any, ...],
+        kwargs: Dict[str, Any],
+        deferred: Any = None,
+    ) -> ReturnType:
+        # deferred arguments are either bytes or, if mapped from shared memory, a
+        # buffer, and are decoded only now
+        if deferred is not None:
+            args, kwargs = dill.loads(deferred)
+
+        if len(args) == 1 and isinstance(args[0], MapChunk):
+            return cast(
+                ReturnType,
+                args[0].apply(
+                    lambda item: _job._call(func, plan, ctx, (item,), kwargs)
+                ),
+            )
+
+        # the resources of the thread or process the job is running in
+        ctx["resources"] = current_resources()
+        nargs, nkwargs = plan.bind(ctx, args, kwargs)
+        if inspect.iscoroutinefunction(func):
+            # CPU-bound coroutines run on the process' own, long-lived event loop
+            return cast(ReturnType, run_coroutine(func(*nargs, **nkwargs)))
+
+        return func(*nargs, **nkwargs)
+
+    @staticmethod
+    def _call_named(
+        name: str,
+        ctx: Context,
+        args: Tuple[Any, ...],
+        kwargs: Dict[str, Any],
+        deferred: Any = None,
+    ) -> Any:
+        definition = registry[name]
+        func = cast(Callable[..., Any], definition.func)
+        return _job._call(func, definition.plan, ctx, args, kwargs, deferred)
+
+
+def preload(modules: Sequence[str]) -> None:
+    """Imports the given modules, declaring the jobs within them in this process."""
+    for module in modules:
+        importlib.import_module(module)
+
 
 def job(
     job_type: Optional[JobType] = None,
@@ -104,18 +483,53 @@ def job(
     timeout: Optional[SecondsTimedelta] = None,
     keep_result_forever: Optional[bool] = None,
     max_tries: Optional[int] = None,
+    defer_args: bool = False,
+    executor: Optional[str] = None,
+    batch_size: Optional[int] = None,
+    batch_wait: float = 0.05,
+    cache_ttl: Optional[SecondsTimedelta] = None,
+    blob_threshold: Optional[int] = None,
 ) -> Callable[[ArqCallable[Any]], _job[Any]]:
     """
     Creates an async enqueueable job from the provided function. The function may be
     synchronous or a coroutine. If synchronous, the job will be run in either a
     thread or process depending on its `JobType`.
 
-    Synchronous jobs are required to specify their `job_type`. If a job type is
-    specified for a coroutine, a warning will be thrown (but will still execute).
+    Synchronous jobs are required to specify their `job_type`. Coroutines run in the
+    worker's event loop unless they're CPU-bound, in which case they run in the event
+    loop of a process from the process pool. If an IO-bound job type is specified for
+    a coroutine, a warning will be thrown (but will still execute).
+
+    CPU-bound jobs may set `defer_args` to have their arguments decoded only in the
+    process that runs them, rather than by the worker and then again by that process.
+    Arguments are only deferred if the job has been declared wherever it is enqueued.
+
+    Synchronous jobs may name an `ExecutorPool` declared on the WorkerSettings that
+    runs them as their `executor`, to run in it instead of the pool shared by every
+    other job of their type.
+
+    Jobs may set `batch_size` to have the worker collect their calls and invoke them
+    once with a list of up to that many `BatchCall`s, after at most `batch_wait`
+    seconds. They must return a result for each call, in order, or an exception to
+    fail only that call.
+
+    Deterministic jobs may set `cache_ttl` to have their results memoized for that long,
+    by their name and arguments. Calls whose result is cached aren't run at all.
+
+    Jobs with large arguments or results may set `blob_threshold` to have those
+    encoded to at least that many bytes written to the WorkerSettings' `blob_store`,
+    with only a pointer to them kept in Redis. Like deferred arguments, arguments are
+    only offloaded if the job has been declared wherever it is enqueued.
     """
     return lambda func: _job(
         func=func,
         job_type=job_type,
+        defer_args=defer_args,
+        executor=executor,
+        batch_size=batch_size,
+        batch_wait=batch_wait,
+        cache_ttl=to_seconds(cache_ttl),
+        blob_threshold=blob_threshold,
         # inherited
         name=name or func.__qualname__,
         timeout_s=to_seconds(timeout),
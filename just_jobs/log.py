@@ -0,0 +1,87 @@
+"""
+Logging for just-jobs. Records are handed to a queue on the event loop and written by
+a background thread, so logging never blocks a worker on its output stream.
+"""
+
+import logging
+from logging.handlers import QueueHandler, QueueListener
+from queue import SimpleQueue
+from typing import Any, Optional
+
+from colorama import Fore, Style
+
+logger = logging.getLogger("just_jobs")
+
+FORMAT = "[justjobs] %(message)s"
+
+
+class StyledFormatter(logging.Formatter):
+    """Colors each record by its level."""
+
+    STYLES = {
+        logging.DEBUG: Style.DIM,
+        logging.INFO: Fore.BLUE + Style.DIM,
+        logging.WARNING: Fore.YELLOW,
+        logging.ERROR: Fore.RED,
+        logging.CRITICAL: Fore.RED + Style.BRIGHT,
+    }
+
+    def format(self, record: logging.LogRecord) -> str:
+        style = self.STYLES.get(record.levelno, "")
+        return f"{style}{super().format(record)}{Style.RESET_ALL}"
+
+
+def _isatty(handler: logging.Handler) -> bool:
+    stream: Any = getattr(handler, "stream", None)
+    try:
+        return bool(stream and stream.isatty())
+    except ValueError:
+        # the stream has been closed
+        return False
+
+
+class LogListener:
+    """
+    Writes the records of the just-jobs logger to a handler from a background thread
+    for as long as it's running. Meanwhile, they aren't propagated to the root logger,
+    whose handlers would write them on the event loop.
+    """
+
+    def __init__(
+        self,
+        handler: Optional[logging.Handler] = None,
+        level: int = logging.INFO,
+        styled: Optional[bool] = None,
+    ) -> None:
+        self.handler = handler or logging.StreamHandler()
+        self.level = level
+
+        if self.handler.formatter is None:
+            # only style output bound for a terminal, unless told otherwise
+            if _isatty(self.handler) if styled is None else styled:
+                self.handler.setFormatter(StyledFormatter(FORMAT))
+            else:
+                self.handler.setFormatter(logging.Formatter(FORMAT))
+
+        queue: "SimpleQueue[Any]" = SimpleQueue()
+        self._queue_handler = QueueHandler(queue)
+        self._listener = QueueListener(queue, self.handler, respect_handler_level=True)
+        self._previous = (logger.level, logger.propagate)
+
+    def start(self) -> None:
+        """Starts writing records in the background."""
+        self._listener.start()
+        self._previous = (logger.level, logger.propagate)
+        logger.addHandler(self._queue_handler)
+        logger.setLevel(self.level)
+        logger.propagate = False
+
+    def stop(self) -> None:
+        """
+        Stops writing records, once every record logged so far has been written, and
+        restores the logger's level and propagation.
+        """
+        logger.removeHandler(self._queue_handler)
+        level, logger.propagate = self._previous
+        logger.setLevel(level)
+        self._listener.stop()
@@ -0,0 +1,186 @@
+"""
+Instrumentation of job execution. While a worker has a sink, each job records how long
+it spent in every phase of its execution, by job name:
+
+- `deserialize`: verifying and decoding the job, or its result.
+- `serialize`: encoding a CPU-bound job to hand it to a process.
+- `queue`: waiting for a slot of its executor.
+- `execute`: running the job's function.
+- `total`: everything between the worker starting the job and it finishing.
+
+and is counted by its outcome, either `success`, `failure` or `cancelled`. The current
+load on each executor is read from the worker whenever the sink is collected.
+
+Without a sink, none of this is measured.
+"""
+
+from bisect import bisect_left
+from dataclasses import dataclass, field
+from threading import Lock
+from typing import Callable, Dict, List, Optional, Tuple
+
+from .executors import PoolStats
+
+BUCKETS = (
+    0.0001,
+    0.0005,
+    0.001,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+    60.0,
+)
+"""The upper bounds, in seconds, of the buckets of every phase's histogram."""
+
+
+class MetricsSink:
+    """
+    Receives the measurements of a worker's jobs. Subclasses override whichever
+    measurements they're interested in; by default they're all discarded.
+    """
+
+    def observe(self, job: str, phase: str, seconds: float) -> None:
+        """Records the time a job spent in a phase of its execution."""
+
+    def count(self, job: str, outcome: str) -> None:
+        """Records that a job finished with the given outcome."""
+
+    def track(self, executors: Callable[[], Dict[str, PoolStats]]) -> None:
+        """Provides a snapshot of the worker's executors whenever it's called."""
+
+
+@dataclass
+class Histogram:
+    """The distribution of a phase's times, in cumulative buckets."""
+
+    bounds: Tuple[float, ...] = BUCKETS
+    counts: List[int] = field(default_factory=list)
+    """The number of times in each bucket, plus those above every bound."""
+    sum: float = 0.0
+    count: int = 0
+
+    def __post_init__(self) -> None:
+        if not self.counts:
+            self.counts = [0] * (len(self.bounds) + 1)
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self) -> List[int]:
+        """The number of times at or below each bound, then of all times."""
+        totals, total = [], 0
+        for count in self.counts:
+            total += count
+            totals.append(total)
+
+        return totals
+
+
+class InMemorySink(MetricsSink):
+    """Keeps every measurement in memory, to be read directly."""
+
+    def __init__(self, buckets: Tuple[float, ...] = BUCKETS) -> None:
+        self.buckets = buckets
+        self.histograms: Dict[Tuple[str, str], Histogram] = {}
+        """The times of each job's phases, by job name and phase."""
+        self.counters: Dict[Tuple[str, str], int] = {}
+        """The number of each job's outcomes, by job name and outcome."""
+        self._executors: Optional[Callable[[], Dict[str, PoolStats]]] = None
+        self._lock = Lock()
+
+    def observe(self, job: str, phase: str, seconds: float) -> None:
+        with self._lock:
+            histogram = self.histograms.get((job, phase))
+            if histogram is None:
+                histogram = self.histograms[job, phase] = Histogram(self.buckets)
+
+            histogram.observe(seconds)
+
+    def count(self, job: str, outcome: str) -> None:
+        with self._lock:
+            self.counters[job, outcome] = self.counters.get((job, outcome), 0) + 1
+
+    def track(self, executors: Callable[[], Dict[str, PoolStats]]) -> None:
+        self._executors = executors
+
+    def executors(self) -> Dict[str, PoolStats]:
+        """The current load on each of the worker's executors, if it's running."""
+        return self._executors() if self._executors else {}
+
+
+class PrometheusSink(InMemorySink):
+    """Keeps every measurement in memory, to be rendered for Prometheus to scrape."""
+
+    def __init__(
+        self, namespace: str = "just_jobs", buckets: Tuple[float, ...] = BUCKETS
+    ) -> None:
+        super().__init__(buckets)
+        self.namespace = namespace
+
+    def render(self) -> str:
+        """Renders every measurement in the Prometheus text exposition format."""
+        ns = self.namespace
+        with self._lock:
+            histograms = {
+                key: (histogram.cumulative(), histogram.sum, histogram.count)
+                for key, histogram in sorted(self.histograms.items())
+            }
+            counters = sorted(self.counters.items())
+
+        lines = [
+            f"# HELP {ns}_job_phase_seconds Time spent in each phase of a job.",
+            f"# TYPE {ns}_job_phase_seconds histogram",
+        ]
+        for (job, phase), (cumulative, total, count) in histograms.items():
+            labels = f'job="{_escape(job)}",phase="{phase}"'
+            for bound, value in zip(self.buckets, cumulative):
+                lines.append(
+                    f'{ns}_job_phase_seconds_bucket{{{labels},le="{bound}"}} {value}'
+                )
+            lines.append(
+                f'{ns}_job_phase_seconds_bucket{{{labels},le="+Inf"}} {cumulative[-1]}'
+            )
+            lines.append(f"{ns}_job_phase_seconds_sum{{{labels}}} {total}")
+            lines.append(f"{ns}_job_phase_seconds_count{{{labels}}} {count}")
+
+        lines += [
+            f"# HELP {ns}_jobs_total Jobs finished, by outcome.",
+            f"# TYPE {ns}_jobs_total counter",
+        ]
+        for (job, outcome), value in counters:
+            lines.append(
+                f'{ns}_jobs_total{{job="{_escape(job)}",outcome="{outcome}"}} {value}'
+            )
+
+        executors = self.executors()
+        for gauge, help in (
+            ("pending", "Calls waiting for a slot of an executor."),
+            ("busy", "Slots of an executor running a call."),
+            ("size", "Slots of an executor."),
+        ):
+            lines += [
+                f"# HELP {ns}_executor_{gauge} {help}",
+                f"# TYPE {ns}_executor_{gauge} gauge",
+            ]
+            for name, stats in sorted(executors.items()):
+                value = getattr(stats, gauge)
+                lines.append(
+                    f'{ns}_executor_{gauge}{{executor="{_escape(name)}"}} {value}'
+                )
+
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
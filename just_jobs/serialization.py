@@ -0,0 +1,326 @@
+import lzma
+import pickle
+import zlib
+from dataclasses import dataclass, field
+from datetime import datetime
+from functools import partial
+from threading import Lock
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union, cast
+
+import dill  # type: ignore
+from arq.utils import ms_to_datetime
+
+
+@dataclass(frozen=True)
+class DeferredArgs:
+    """
+    The still-serialized arguments of a job that defers decoding them until it runs.
+    A worker passes these along as the job's only argument, so it never holds the
+    decoded copy itself.
+    """
+
+    data: bytes = field(repr=False)
+
+    @classmethod
+    def pack(cls, args: Tuple[Any, ...], kwargs: Dict[str, Any]) -> "DeferredArgs":
+        return cls(dill.dumps((args, kwargs)))
+
+    def load(self) -> Tuple[Tuple[Any, ...], Dict[str, Any]]:
+        args, kwargs = dill.loads(self.data)
+        return args, kwargs
+
+    def __reduce__(self) -> Tuple[Any, ...]:
+        return (DeferredArgs, (self.data,))
+
+    def __repr__(self) -> str:
+        return f"<deferred arguments ({len(self.data)} bytes)>"
+
+
+@dataclass(frozen=True)
+class MapChunk:
+    """
+    A chunk of the inputs of a mapped job, each of which the job is called with in
+    turn. The job's result is the outcome of each call, in order.
+    """
+
+    items: List[Any]
+
+    def apply(self, call: Callable[[Any], Any]) -> List[Tuple[bool, Any]]:
+        """
+        Calls the given function with each item, returning if each call succeeded and
+        either its result or error. Errors don't stop the rest of the chunk.
+        """
+        outcomes: List[Tuple[bool, Any]] = []
+        for item in self.items:
+            try:
+                outcomes.append((True, call(item)))
+            except Exception as e:
+                outcomes.append((False, e))
+
+        return outcomes
+
+
+@dataclass(frozen=True)
+class BlobRef:
+    """
+    A pointer to the encoded arguments or result of a job, offloaded to a
+    `just_jobs.blobs.BlobStore`, which stands in for them in the job's payload. Since
+    the payload is signed, so is the pointer, which carries the signature of the blob.
+    """
+
+    key: str
+    size: int
+    digest: bytes = field(repr=False)
+
+
+@dataclass
+class JobHeader:
+    """
+    A queued job or job result whose metadata has been read, but whose arguments and
+    result have been neither verified nor decoded. They're decoded when first accessed.
+    """
+
+    metadata: Dict[str, Any]
+    """The job's function name, try count, enqueue time and, if finished, outcome."""
+    loader: Callable[[], Dict[str, Any]] = field(repr=False, compare=False)
+    job_id: Optional[str] = None
+    score: Optional[int] = None
+
+    _loaded: Optional[Dict[str, Any]] = field(
+        default=None, init=False, repr=False, compare=False
+    )
+
+    @property
+    def function(self) -> str:
+        return cast(str, self.metadata["f"])
+
+    @property
+    def job_try(self) -> Optional[int]:
+        return cast(Optional[int], self.metadata.get("t"))
+
+    @property
+    def enqueue_time(self) -> datetime:
+        return ms_to_datetime(self.metadata["et"])
+
+    @property
+    def finished(self) -> bool:
+        return "s" in self.metadata
+
+    @property
+    def success(self) -> Optional[bool]:
+        return cast(Optional[bool], self.metadata.get("s"))
+
+    @property
+    def args(self) -> Tuple[Any, ...]:
+        return tuple(self.load()["a"])
+
+    @property
+    def kwargs(self) -> Dict[str, Any]:
+        return cast(Dict[str, Any], self.load()["k"])
+
+    @property
+    def result(self) -> Any:
+        return self.load().get("r")
+
+    def load(self) -> Dict[str, Any]:
+        """Verifies and decodes the entire job, once."""
+        if self._loaded is None:
+            self._loaded = self.loader()
+
+        return self._loaded
+
+
+@dataclass(frozen=True)
+class Codec:
+    """
+    Encodes and decodes job payloads. The name of the codec that encoded a payload is
+    recorded in its signed envelope, so payloads are always decoded by the same codec
+    regardless of which one a worker is configured to encode with.
+
+    `loads` is given a bytes-like object, which may be a `memoryview` of the envelope.
+    """
+
+    name: str
+    dumps: Callable[[Any], bytes] = field(repr=False)
+    loads: Callable[[Union[bytes, memoryview]], Any] = field(repr=False)
+    fallback: Optional[str] = None
+    """
+    The name of the codec with which to encode payloads that this one fails to encode.
+    """
+
+    def encode(self, obj: Any) -> Tuple["Codec", bytes]:
+        """Encodes the given object, returning the codec that encoded it."""
+        try:
+            return self, self.dumps(obj)
+        except Exception:
+            if not self.fallback:
+                raise
+
+            return get_codec(self.fallback).encode(obj)
+
+
+_codecs: Dict[str, Codec] = {}
+
+
+def _valid_name(name: str) -> bool:
+    # names are length-prefixed by a single byte in the envelope's header, and
+    # delimited by `:` and `|` in the legacy one
+    return 0 < len(name.encode("utf-8")) < 256 and not any(c in name for c in ":|")
+
+
+def register_codec(codec: Codec) -> None:
+    """
+    Makes the given codec available to settings and to workers decoding its payloads.
+    Codecs must be registered identically wherever jobs are enqueued or run.
+    """
+    if not _valid_name(codec.name):
+        raise ValueError(f"Invalid codec name '{codec.name}'.")
+    elif codec.name in _codecs:
+        raise ValueError(f"A codec named '{codec.name}' is already registered.")
+
+    _codecs[codec.name] = codec
+
+
+def get_codec(name: str) -> Codec:
+    """Returns the registered codec with the given name."""
+    try:
+        return _codecs[name]
+    except KeyError:
+        raise ValueError(f"No codec named '{name}' is registered.") from None
+
+
+_pickle_dumps = partial(pickle.dumps, protocol=min(5, pickle.HIGHEST_PROTOCOL))
+
+
+def _msgpack() -> Any:
+    try:
+        import msgpack  # type: ignore
+    except ImportError:  # pragma: no cover
+        raise ImportError(
+            "The msgpack codec requires msgpack. Install it with"
+            " `pip install just-jobs[msgpack]`."
+        ) from None
+
+    return msgpack
+
+
+def _msgpack_default(obj: Any) -> Any:
+    if isinstance(obj, DeferredArgs):
+        return _msgpack().ExtType(1, obj.data)
+    elif isinstance(obj, MapChunk):
+        return _msgpack().ExtType(
+            2, _msgpack().packb(obj.items, default=_msgpack_default)
+        )
+    elif isinstance(obj, BlobRef):
+        return _msgpack().ExtType(3, _msgpack().packb([obj.key, obj.size, obj.digest]))
+
+    raise TypeError(f"Cannot encode {type(obj).__qualname__} with msgpack.")
+
+
+def _msgpack_ext_hook(code: int, data: bytes) -> Any:
+    if code == 1:
+        return DeferredArgs(data)
+    elif code == 2:
+        return MapChunk(
+            _msgpack().unpackb(data, ext_hook=_msgpack_ext_hook, strict_map_key=False)
+        )
+    elif code == 3:
+        return BlobRef(*_msgpack().unpackb(data))
+
+    return _msgpack().ExtType(code, data)
+
+
+register_codec(Codec("dill", dill.dumps, dill.loads))
+register_codec(Codec("pickle", _pickle_dumps, pickle.loads))
+register_codec(Codec("pickle-dill", _pickle_dumps, pickle.loads, fallback="dill"))
+register_codec(
+    Codec(
+        "msgpack",
+        lambda obj: _msgpack().packb(obj, default=_msgpack_default),
+        lambda data: _msgpack().unpackb(
+            data, ext_hook=_msgpack_ext_hook, strict_map_key=False
+        ),
+    )
+)
+
+
+@dataclass(frozen=True)
+class Compressor:
+    """
+    Compresses serialized job payloads. Like codecs, the name of the compressor used
+    on a payload is recorded in its signed envelope.
+    """
+
+    name: str
+    compress: Callable[[bytes], bytes] = field(repr=False)
+    decompress: Callable[[Union[bytes, memoryview]], bytes] = field(repr=False)
+    """Given a bytes-like object, which may be a `memoryview` of the envelope."""
+
+
+_compressors: Dict[str, Compressor] = {}
+
+
+def register_compressor(compressor: Compressor) -> None:
+    """
+    Makes the given compressor available to settings and to workers decompressing its
+    payloads. Compressors must be registered identically wherever jobs are enqueued or
+    run.
+    """
+    if not _valid_name(compressor.name):
+        raise ValueError(f"Invalid compressor name '{compressor.name}'.")
+    elif compressor.name in _compressors:
+        raise ValueError(
+            f"A compressor named '{compressor.name}' is already registered."
+        )
+
+    _compressors[compressor.name] = compressor
+
+
+def get_compressor(name: str) -> Compressor:
+    """Returns the registered compressor with the given name."""
+    try:
+        return _compressors[name]
+    except KeyError:
+        raise ValueError(f"No compressor named '{name}' is registered.") from None
+
+
+register_compressor(Compressor("zlib", zlib.compress, zlib.decompress))
+register_compressor(Compressor("lzma", lzma.compress, lzma.decompress))
+
+
+@dataclass
+class CompressionStats:
+    """Running totals of the compression applied to a settings class' payloads."""
+
+    attempted: int = 0
+    """The number of payloads large enough to be compressed."""
+    compressed: int = 0
+    """The number of those payloads that shrank, and so were stored compressed."""
+    decompressed: int = 0
+    """The number of compressed payloads that have been decompressed."""
+    bytes_in: int = 0
+    """The total size of payloads large enough to be compressed."""
+    bytes_out: int = 0
+    """The total size at which those payloads were stored."""
+    compress_seconds: float = 0.0
+    decompress_seconds: float = 0.0
+
+    _lock: Lock = field(default_factory=Lock, init=False, repr=False, compare=False)
+
+    @property
+    def ratio(self) -> float:
+        """The ratio of the original to the stored size of all attempted payloads."""
+        return self.bytes_in / self.bytes_out if self.bytes_out else 1.0
+
+    def record_compression(self, size: int, stored: int, seconds: float) -> None:
+        with self._lock:
+            self.attempted += 1
+            self.compressed += stored < size
+            self.bytes_in += size
+            self.bytes_out += stored
+            self.compress_seconds += seconds
+
+    def record_decompression(self, seconds: float) -> None:
+        with self._lock:
+            self.decompressed += 1
+            self.decompress_seconds += seconds
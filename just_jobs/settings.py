@@ -1,16 +1,54 @@
+import asyncio
+import logging
+import multiprocessing
 import os
-from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import struct
+from contextvars import ContextVar
+from functools import partial
 from hashlib import blake2b
 from secrets import compare_digest
-from typing import Any, Dict, Tuple
+from time import perf_counter
+from types import MethodType
+from typing import (
+    Any,
+    Callable,
+    ContextManager,
+    Dict,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
+    cast,
+)
+from uuid import uuid4
 
-import dill  # type: ignore
-from colorama import Fore, Style
+from arq.connections import RedisSettings
+from arq.constants import default_queue_name
+from arq.utils import to_seconds
 
+from .autoscale import Autoscaler, Bounds
+from .blobs import BlobStore
 from .broker import Broker
-from .job_type import JobType
+from .cache import JobCache
+from .client import SyncBroker
+from .envelope import Envelope, peek, seal, unseal, verify
+from .executors import PoolStats, ProcessPool, Resources, ThreadPool, _Pool
+from .job_type import ExecutorPool, JobType
+from .jobs import _job, preload, registry
+from .log import LogListener, logger
+from .metrics import MetricsSink
+from .serialization import (
+    BlobRef,
+    Codec,
+    CompressionStats,
+    DeferredArgs,
+    JobHeader,
+    get_codec,
+    get_compressor,
+)
+from .sharding import ShardedBroker, node_name
+from .transport import SharedMemoryTransport
 from .typing import Context
-from .utils import styled_text
 
 SERIALIZATION_SECRET: bytes = os.getenv(
     "JOB_SERIALIZATION_SECRET", "thisisasecret"
@@ -19,86 +57,635 @@ SERIALIZATION_SECRET: bytes = os.getenv(
 MAX_THREAD_WORKERS = int(os.getenv("MAX_THREAD_WORKERS", 0)) or None
 MAX_PROCESS_WORKERS = int(os.getenv("MAX_PROCESS_WORKERS", 0)) or None
 
+_METADATA = ("t", "f", "et", "s", "st", "ft", "q", "id")
+"""The keys of the jobs and results arq serializes which describe, but aren't, data."""
+
+_args_blob: ContextVar[Optional[str]] = ContextVar("args_blob", default=None)
+"""The key of the offloaded arguments of the job the current task is running."""
+
+_HEADER = struct.Struct(">BIq")
+"""The flags, try count and enqueue time of a job's header, before its function name."""
+_HAS_TRY, _FINISHED, _SUCCEEDED = 0x01, 0x02, 0x04
+
+
+def _defer_args(job: Any) -> Any:
+    """
+    Packs the arguments of jobs that defer decoding them, so a worker can forward
+    them to the process running the job as-is.
+    """
+    if not isinstance(job, dict) or "a" not in job:
+        return job
+
+    args = job["a"]
+    if len(args) == 1 and isinstance(args[0], DeferredArgs):
+        # already packed, ie. when echoed into the job's result
+        return job
+
+    definition = registry.get(job["f"])
+    if not (definition and definition.packs_args):
+        return job
+
+    return {**job, "a": (DeferredArgs.pack(args, job["k"]),), "k": {}}
+
+
+def _undefer_args(job: Any, always: bool = False) -> Any:
+    """
+    Unpacks deferred job arguments, unless the job is about to be run and will decode
+    them itself.
+    """
+    if not isinstance(job, dict) or "a" not in job:
+        return job
+
+    args = job["a"]
+    if not (len(args) == 1 and isinstance(args[0], DeferredArgs)):
+        return job
+
+    definition = registry.get(job["f"])
+    if always or "r" in job or not (definition and definition.packs_args):
+        job["a"], job["k"] = args[0].load()
+
+    return job
+
+
+def _blob_digest(data: Union[bytes, memoryview]) -> bytes:
+    return blake2b(data, key=SERIALIZATION_SECRET, digest_size=32).digest()
+
+
+def _split_header(job: Any) -> Tuple[bytes, Any]:
+    """
+    Moves the function name, try count, enqueue time and outcome of a job or result
+    into a fixed-layout header, so they can be read without decoding the rest of it.
+    """
+    if not isinstance(job, dict):
+        return b"", job
+
+    function, enqueued, job_try = job.get("f"), job.get("et"), job.get("t")
+    if not (
+        isinstance(function, str)
+        and type(enqueued) is int
+        and (job_try is None or type(job_try) is int)
+        and type(job.get("s", False)) is bool
+    ):
+        return b"", job
+
+    # a try count of None is rare enough to be kept in the body
+    moved = {"f", "et"}
+    flags = 0
+    if job_try is not None:
+        flags, moved = _HAS_TRY, moved | {"t"}
+    if "s" in job:
+        flags |= _FINISHED | (_SUCCEEDED if job["s"] else 0)
+        moved.add("s")
+
+    try:
+        header = _HEADER.pack(flags, job_try or 0, enqueued)
+    except struct.error:
+        return b"", job
+
+    body = {key: value for key, value in job.items() if key not in moved}
+    return header + function.encode("utf-8"), body
+
+
+def _unpack_header(packed: bytes) -> Dict[str, Any]:
+    flags, job_try, enqueued = _HEADER.unpack_from(packed)
+    header = {"f": packed[_HEADER.size :].decode("utf-8"), "et": enqueued}
+    if flags & _HAS_TRY:
+        header["t"] = job_try
+    if flags & _FINISHED:
+        header["s"] = bool(flags & _SUCCEEDED)
+
+    return header
+
 
 class BaseSettings(type):
     """
     A metaclass for defining WorkerSettings to pass to an arq process. This enables
     using the built-in JobType and executor pool logic, as well as secure remote job
     serialization and parsing.
+
+    Classes using this metaclass may override any of its options by defining them as
+    class attributes.
+    """
+
+    shared_memory_threshold: Optional[int] = None
+    """
+    The size in bytes above which buffers passed to and returned from CPU-bound jobs
+    are transported through shared memory rather than the process pool's pipe. Disabled
+    by default. Requires Python 3.8+.
+    """
+
+    job_codec: str = "dill"
+    """
+    The name of the registered `just_jobs.serialization.Codec` with which to encode
+    jobs and their results. Workers decode payloads with whichever codec encoded them,
+    so this may be changed without draining the queue first.
+    """
+
+    job_compression: Optional[str] = None
+    """
+    The name of the registered `just_jobs.serialization.Compressor` with which to
+    compress serialized payloads, if any. Payloads that don't shrink are stored as-is.
+    """
+
+    job_compression_threshold: int = 16 * 1024
+    """The size in bytes below which serialized payloads are never compressed."""
+
+    compression_stats: CompressionStats
+    """
+    The running totals of the compression ratio and time spent (de)compressing this
+    class' payloads.
+    """
+
+    job_signature_size: int = 32
+    """
+    The size in bytes of the blake2b signature of each payload, either 32 or 64.
+    Payloads signed with a different size are rejected, so changing it invalidates any
+    already queued.
+    """
+
+    min_thread_workers: int = 1
+    """The fewest threads to which the thread pool is scaled, if autoscaling."""
+
+    max_thread_workers: Optional[int] = MAX_THREAD_WORKERS
+    """
+    The most threads the thread pool may have. Defaults to the `MAX_THREAD_WORKERS`
+    environment variable, or the same default as a `ThreadPoolExecutor`.
+    """
+
+    min_process_workers: int = 1
+    """The fewest processes to which the process pool is scaled, if autoscaling."""
+
+    max_process_workers: Optional[int] = MAX_PROCESS_WORKERS
+    """
+    The most processes the process pool may have. Defaults to the
+    `MAX_PROCESS_WORKERS` environment variable, or the number of CPUs.
+    """
+
+    executor_pools: Dict[str, ExecutorPool] = {}
+    """
+    Executors in addition to the shared thread and process pools, by name. Jobs that
+    target one by name run only in it, so they neither compete with nor starve jobs
+    running elsewhere.
+    """
+
+    worker_resources: Optional[Callable[[str], ContextManager[Dict[str, Any]]]] = None
+    """
+    A context manager factory, ie. a `contextlib.contextmanager`, that creates the
+    resources shared by the jobs running in each thread and process of the executors.
+    It's called with the name of the executor, entered once in every thread or process
+    before it runs any jobs, and exited when it stops. Synchronous jobs receive the
+    resources it yields as `ctx["resources"]`. Process pools call it in their
+    processes, so it must be importable from them.
+    """
+
+    autoscale_interval: Optional[float] = None
+    """
+    The number of seconds between each resizing of the executors to fit the worker's
+    workload, between their minimum and maximum sizes. If None, the default, the
+    executors are always allowed to grow to their maximum size.
+    """
+
+    autoscale_cooldown: float = 30.0
+    """
+    The number of seconds for which an executor's demand must stay below its size
+    before it's shrunk.
+    """
+
+    process_warmup: bool = False
+    """
+    If every process of the process pool is spawned when the worker starts, rather
+    than when CPU-bound jobs first need them. Either way, each process imports the jobs
+    in `functions` before running any, so those jobs are sent to it by name.
+    """
+
+    process_max_tasks: Optional[int] = None
+    """
+    The number of CPU-bound jobs after which a process of the process pool is replaced
+    by a fresh one. Processes are never replaced while running a job. Unlimited by
+    default.
+    """
+
+    process_max_memory: Optional[int] = None
+    """
+    The resident set size in bytes above which a process of the process pool is
+    replaced by a fresh one, once its current job completes. Unlimited by default.
+    """
+
+    cache_local_size: int = 1024
+    """
+    The most results of memoized jobs each worker keeps in memory, in front of those
+    kept in Redis. The least recently used are evicted first.
+    """
+
+    metrics_sink: Optional[MetricsSink] = None
+    """
+    The sink to which the time each job spends in each phase of its execution, its
+    outcome, and the load on the executors are reported. Nothing is measured if None,
+    the default. See `just_jobs.metrics`.
+    """
+
+    blob_store: Optional[BlobStore] = None
+    """
+    The store to which the encoded arguments and results of jobs with a
+    `blob_threshold` are offloaded once they're that large, with only a signed pointer
+    to them kept in Redis. Blobs are written while jobs are serialized, which is on
+    the event loop unless they're enqueued with `Broker.enqueue_jobs(offload=True)`
+    or a `SyncBroker`. See `just_jobs.blobs`.
+    """
+
+    blob_ttl: float = 24 * 60 * 60
+    """
+    The number of seconds for which the offloaded arguments of a queued job are kept,
+    which should be at least as long as jobs may wait to run. They're deleted sooner
+    once the job's result is written. Offloaded results are kept for as long as the
+    results themselves.
+    """
+
+    redis_shards: Sequence[RedisSettings] = ()
+    """
+    The Redis nodes across which `create_sharded_pool` shards jobs. Each node is
+    consumed by its own workers, whose settings are given by `shard_settings`.
+    """
+
+    log_level: int = logging.INFO
+    """The level of the records the `just_jobs` logger emits while the worker runs."""
+
+    log_handler: Optional[logging.Handler] = None
+    """
+    The handler to which the `just_jobs` logger's records are written, from a
+    background thread. Defaults to a `StreamHandler` on stderr.
+    """
+
+    log_styled: Optional[bool] = None
+    """
+    If records are colored by their level. By default, they're only colored when
+    written to a terminal. Ignored if the handler already has a formatter.
     """
 
     def __new__(
         cls, clsname: str, bases: Tuple[Any, ...], attrs: Dict[str, Any]
     ) -> type:
-        attrs.update(
-            {
-                "on_startup": BaseSettings.on_startup,
-                "on_shutdown": BaseSettings.on_shutdown,
-                "job_serializer": BaseSettings.job_serializer,
-                "job_deserializer": BaseSettings.job_deserializer,
-            }
-        )
-        return super().__new__(cls, clsname, bases, attrs)
+        settings = super().__new__(cls, clsname, bases, attrs)
+        get_codec(settings.job_codec)
+        if settings.job_compression:
+            get_compressor(settings.job_compression)
+        if settings.job_signature_size not in (32, 64):
+            raise ValueError("Job signatures must be either 32 or 64 bytes.")
+
+        settings.compression_stats = CompressionStats()
+        settings._check_executor_pools()
 
-    @staticmethod
-    async def on_startup(ctx: Context) -> None:
+        # arq only reads options from the class' own namespace, so the hooks that need
+        # the class' options are bound into it
+        for hook in ("on_startup", "on_shutdown", "job_serializer", "job_deserializer"):
+            setattr(settings, hook, MethodType(getattr(cls, hook), settings))
+
+        return settings
+
+    async def on_startup(cls, ctx: Context) -> None:
         """
         Starts the thread and process pool executors for downstream synchronous job
         execution.
         """
-        with styled_text(Fore.BLUE, Style.DIM):
-            print("[justjobs] Starting executors...")
+        ctx["_logging"] = LogListener(cls.log_handler, cls.log_level, cls.log_styled)
+        ctx["_logging"].start()
+        logger.info("Starting executors...")
 
         # we're ok creating pools for all the types since the executors don't
         # spin up the threads / processes unless a task is scheduled to run in one
         ctx["_executors"] = {
-            JobType.IO_BOUND: ThreadPoolExecutor(max_workers=MAX_THREAD_WORKERS),
-            JobType.CPU_BOUND: ProcessPoolExecutor(max_workers=MAX_PROCESS_WORKERS),
+            JobType.IO_BOUND: cls._thread_pool(
+                JobType.IO_BOUND.value, cls.max_thread_workers
+            ),
+            JobType.CPU_BOUND: cls._process_pool(
+                JobType.CPU_BOUND.value, cls.max_process_workers
+            ),
         }
+        for name, spec in cls.executor_pools.items():
+            ctx["_executors"][name] = (
+                cls._process_pool(name, spec.max_workers or cls.max_process_workers)
+                if spec.job_type is JobType.CPU_BOUND
+                else cls._thread_pool(name, spec.max_workers or cls.max_thread_workers)
+            )
 
-    @staticmethod
-    async def on_shutdown(ctx: Context) -> None:
+        if cls.autoscale_interval is not None:
+            ctx["_autoscaler"] = cls._autoscaler(ctx, cls.autoscale_interval)
+            ctx["_autoscaler"].start()
+
+        if cls.process_warmup:
+            loop = asyncio.get_running_loop()
+            await asyncio.gather(
+                *(
+                    loop.run_in_executor(None, executor.start)
+                    for executor in ctx["_executors"].values()
+                    if isinstance(executor, ProcessPool)
+                )
+            )
+
+        if cls.metrics_sink is not None:
+            ctx["_metrics"] = cls.metrics_sink
+            cls.metrics_sink.track(lambda: cls.executor_stats(ctx))
+
+        # batched jobs share their batches through the worker's context
+        ctx["_batches"] = {}
+        ctx["_cache"] = JobCache(
+            ctx.get("redis"),
+            cls._encode_args,
+            lambda result: cls.job_serializer({"r": result}),
+            lambda packed: cls.job_deserializer(packed)["r"],
+            cls.cache_local_size,
+        )
+
+        if cls.shared_memory_threshold is not None:
+            ctx["_transport"] = SharedMemoryTransport(cls.shared_memory_threshold)
+
+    async def on_shutdown(cls, ctx: Context) -> None:
         """
         Gracefully shuts down the available thread and process pool executors.
         """
+        if "_autoscaler" in ctx:
+            await ctx.pop("_autoscaler").stop()
+
+        if "_metrics" in ctx:
+            ctx.pop("_metrics").track(dict)
+
         for executor in ctx["_executors"].values():
             executor.shutdown(wait=True)
 
         del ctx["_executors"]
+        ctx.pop("_batches", None)
+        ctx.pop("_cache", None)
+
+        if "_transport" in ctx:
+            ctx.pop("_transport").close()
+
+        logger.info("Gracefully shutdown executors ✔")
+        if "_logging" in ctx:
+            ctx.pop("_logging").stop()
 
-        with styled_text(Fore.BLUE, Style.DIM):
-            print("[justjobs] Gracefully shutdown executors ✔")
+    def executor_stats(cls, ctx: Context) -> Dict[str, PoolStats]:
+        """
+        Returns a snapshot of the load on, and the jobs run by, each of the worker's
+        executors, by name. The shared pools are named after their `JobType`.
+        """
+        return {name: pool.stats() for name, pool in cls._named_executors(ctx).items()}
+
+    def _named_executors(cls, ctx: Context) -> Dict[str, _Pool]:
+        return {
+            key.value if isinstance(key, JobType) else key: pool
+            for key, pool in ctx["_executors"].items()
+        }
+
+    def _check_executor_pools(cls) -> None:
+        reserved = {job_type.value for job_type in JobType}
+        for name in cls.executor_pools:
+            if name in reserved:
+                raise ValueError(f"The executor pool name '{name}' is reserved.")
+
+        for function in getattr(cls, "functions", ()):
+            if not (isinstance(function, _job) and function.executor):
+                continue
 
-    @staticmethod
-    def job_serializer(job: Any) -> bytes:
+            spec = cls.executor_pools.get(function.executor)
+            if spec is None:
+                raise ValueError(
+                    f"The job '{function.name}' targets the executor pool"
+                    f" '{function.executor}', which isn't declared."
+                )
+            elif spec.job_type is not function.job_type:
+                job_type = cast(JobType, function.job_type)
+                raise ValueError(
+                    f"The job '{function.name}' is {job_type.value}, but the executor"
+                    f" pool '{function.executor}' is {spec.job_type.value}."
+                )
+
+    def _resources(cls, name: str) -> Optional[Resources]:
+        if cls.worker_resources is None:
+            return None
+
+        return partial(cls.worker_resources, name)
+
+    def _thread_pool(cls, name: str, max_workers: Optional[int]) -> ThreadPool:
+        return ThreadPool(max_workers, cls._resources(name))
+
+    def _process_pool(cls, name: str, max_workers: Optional[int]) -> ProcessPool:
+        # forked processes inherit every declared job, but others must import them,
+        # which isn't possible for those declared in the main module
+        forked = multiprocessing.get_start_method() == "fork"
+        jobs = [
+            function
+            for function in getattr(cls, "functions", ())
+            if isinstance(function, _job)
+            and (forked or function.func.__module__ != "__main__")
+        ]
+        modules = {job.func.__module__ for job in jobs} - {"__main__"}
+
+        pool = ProcessPool(
+            max_workers,
+            preload,
+            (sorted(modules),),
+            max_tasks_per_child=cls.process_max_tasks,
+            max_memory_per_child=cls.process_max_memory,
+            resources=cls._resources(name),
+        )
+        pool.preloaded = frozenset(job.name for job in jobs)
+        return pool
+
+    def _autoscaler(cls, ctx: Context, interval: float) -> Autoscaler:
+        minimums = {
+            JobType.IO_BOUND.value: cls.min_thread_workers,
+            JobType.CPU_BOUND.value: cls.min_process_workers,
+            **{name: spec.min_workers for name, spec in cls.executor_pools.items()},
+        }
+        pools = cls._named_executors(ctx)
+        return Autoscaler(
+            pools=pools,
+            bounds={
+                name: Bounds(minimums[name], pool.max_workers)
+                for name, pool in pools.items()
+            },
+            redis=ctx.get("redis"),
+            queue_name=getattr(cls, "queue_name", default_queue_name),
+            interval=interval,
+            cooldown=cls.autoscale_cooldown,
+        )
+
+    def job_serializer(cls, job: Any) -> bytes:
         """
-        Serializes the given job using dill and signs it using blake2b. The serialized
-        job and its signature are returned for later verification.
+        Serializes the given job using the configured codec, compresses it if it's large
+        enough, and signs it using blake2b. The serialized job, how it was serialized,
+        and their signature are returned for later verification.
         """
-        serialized: bytes = dill.dumps(job)
-        signer = blake2b(key=SERIALIZATION_SECRET)
-        signer.update(serialized)
-        # must be hexdigest to ensure no premature byte delimiters
-        sig = signer.hexdigest()
-        return (sig + "|").encode("utf-8") + serialized
+        header, body = _split_header(_defer_args(job))
+        codec, serialized = get_codec(cls.job_codec).encode(body)
+        if cls.blob_store is not None:
+            serialized = cls._offload(job, codec, serialized)
+            if isinstance(job, dict) and "r" in job and "f" in job:
+                cls._release_args_blob()
+
+        compressor = None
 
-    @staticmethod
-    def job_deserializer(packed: bytes) -> Any:
+        if cls.job_compression and len(serialized) >= cls.job_compression_threshold:
+            start = perf_counter()
+            compressed = get_compressor(cls.job_compression).compress(serialized)
+            stored = min(len(compressed), len(serialized))
+            cls.compression_stats.record_compression(
+                len(serialized), stored, perf_counter() - start
+            )
+
+            if len(compressed) < len(serialized):
+                compressor, serialized = cls.job_compression, compressed
+
+        return seal(
+            serialized,
+            codec.name,
+            compressor,
+            SERIALIZATION_SECRET,
+            cls.job_signature_size,
+            header,
+        )
+
+    def job_deserializer(cls, packed: bytes) -> Any:
         """
         Extracts the signature from the serialized job and compares it with the job
-        function. If the signatures match, the job is deserialized and executed. If
-        not, an error is raised.
+        function. If the signatures match, the job is decompressed and deserialized
+        by the compressor and codec that serialized it. If not, an error is raised.
         """
-        sig, serialized = packed.split(b"|", 1)
-        signer = blake2b(key=SERIALIZATION_SECRET)
-        signer.update(serialized)
+        if cls.metrics_sink is None:
+            return _undefer_args(
+                cls._decode(
+                    unseal(packed, SERIALIZATION_SECRET, cls.job_signature_size)
+                )
+            )
 
-        if not compare_digest(sig.decode("utf-8"), signer.hexdigest()):
+        start = perf_counter()
+        job = _undefer_args(
+            cls._decode(unseal(packed, SERIALIZATION_SECRET, cls.job_signature_size))
+        )
+        if isinstance(job, dict) and "f" in job:
+            cls.metrics_sink.observe(job["f"], "deserialize", perf_counter() - start)
+
+        return job
+
+    def job_header(cls, packed: bytes) -> JobHeader:
+        """
+        Verifies and decodes only the metadata of the serialized job or result, ie. its
+        function name, try count and enqueue time, for inspecting queued jobs cheaply.
+        Its arguments and result are verified and decoded when first accessed.
+        """
+        envelope = peek(packed, SERIALIZATION_SECRET, cls.job_signature_size)
+        if not envelope.metadata:
+            # legacy payloads, and those of anything but jobs, have no header, so their
+            # payload must be verified before it's decoded for one
+            job = _undefer_args(
+                cls._decode(
+                    verify(envelope, SERIALIZATION_SECRET, cls.job_signature_size)
+                ),
+                always=True,
+            )
+            metadata = {key: job[key] for key in _METADATA if key in job}
+            return JobHeader(metadata, lambda: job)
+
+        return JobHeader(
+            _unpack_header(envelope.metadata),
+            lambda: _undefer_args(
+                cls._decode(
+                    verify(envelope, SERIALIZATION_SECRET, cls.job_signature_size)
+                ),
+                always=True,
+            ),
+        )
+
+    def _encode_args(cls, args: Tuple[Any, ...], kwargs: Dict[str, Any]) -> bytes:
+        # the same bytes as the arguments of memoized jobs are packed into when they're
+        # enqueued, for jobs enqueued where they aren't declared
+        return DeferredArgs.pack(args, kwargs).data
+
+    def _decode(cls, envelope: Envelope) -> Any:
+        serialized = envelope.payload
+
+        if envelope.compressor:
+            start = perf_counter()
+            serialized = get_compressor(envelope.compressor).decompress(serialized)
+            cls.compression_stats.record_decompression(perf_counter() - start)
+
+        job = get_codec(envelope.codec).loads(serialized)
+        if isinstance(job, dict) and isinstance(job.get("b"), BlobRef):
+            ref = job["b"]
+            job = cls._load_blob(ref, envelope.codec)
+            if "r" not in job:
+                _args_blob.set(ref.key)
+
+        if envelope.metadata:
+            job.update(_unpack_header(envelope.metadata))
+
+        return job
+
+    def _offload(cls, job: Any, codec: Codec, serialized: bytes) -> bytes:
+        """
+        Writes the serialized arguments or result of a job to the blob store if the
+        job has a `blob_threshold` they reach, returning a pointer to them instead.
+        """
+        definition = registry.get(job.get("f", "")) if isinstance(job, dict) else None
+        if not (
+            definition
+            and definition.blob_threshold is not None
+            and len(serialized) >= definition.blob_threshold
+        ):
+            return serialized
+
+        if "r" not in job:
+            ttl: Optional[float] = cls.blob_ttl
+        elif definition.keep_result_forever or (
+            definition.keep_result_forever is None
+            and getattr(cls, "keep_result_forever", False)
+        ):
+            ttl = None
+        elif definition.keep_result_s is not None:
+            ttl = definition.keep_result_s
+        else:
+            ttl = to_seconds(getattr(cls, "keep_result", 3600))
+
+        ref = BlobRef(uuid4().hex, len(serialized), _blob_digest(serialized))
+        cast(BlobStore, cls.blob_store).put(ref.key, serialized, ttl)
+        return codec.dumps({"b": ref})
+
+    def _load_blob(cls, ref: BlobRef, codec: str) -> Any:
+        if cls.blob_store is None:
+            raise RuntimeError(
+                "This job's payload was offloaded to a blob store, but no blob_store is"
+                " defined on this worker class."
+            )
+
+        # verified and decoded from the same private copy, so the blob can't change in
+        # between
+        data = cls.blob_store.read(ref.key)
+        if len(data) != ref.size or not compare_digest(_blob_digest(data), ref.digest):
             raise ValueError(
-                "Invalid job signature! Has someone tampered with your job queue?"
+                "Invalid blob signature! Has someone tampered with your blob store?"
             )
 
-        return dill.loads(serialized)
+        return get_codec(codec).loads(data)
+
+    def _release_args_blob(cls) -> None:
+        """
+        Deletes the offloaded arguments of the job the current task is running once the
+        task is done, ie. once the job's result, which is being serialized, is written.
+        """
+        key = _args_blob.get()
+        try:
+            task = asyncio.current_task()
+        except RuntimeError:
+            # not on an event loop, so not in a worker
+            return
+
+        if key is None or task is None:
+            return
+
+        store = cast(BlobStore, cls.blob_store)
+        _args_blob.set(None)
+        # a job cancelled while its result is written may be run again
+        task.add_done_callback(lambda task: task.cancelled() or store.delete(key))
 
     def create_pool(cls, **kwargs: Any) -> Broker:
         """
@@ -117,5 +704,65 @@ class BaseSettings(type):
             redis_settings=cls.redis_settings,
             packj=cls.job_serializer,
             unpackj=cls.job_deserializer,
+            peekj=cls.job_header,
             kwargs=kwargs,
         )
+
+    def create_sync_pool(cls, *, chunk_size: int = 1000, **kwargs: Any) -> SyncBroker:
+        """
+        Creates a thread-safe, blocking SyncBroker for producers without an event loop,
+        using this class' RedisSettings and job serializers. Its connection pool is
+        only created when it's first used. Up to `chunk_size` jobs enqueued
+        concurrently are written in a single transaction.
+        """
+        return SyncBroker(cls.create_pool(**kwargs), chunk_size=chunk_size)
+
+    def create_sharded_pool(
+        cls, *, shard_queues: bool = False, **kwargs: Any
+    ) -> ShardedBroker:
+        """
+        Creates a ShardedBroker over the Redis nodes of `redis_shards`, using this
+        class' job serializers. Jobs are routed to nodes by their ID, or by their
+        queue's name if `shard_queues` is set. Each node's pool is only created when
+        it's first used.
+        """
+        if not cls.redis_shards:
+            raise AttributeError(
+                "You must first define some RedisSettings in redis_shards on this"
+                " worker class before trying to create a sharded pool from them."
+            )
+
+        brokers = {
+            node_name(redis_settings): Broker(
+                redis_settings=redis_settings,
+                packj=cls.job_serializer,
+                unpackj=cls.job_deserializer,
+                peekj=cls.job_header,
+                kwargs=kwargs,
+            )
+            for redis_settings in cls.redis_shards
+        }
+        if len(brokers) != len(cls.redis_shards):
+            raise ValueError("Every node of redis_shards must be unique.")
+
+        return ShardedBroker(brokers, shard_queues=shard_queues)
+
+    def shard_settings(cls, index: int) -> "BaseSettings":
+        """
+        Creates the settings of the workers that consume the node at `index` of
+        `redis_shards`, which are otherwise the same as this class'.
+        """
+        # arq only reads options from the class' own namespace, so those inherited from
+        # its bases are copied into it, most derived last
+        attrs: Dict[str, Any] = {}
+        for base in reversed(cls.__mro__[:-1]):
+            attrs.update(
+                (key, value)
+                for key, value in vars(base).items()
+                if not key.startswith("__") and not isinstance(value, MethodType)
+            )
+
+        attrs["redis_settings"] = cls.redis_shards[index]
+        return cast(
+            "BaseSettings", type(cls)(f"{cls.__name__}Shard{index}", (cls,), attrs)
+        )
@@ -0,0 +1,201 @@
+"""
+Sharding of jobs across several Redis nodes. Each job is routed to a node by consistent
+hashing of its ID, or of its queue's name, so enqueueing and dequeueing scale with the
+number of nodes, and adding or removing a node only moves the jobs that hash near it.
+Every node is consumed by its own workers, whose results are written to the node the
+job was on, where they're then looked up.
+"""
+
+import asyncio
+from bisect import bisect
+from dataclasses import dataclass, field, replace
+from hashlib import blake2b
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+from uuid import uuid4
+
+from arq.connections import ArqRedis, RedisSettings
+from arq.constants import default_queue_name
+from arq.jobs import Job
+
+from .broker import Broker, JobRequest
+from .serialization import JobHeader
+
+
+def node_name(redis_settings: RedisSettings) -> str:
+    """The name of the node, by which it's placed on the ring."""
+    return f"{redis_settings.host}:{redis_settings.port}/{redis_settings.database}"
+
+
+class HashRing:
+    """
+    Places each node at `replicas` points of a ring of 64-bit hashes, and maps a key
+    to the node at the first point after the key's hash.
+    """
+
+    def __init__(self, nodes: Sequence[str], replicas: int = 128) -> None:
+        if not nodes:
+            raise ValueError("A hash ring needs at least one node.")
+        elif len(set(nodes)) != len(nodes):
+            raise ValueError("Every node of a hash ring must be unique.")
+
+        points = sorted(
+            (_hash(f"{node}#{replica}"), node)
+            for node in nodes
+            for replica in range(replicas)
+        )
+        self._hashes = [point for point, _ in points]
+        self._nodes = [node for _, node in points]
+
+    def node(self, key: str) -> str:
+        """The node to which the key belongs."""
+        return self._nodes[bisect(self._hashes, _hash(key)) % len(self._nodes)]
+
+
+def _hash(key: str) -> int:
+    return int.from_bytes(blake2b(key.encode(), digest_size=8).digest(), "big")
+
+
+@dataclass
+class ShardedBroker:
+    """
+    A broker over several Redis nodes, each wrapped by its own `Broker`. Jobs are
+    routed by their ID, so a queue is spread across every node, or by their queue's
+    name if `shard_queues` is set, so every job of a queue is on the same node.
+
+    Job IDs are generated before jobs are routed, so enqueueing a job without one still
+    places it on a single node, and its result is looked up there.
+    """
+
+    brokers: Dict[str, Broker]
+    """The broker of each node, by its name."""
+    shard_queues: bool = False
+    replicas: int = 128
+
+    ring: HashRing = field(init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        self.ring = HashRing(list(self.brokers), self.replicas)
+
+    @property
+    def default_queue_name(self) -> str:
+        broker = next(iter(self.brokers.values()))
+        return str(broker.kwargs.get("default_queue_name", default_queue_name))
+
+    def node(self, job_id: str, queue_name: Optional[str] = None) -> str:
+        """The name of the node to which the given job belongs."""
+        key = (queue_name or self.default_queue_name) if self.shard_queues else job_id
+        return self.ring.node(key)
+
+    def route(self, job_id: str, queue_name: Optional[str] = None) -> Broker:
+        """The broker of the node to which the given job belongs."""
+        return self.brokers[self.node(job_id, queue_name)]
+
+    async def pools(self) -> Dict[str, ArqRedis]:
+        """The connection pool of each node, by its name."""
+        pools = await asyncio.gather(*(b.pool() for b in self.brokers.values()))
+        return dict(zip(self.brokers, pools))
+
+    async def enqueue_job(
+        self,
+        function: str,
+        *args: Any,
+        _job_id: Optional[str] = None,
+        _queue_name: Optional[str] = None,
+        **kwargs: Any,
+    ) -> Optional[Job]:
+        """
+        Enqueues a job on its node, with the same options as `ArqRedis.enqueue_job`.
+        """
+        job_id = _job_id or uuid4().hex
+        pool = await self.route(job_id, _queue_name).pool()
+        return await pool.enqueue_job(
+            function, *args, _job_id=job_id, _queue_name=_queue_name, **kwargs
+        )
+
+    async def enqueue_jobs(
+        self,
+        jobs: Iterable[JobRequest],
+        *,
+        queue_name: Optional[str] = None,
+        chunk_size: int = 1000,
+        offload: bool = False,
+    ) -> List[Optional[Job]]:
+        """
+        Enqueues many jobs like `Broker.enqueue_jobs`, writing those of every node
+        concurrently.
+        """
+        shards: Dict[str, List[Tuple[int, JobRequest]]] = {}
+        for index, request in enumerate(jobs):
+            if request.job_id is None:
+                request = replace(request, job_id=uuid4().hex)
+
+            node = self.node(str(request.job_id), queue_name)
+            shards.setdefault(node, []).append((index, request))
+
+        results = await asyncio.gather(
+            *(
+                self.brokers[node].enqueue_jobs(
+                    (request for _, request in requests),
+                    queue_name=queue_name,
+                    chunk_size=chunk_size,
+                    offload=offload,
+                )
+                for node, requests in shards.items()
+            )
+        )
+
+        enqueued: List[Optional[Job]] = [None] * sum(map(len, shards.values()))
+        for requests, jobs_ in zip(shards.values(), results):
+            for (index, _), job in zip(requests, jobs_):
+                enqueued[index] = job
+
+        return enqueued
+
+    async def job(self, job_id: str, *, queue_name: Optional[str] = None) -> Job:
+        """The given job, on the node to which it belongs."""
+        broker = self.route(job_id, queue_name)
+        return Job(
+            job_id,
+            redis=await broker.pool(),
+            _queue_name=queue_name or self.default_queue_name,
+            _deserializer=broker.unpackj,
+        )
+
+    async def job_header(
+        self, job_id: str, *, queue_name: Optional[str] = None
+    ) -> Optional[JobHeader]:
+        """Like `Broker.job_header`, from the node to which the job belongs."""
+        queue_name = queue_name or self.default_queue_name
+        return await self.route(job_id, queue_name).job_header(
+            job_id, queue_name=queue_name
+        )
+
+    async def queued_job_headers(
+        self, *, queue_name: Optional[str] = None
+    ) -> List[JobHeader]:
+        """
+        Like `Broker.queued_job_headers`, from every node the queue is on, in the order
+        they're due.
+        """
+        queue_name = queue_name or self.default_queue_name
+        brokers = (
+            [self.route("", queue_name)]
+            if self.shard_queues
+            else list(self.brokers.values())
+        )
+        shards = await asyncio.gather(
+            *(b.queued_job_headers(queue_name=queue_name) for b in brokers)
+        )
+        return sorted(
+            (header for headers in shards for header in headers),
+            key=lambda header: header.score or 0,
+        )
+
+    async def __aenter__(self) -> "ShardedBroker":
+        await self.pools()
+        return self
+
+    async def __aexit__(self, *_: Any) -> None:
+        await asyncio.gather(
+            *(b.__aexit__() for b in self.brokers.values() if b._pool is not None)
+        )
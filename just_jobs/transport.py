@@ -0,0 +1,222 @@
+"""
+Out-of-band transport of large buffers between a worker and its process pool.
+
+Pickle protocol 5 lets buffers be serialized separately from the rest of a pickle.
+Buffers above a size threshold are copied into shared memory segments rather than
+being written through the executor's pipe, and pool children map them instead of
+receiving a copy. Requires Python 3.8+.
+"""
+
+import asyncio
+import pickle
+import sys
+from concurrent.futures import Executor, Future
+from dataclasses import dataclass
+from io import BytesIO
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Tuple, cast
+
+import dill  # type: ignore
+
+if TYPE_CHECKING:  # pragma: no cover
+    from multiprocessing.shared_memory import SharedMemory
+
+
+@dataclass(frozen=True)
+class SharedPayload:
+    """A pickle whose large buffers live in named shared memory segments."""
+
+    pickled: bytes
+    segments: Tuple[Tuple[str, int], ...]
+    """The name and size of each out-of-band buffer, in pickle order."""
+
+
+_lingering: List["SharedMemory"] = []
+"""Segments mapped by this process that couldn't be closed yet."""
+
+
+class _Pickler(dill.Pickler):  # type: ignore
+    def __init__(
+        self, file: BytesIO, threshold: int, offload: Callable[[Any], bool]
+    ) -> None:
+        super().__init__(file, protocol=5, buffer_callback=offload)
+        self.threshold = threshold
+
+    def reducer_override(self, obj: Any) -> Any:
+        # bytes-likes are always pickled in-band, so they're explicitly wrapped
+        if type(obj) in (bytes, bytearray) and len(obj) >= self.threshold:
+            return type(obj), (pickle.PickleBuffer(obj),)
+
+        return NotImplemented
+
+
+def _dump(obj: Any, threshold: int) -> Tuple[SharedPayload, List["SharedMemory"]]:
+    from multiprocessing.shared_memory import SharedMemory
+
+    segments: List[SharedMemory] = []
+    sizes: List[int] = []
+
+    def offload(buffer: pickle.PickleBuffer) -> bool:
+        try:
+            view = buffer.raw()
+        except BufferError:
+            # non-contiguous buffers can't be copied out as-is
+            return True
+
+        if view.nbytes < threshold:
+            return True
+
+        segment = SharedMemory(create=True, size=max(view.nbytes, 1))
+        segments.append(segment)
+        cast(memoryview, segment.buf)[: view.nbytes] = view
+        sizes.append(view.nbytes)
+        return False
+
+    file = BytesIO()
+    try:
+        _Pickler(file, threshold, offload).dump(obj)
+    except BaseException:
+        _unlink(segments)
+        raise
+
+    shared = tuple((segment.name, size) for segment, size in zip(segments, sizes))
+    return SharedPayload(file.getvalue(), shared), segments
+
+
+def _load(payload: SharedPayload, copy: bool) -> Tuple[Any, List["SharedMemory"]]:
+    from multiprocessing.shared_memory import SharedMemory
+
+    segments = [SharedMemory(name) for name, _ in payload.segments]
+    buffers: List[Any] = []
+    try:
+        buffers = [
+            cast(memoryview, segment.buf)[:size]
+            for segment, (_, size) in zip(segments, payload.segments)
+        ]
+        if copy:
+            buffers = [bytearray(buffer) for buffer in buffers]
+
+        obj = dill.loads(payload.pickled, buffers=buffers)
+    except BaseException:
+        del buffers
+        _close(segments)
+        raise
+
+    del buffers
+    if copy:
+        _close(segments)
+
+    return obj, segments
+
+
+def _close(segments: List["SharedMemory"]) -> None:
+    pending = _lingering + segments
+    _lingering.clear()
+
+    for segment in pending:
+        try:
+            segment.close()
+        except BufferError:
+            # still referenced by the job's objects, so try again after the next one
+            _lingering.append(segment)
+
+
+def _unlink(segments: List["SharedMemory"]) -> None:
+    for segment in segments:
+        segment.close()
+        try:
+            segment.unlink()
+        except FileNotFoundError:
+            pass
+
+
+def _call_shared(payload: SharedPayload, threshold: int) -> SharedPayload:
+    # runs in the pool child, which maps the arguments' segments and creates the
+    # result's. the worker unlinks both once it's done with them
+    call, segments = _load(payload, copy=False)
+    try:
+        result = call()
+        del call
+        shared, created = _dump(result, threshold)
+        del result
+    finally:
+        _close(segments)
+
+    for segment in created:
+        segment.close()
+
+    return shared
+
+
+class SharedMemoryTransport:
+    """
+    Runs jobs in a process pool, passing buffers above a size threshold through shared
+    memory. Tracks the segments the worker is responsible for so they're freed when
+    their job completes or fails, and when the worker shuts down.
+    """
+
+    def __init__(self, threshold: int) -> None:
+        if sys.version_info < (3, 8):
+            raise RuntimeError(
+                "Transporting buffers through shared memory requires Python 3.8+."
+            )
+
+        self.threshold = threshold
+        self._segments: Dict[str, "SharedMemory"] = {}
+
+    async def run(self, executor: Executor, call: Callable[[], Any]) -> Any:
+        """
+        Runs the given call in the executor and returns its result. The call and its
+        result are both transported through shared memory.
+        """
+        payload, segments = _dump(call, self.threshold)
+        self._segments.update((segment.name, segment) for segment in segments)
+
+        future: "Future[SharedPayload]" = executor.submit(
+            _call_shared, payload, self.threshold
+        )
+        claimed = False
+        try:
+            shared = await asyncio.wrap_future(future)
+            # results are copied out once so their segments can be freed immediately
+            result, segments = _load(shared, copy=True)
+            claimed = True
+            _unlink(segments)
+            return result
+        finally:
+            self.release(payload)
+            if not claimed:
+                # the result's segments would otherwise outlive an abandoned job
+                future.add_done_callback(_discard)
+
+    def release(self, payload: SharedPayload) -> None:
+        """Frees the segments of a payload created by this transport."""
+        _unlink(
+            [
+                self._segments.pop(name)
+                for name, _ in payload.segments
+                if name in self._segments
+            ]
+        )
+
+    def close(self) -> None:
+        """Frees every segment still held by this transport."""
+        _unlink(list(self._segments.values()))
+        self._segments.clear()
+
+
+def _load_handles(payload: SharedPayload) -> List["SharedMemory"]:
+    from multiprocessing.shared_memory import SharedMemory
+
+    handles = []
+    for name, _ in payload.segments:
+        try:
+            handles.append(SharedMemory(name))
+        except FileNotFoundError:
+            pass
+
+    return handles
+
+
+def _discard(future: "Future[SharedPayload]") -> None:
+    if not future.cancelled() and future.exception() is None:
+        _unlink(_load_handles(future.result()))
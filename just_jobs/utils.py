@@ -1,5 +1,6 @@
 import inspect
 from contextlib import contextmanager
+from dataclasses import dataclass
 from typing import Any, Callable, Dict, Generator, Optional, Tuple
 
 from colorama import Style, just_fix_windows_console
@@ -22,6 +23,113 @@ def styled_text(*ansi_codes: str) -> Generator[None, None, None]:
         print(Style.RESET_ALL, end="", flush=True)
 
 
+@dataclass(frozen=True)
+class CallPlan:
+    """
+    A precompiled binding of ordered arguments and the arq context onto a function's
+    parameters. Compiling a plan inspects the function's signature once so that
+    binding on every call requires no introspection.
+    """
+
+    context: Optional[str]
+    """The name of the Context parameter, if the function has one."""
+    names: Tuple[str, ...]
+    """
+    The parameters that are filled in signature order, either with the context or
+    with the next ordered argument.
+    """
+    leading: Tuple[str, ...]
+    """The parameters that precede `*args`, in signature order."""
+    positional_only: int
+    """The number of leading parameters that can only be passed by position."""
+    varargs: bool
+    """If the function accepts `*args`."""
+
+    @classmethod
+    def compile(cls, func: Callable[..., Any]) -> "CallPlan":
+        """
+        Analyzes the signature of the given function. Raises an error if the function
+        defines more than one Context parameter.
+        """
+        context: Optional[str] = None
+        names = []
+        leading = []
+        positional_only = 0
+        varargs = False
+
+        for name, param in inspect.signature(func).parameters.items():
+            if param.kind is param.VAR_KEYWORD:
+                continue
+            elif param.kind is param.VAR_POSITIONAL:
+                varargs = True
+                continue
+
+            if param.annotation == Context:
+                if context:
+                    raise AttributeError(
+                        "Context should only be defined once in a job's signature."
+                    )
+
+                context = name
+            elif varargs and param.kind is param.KEYWORD_ONLY:
+                # past *args, ordered arguments are ambiguous so keyword-only
+                # parameters must be supplied by keyword
+                continue
+
+            names.append(name)
+            if param.kind is param.POSITIONAL_ONLY:
+                positional_only += 1
+            if not varargs and param.kind is not param.KEYWORD_ONLY:
+                leading.append(name)
+
+        return cls(
+            context=context,
+            names=tuple(names),
+            leading=tuple(leading),
+            positional_only=positional_only,
+            varargs=varargs,
+        )
+
+    def bind(
+        self, ctx: Optional[Context], args: Tuple[Any, ...], kwargs: Dict[str, Any]
+    ) -> Tuple[Tuple[Any, ...], Dict[str, Any]]:
+        """
+        Maps the ordered arguments onto the function's parameters and injects the
+        context, returning the arguments with which to call the function. Parameters
+        are passed by keyword unless they can only be passed by position.
+        """
+        bound = dict(kwargs)
+        consumed = 0
+        for name in self.names:
+            if name in bound:
+                continue
+            elif name == self.context:
+                bound[name] = ctx
+            elif consumed < len(args):
+                bound[name] = args[consumed]
+                consumed += 1
+
+        extra = args[consumed:]
+        if not extra and not self.positional_only:
+            return (), bound
+        elif extra and not self.varargs:
+            raise TypeError(
+                f"Got {len(extra)} more positional arguments than expected."
+            )
+
+        # when filling *args, everything before it must also be passed by position
+        ordered = []
+        for name in self.leading[
+            : len(self.leading) if extra else self.positional_only
+        ]:
+            if name not in bound:
+                break
+
+            ordered.append(bound.pop(name))
+
+        return (*ordered, *extra), bound
+
+
 def convert_kwargs(
     ctx: Optional[Context],
     func: Callable[..., Any],
@@ -32,22 +140,13 @@ def convert_kwargs(
     Given the function, convert the ordered arguments into kwargs based on the function
     signature. If the signature includes a Context parameter, inject it.
 
-    TODO: maybe restrict Context to first or last param to reduce confusion?
+    This compiles a new `CallPlan` on every invocation. Jobs compile theirs once, so
+    prefer `CallPlan.bind` when calling the same function repeatedly.
     """
-    iterargs = iter(args)
-
-    injected = False
-    for name, param in inspect.signature(func).parameters.items():
-        if name not in kwargs:
-            if param.annotation == Context:
-                if injected:
-                    raise AttributeError(
-                        "Context should only be defined once in a job's signature."
-                    )
-
-                kwargs[name] = ctx
-                injected = True
-            else:
-                kwargs[name] = next(iterargs)
+    nargs, nkwargs = CallPlan.compile(func).bind(ctx, args, kwargs)
+    if nargs:
+        raise TypeError(
+            f"{func.__qualname__} has parameters that must be passed by position."
+        )
 
-    return kwargs
+    return nkwargs
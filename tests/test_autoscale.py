@@ -0,0 +1,95 @@
+import asyncio
+import threading
+
+import pytest
+
+from just_jobs import BaseSettings
+from just_jobs.autoscale import Autoscaler, Bounds
+from just_jobs.executors import ThreadPool
+
+
+class FakeRedis:
+    def __init__(self, queued=0):
+        self.queued = queued
+
+    async def zcount(self, *_):
+        return self.queued
+
+
+@pytest.fixture
+def pools():
+    pools = {"a": ThreadPool(8), "b": ThreadPool(8)}
+    yield pools
+    for pool in pools.values():
+        pool.shutdown(wait=False)
+
+
+def autoscaler(pools, redis=None, cooldown=0.0):
+    return Autoscaler(
+        pools=pools,
+        bounds={"a": Bounds(1, 4), "b": Bounds(2, 8)},
+        redis=redis,
+        queue_name="arq:queue",
+        interval=60,
+        cooldown=cooldown,
+    )
+
+
+async def test_start(pools):
+    scaler = autoscaler(pools)
+    scaler.start()
+    await scaler.stop()
+
+    assert [pool.max_workers for pool in pools.values()] == [1, 2]
+
+
+async def test_scale_up_and_down(pools):
+    scaler = autoscaler(pools, cooldown=0.2)
+    scaler.start()
+    release = threading.Event()
+
+    futures = [pools["a"].submit(release.wait) for _ in range(6)]
+    (decision,) = await scaler.step()
+    assert (decision.pool, decision.size, decision.target) == ("a", 1, 4)
+    assert pools["a"].max_workers == 4
+
+    release.set()
+    await asyncio.wrap_future(futures[-1])
+    assert await scaler.step() == []  # still cooling down
+
+    await asyncio.sleep(0.2)
+    (decision,) = await scaler.step()
+    assert (decision.size, decision.target) == (4, 1)
+    assert list(scaler.decisions) == [scaler.decisions[0], decision]
+
+    await scaler.stop()
+
+
+async def test_queue_share(pools):
+    scaler = autoscaler(pools, FakeRedis(queued=6))
+    scaler.start()
+
+    # every recent call went to a, so all the queued jobs are expected to as well
+    await asyncio.wrap_future(pools["a"].submit(pow, 2, 3))
+    (decision,) = await scaler.step()
+    assert (decision.pool, decision.demand, decision.target) == ("a", 6, 4)
+
+    await scaler.stop()
+
+
+async def test_settings_autoscale():
+    Settings = BaseSettings(
+        "Settings",
+        (),
+        {"autoscale_interval": 60, "max_thread_workers": 3, "min_process_workers": 2},
+    )
+    ctx = {}
+
+    await Settings.on_startup(ctx)
+    scaler = ctx["_autoscaler"]
+    assert scaler.bounds["io-bound"] == Bounds(1, 3)
+    assert scaler.bounds["cpu-bound"].min == 2
+    assert [pool.max_workers for pool in ctx["_executors"].values()] == [1, 2]
+
+    await Settings.on_shutdown(ctx)
+    assert "_autoscaler" not in ctx
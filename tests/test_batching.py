@@ -0,0 +1,73 @@
+import asyncio
+
+import pytest
+
+from just_jobs.batching import BatchCall, Batcher
+
+
+def batcher(size=3, wait=0.05):
+    batches = []
+
+    async def invoke(ctx, calls):
+        batches.append((ctx, calls))
+        if any(call.args[0] == "boom" for call in calls):
+            raise RuntimeError("boom")
+
+        return [
+            ValueError(call.args[0]) if call.args[0] == "bad" else call.args[0] * 2
+            for call in calls
+        ]
+
+    return Batcher(size, wait, invoke), batches
+
+
+async def test_batch_size():
+    batch, batches = batcher()
+    ctxs = [{"job_id": str(i), "shared": True} for i in range(3)]
+
+    results = await asyncio.gather(
+        *(
+            batch.submit(ctx, BatchCall((i,), {}, ctx["job_id"]))
+            for i, ctx in enumerate(ctxs)
+        )
+    )
+
+    assert results == [0, 2, 4]
+    ((ctx, calls),) = batches
+    assert ctx == {"shared": True}
+    assert [call.job_id for call in calls] == ["0", "1", "2"]
+
+
+async def test_batch_wait():
+    batch, batches = batcher(wait=0.01)
+
+    assert await asyncio.gather(
+        *(batch.submit({}, BatchCall((i,), {})) for i in (1, 2))
+    ) == [2, 4]
+    assert [len(calls) for _, calls in batches] == [2]
+
+
+async def test_batch_errors():
+    batch, _ = batcher(size=2)
+
+    good, bad = await asyncio.gather(
+        batch.submit({}, BatchCall(("ok",), {})),
+        batch.submit({}, BatchCall(("bad",), {})),
+        return_exceptions=True,
+    )
+    assert good == "okok"
+    assert isinstance(bad, ValueError)
+
+    with pytest.raises(RuntimeError, match="boom"):
+        await asyncio.gather(
+            batch.submit({}, BatchCall(("ok",), {})),
+            batch.submit({}, BatchCall(("boom",), {})),
+        )
+
+
+async def test_batch_result_count():
+    async def invoke(ctx, calls):
+        return []
+
+    with pytest.raises(ValueError, match="returned 0 results for 1 calls"):
+        await Batcher(1, 0, invoke).submit({}, BatchCall((), {}))
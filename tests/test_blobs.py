@@ -0,0 +1,169 @@
+import os
+from time import time
+
+import pytest
+from arq.worker import Retry, create_worker
+
+from just_jobs import BaseSettings, JobType, job
+from just_jobs.blobs import BlobStore, LocalBlobStore
+
+
+@job(job_type=JobType.CPU_BOUND, blob_threshold=1024, keep_result=60)
+def blob_echo(payload: bytes) -> bytes:
+    return payload * 2
+
+
+@pytest.fixture
+def store(tmp_path):
+    return LocalBlobStore(str(tmp_path))
+
+
+@pytest.fixture
+def blob_settings(settings, store):
+    return BaseSettings(
+        "Settings",
+        (),
+        {"redis_settings": settings.redis_settings, "blob_store": store},
+    )
+
+
+def _job(*args, **kwargs):
+    return {"t": 1, "f": "blob_echo", "a": args, "k": kwargs, "et": 1690000000000}
+
+
+def test_local_blob_store(store):
+    store.put("a", b"blob", 60)
+    assert store.read("a") == b"blob"
+    with store.open("a") as f:
+        assert f.read(2) == b"bl"
+
+    store.put("empty", b"", None)
+    assert store.read("empty") == b""
+
+    store.put("expired", b"blob", -1)
+    with pytest.raises(KeyError, match="expired"):
+        store.read("expired")
+    assert store.sweep() == 1
+    assert sorted(os.listdir(store.root)) == ["a", "empty"]
+
+    store.delete("a")
+    with pytest.raises(KeyError, match="No blob"):
+        store.open("a")
+    with pytest.raises(ValueError, match="Invalid blob key"):
+        store.put("../a", b"blob", None)
+
+
+def test_local_blob_store_sweeper(tmp_path):
+    store = LocalBlobStore(str(tmp_path), sweep_interval=0)
+    store.put("a", b"blob", 60)
+    store._sweeper.join()
+    store.put("expired", b"blob", -1)
+
+    # swept in the background once the put returns
+    store._sweeper.join()
+    assert os.listdir(store.root) == ["a"]
+
+
+def test_blob_store_abstract():
+    with pytest.raises(TypeError, match="abstract"):
+        BlobStore()
+
+
+def test_offload(blob_settings, store):
+    packed = blob_settings.job_serializer(_job(b"x" * 4096))
+    assert len(packed) < 1024
+    (key,) = os.listdir(store.root)
+    # queued jobs' blobs are kept for blob_ttl
+    assert os.stat(store._path(key)).st_mtime == pytest.approx(time() + 86400, abs=5)
+
+    job = blob_settings.job_deserializer(packed)
+    assert job["a"] == (b"x" * 4096,)
+    assert blob_settings.job_header(packed).args == (b"x" * 4096,)
+
+    # payloads below the threshold, or of jobs without one, stay in Redis
+    blob_settings.job_serializer(_job(b"x"))
+    blob_settings.job_serializer({**_job(b"x" * 4096), "f": "other"})
+    assert len(os.listdir(store.root)) == 1
+
+
+def test_offload_result(blob_settings, store):
+    packed = blob_settings.job_serializer({**_job(), "s": True, "r": b"x" * 4096})
+    (key,) = os.listdir(store.root)
+    # results' blobs are kept for as long as the results
+    assert os.stat(store._path(key)).st_mtime == pytest.approx(time() + 60, abs=5)
+    assert blob_settings.job_deserializer(packed)["r"] == b"x" * 4096
+
+    expires = os.stat(store._path(key)).st_mtime
+    with open(store._path(key), "r+b") as f:
+        f.write(b"y")
+    os.utime(store._path(key), (expires, expires))
+    with pytest.raises(ValueError, match="tampered"):
+        blob_settings.job_deserializer(packed)
+
+    with pytest.raises(RuntimeError, match="blob_store"):
+        BaseSettings("Settings", (), {}).job_deserializer(packed)
+
+
+def test_blob_ref_msgpack(store):
+    pytest.importorskip("msgpack")
+    Settings = BaseSettings(
+        "Settings", (), {"blob_store": store, "job_codec": "msgpack"}
+    )
+    packed = Settings.job_serializer(_job(b"x" * 4096))
+    assert Settings.job_deserializer(packed)["a"] == [b"x" * 4096]
+
+
+async def test_offloaded_job(pool, blob_settings, store, pcapture):
+    async with blob_settings.create_pool() as blob_pool:
+        queued = await blob_pool.enqueue_job("blob_echo", b"x" * 4096)
+
+        worker = create_worker(
+            settings_cls=blob_settings,
+            functions=[blob_echo],
+            redis_pool=blob_pool,
+            burst=True,
+            poll_delay=0,
+        )
+        with pcapture:
+            await worker.main()
+            await worker.close()
+
+        # the job's arguments are deleted once its result, which has them, is written
+        assert len(os.listdir(store.root)) == 1
+        assert await queued.result(timeout=5) == b"x" * 8192
+        await pool.delete(f"arq:result:{queued.job_id}")
+
+
+_tries = []
+
+
+@job(job_type=JobType.IO_BOUND, blob_threshold=1024, keep_result=60)
+def blob_retry(payload: bytes) -> int:
+    _tries.append(payload)
+    if len(_tries) == 1:
+        raise Retry(defer=0)
+
+    return len(payload)
+
+
+async def test_offloaded_job_retried(pool, blob_settings, store, pcapture):
+    async with blob_settings.create_pool() as blob_pool:
+        queued = await blob_pool.enqueue_job("blob_retry", b"x" * 4096)
+
+        worker = create_worker(
+            settings_cls=blob_settings,
+            functions=[blob_retry],
+            redis_pool=blob_pool,
+            burst=True,
+            poll_delay=0,
+        )
+        with pcapture:
+            await worker.main()
+            await worker.close()
+
+        # kept while the job was retried, then deleted once its result was written
+        assert len(_tries) == 2
+        assert await queued.result(timeout=5) == 4096
+        (key,) = os.listdir(store.root)
+        assert os.stat(store._path(key)).st_mtime == pytest.approx(time() + 60, abs=5)
+        await pool.delete(f"arq:result:{queued.job_id}")
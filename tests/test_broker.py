@@ -3,6 +3,8 @@ from unittest.mock import MagicMock, patch
 
 import pytest
 
+from just_jobs.broker import JobRequest
+
 
 @pytest.fixture
 def mock_create_pool():
@@ -33,3 +35,57 @@ async def test_contextmanager(settings, mock_create_pool):
 
     mock_create_pool.assert_called_once()
     pool.close.assert_called()
+
+
+async def test_queued_job_headers(settings):
+    broker = settings.create_pool()
+
+    async with broker as pool:
+        jobs = [
+            await pool.enqueue_job("task", i, b"x" * 1024, _queue_name="headers")
+            for i in range(3)
+        ]
+        headers = await broker.queued_job_headers(queue_name="headers")
+
+        assert [h.job_id for h in headers] == [j.job_id for j in jobs]
+        assert all(h.function == "task" and h.job_try is None for h in headers)
+        assert [h.args[0] for h in headers] == [0, 1, 2]
+
+        header = await broker.job_header(jobs[0].job_id, queue_name="headers")
+        assert header.score == headers[0].score
+        assert await broker.job_header("missing", queue_name="headers") is None
+
+        await pool.delete("headers", *[f"arq:job:{j.job_id}" for j in jobs])
+
+
+@pytest.mark.parametrize("offload", [False, True])
+async def test_enqueue_jobs(settings, offload):
+    broker = settings.create_pool()
+
+    async with broker as pool:
+        existing = await pool.enqueue_job("task", _job_id="dup", _queue_name="bulk")
+        jobs = await broker.enqueue_jobs(
+            [
+                JobRequest("task", (0,)),
+                JobRequest("task", (1,), {"b": 2}, job_id="dup"),
+                JobRequest("task", (2,), job_id="once"),
+                JobRequest("task", (3,), job_id="once"),
+                JobRequest("task", (4,), defer_by=60),
+            ],
+            queue_name="bulk",
+            chunk_size=2,
+            offload=offload,
+        )
+
+        assert [job is None for job in jobs] == [False, True, False, True, False]
+        assert jobs[2].job_id == "once"
+
+        queued = {job.job_id: job for job in await pool.queued_jobs(queue_name="bulk")}
+        assert queued.keys() == {"dup", jobs[0].job_id, "once", jobs[4].job_id}
+        assert queued["once"].args == (2,)
+        assert queued["dup"].enqueue_time == (await existing.info()).enqueue_time
+
+        score = await pool.zscore("bulk", jobs[4].job_id)
+        assert score > await pool.zscore("bulk", "once") + 59_000
+
+        await pool.delete("bulk", *[f"arq:job:{job_id}" for job_id in queued])
@@ -0,0 +1,105 @@
+import asyncio
+
+import dill
+import pytest
+
+from just_jobs.cache import JobCache
+from just_jobs.serialization import DeferredArgs
+
+
+def cache(redis=None, local_size=2):
+    return JobCache(
+        redis,
+        lambda args, kwargs: dill.dumps((args, kwargs)),
+        dill.dumps,
+        dill.loads,
+        local_size,
+    )
+
+
+def counter():
+    calls = []
+
+    async def run():
+        calls.append(None)
+        await asyncio.sleep(0.01)
+        return len(calls)
+
+    return calls, run
+
+
+def test_key():
+    jobs = cache()
+
+    assert jobs.key("task", (1,), {}) == jobs.key("task", (1,), {})
+    assert jobs.key("task", (1,), {}) != jobs.key("task", (2,), {})
+    assert jobs.key("task", (1,), {}) != jobs.key("other", (1,), {})
+    assert jobs.key("task", (DeferredArgs(b"data"),), {}).startswith("just_jobs:cache:")
+
+
+async def test_local():
+    jobs, (calls, run) = cache(), counter()
+
+    assert await jobs.get_or_run("a", 60, run) == 1
+    assert await jobs.get_or_run("a", 60, run) == 1
+    assert (len(calls), jobs.hits, jobs.misses) == (1, 1, 1)
+
+    # expired entries are run again
+    assert await jobs.get_or_run("b", 0, run) == 2
+    assert await jobs.get_or_run("b", 0, run) == 3
+
+    # the least recently used are evicted
+    await jobs.get_or_run("a", 60, run)
+    await jobs.get_or_run("c", 60, run)
+    assert list(jobs._local) == ["a", "c"]
+
+
+async def test_inflight():
+    jobs, (calls, run) = cache(), counter()
+
+    results = await asyncio.gather(*(jobs.get_or_run("a", 60, run) for _ in range(5)))
+    assert results == [1] * 5
+    assert len(calls) == 1
+
+
+async def test_owner_cancelled():
+    jobs, (calls, run) = cache(), counter()
+
+    owner = asyncio.ensure_future(jobs.get_or_run("a", 60, run))
+    await asyncio.sleep(0)
+    waiters = [asyncio.ensure_future(jobs.get_or_run("a", 60, run)) for _ in range(3)]
+    await asyncio.sleep(0)
+    owner.cancel()
+
+    # one of the waiters runs the job instead, rather than every one being cancelled
+    assert await asyncio.gather(*waiters) == [2] * 3
+    assert owner.cancelled() and len(calls) == 2
+
+
+async def test_errors_not_cached():
+    jobs = cache()
+
+    async def fail():
+        raise ValueError("nope")
+
+    for _ in range(2):
+        with pytest.raises(ValueError, match="nope"):
+            await asyncio.gather(
+                jobs.get_or_run("a", 60, fail), jobs.get_or_run("a", 60, fail)
+            )
+
+    assert not jobs._local and not jobs._inflight
+
+
+async def test_remote(pool):
+    first, second = cache(pool), cache(pool)
+    calls, run = counter()
+    key = first.key("remote_task", ("x",), {})
+    await pool.delete(key)
+
+    assert await first.get_or_run(key, 60, run) == 1
+    assert await second.get_or_run(key, 60, run) == 1
+    assert len(calls) == 1
+    assert 0 < await pool.pttl(key) <= 60_000
+
+    await pool.delete(key)
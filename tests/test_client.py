@@ -0,0 +1,106 @@
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+import pytest
+from arq.worker import create_worker
+
+from just_jobs import job
+
+
+@job()
+async def client_add(a: int, b: int) -> int:
+    return a + b
+
+
+@pytest.fixture
+async def client(settings, pool):
+    with settings.create_sync_pool() as client:
+        yield client
+
+    job_ids = [job_id.decode() for job_id in await pool.zrange("client", 0, -1)]
+    await pool.delete(
+        "client", "arq:result:client-result", *[f"arq:job:{j}" for j in job_ids]
+    )
+
+
+async def test_enqueue_job(client):
+    job_id = client.enqueue_job("client_add", 1, 2, _job_id="dup", _queue_name="client")
+    assert job_id == "dup"
+    assert client.enqueue_job("client_add", _job_id="dup", _queue_name="client") is None
+
+    future = client.enqueue_job_future("client_add", 1, 2, _queue_name="client")
+    assert len(future.result(timeout=5)) == 32
+
+
+async def test_concurrent_enqueues(client):
+    with ThreadPoolExecutor(8) as pool:
+        futures = [
+            pool.submit(client.enqueue_job, "client_add", i, i, _queue_name="client")
+            for i in range(40)
+        ]
+        job_ids = [future.result() for future in futures]
+
+    assert len(set(job_ids)) == 40
+    # jobs enqueued while another write was in flight shared its transaction
+    assert client.writes < 40
+
+
+async def test_cancelled_enqueue(client, pool):
+    client.enqueue_job("client_add", 1, 2, _queue_name="client")
+    # holds the loop, so both jobs are written in the same transaction
+    client._loop.call_soon_threadsafe(time.sleep, 0.2)
+
+    cancelled = client.enqueue_job_future("client_add", _job_id="cancelled")
+    future = client.enqueue_job_future("client_add", 1, 2, _queue_name="client")
+    assert cancelled.cancel()
+
+    assert len(future.result(timeout=5)) == 32
+    assert cancelled.cancelled()
+    assert not await pool.exists("arq:job:cancelled")
+
+
+async def test_restarts_after_close(client):
+    assert client.enqueue_job("client_add", 1, 2, _queue_name="client")
+    client.close()
+    assert client.enqueue_job("client_add", 1, 2, _queue_name="client")
+
+
+async def test_close_while_enqueuing(client):
+    with ThreadPoolExecutor(8) as pool:
+        futures = [
+            pool.submit(
+                client.close
+                if i % 10 == 0
+                else partial(
+                    client.enqueue_job_future, "client_add", _queue_name="client"
+                )
+            )
+            for i in range(200)
+        ]
+        enqueued = [future.result() for future in futures if future.result()]
+
+    assert all(future.result(timeout=5) for future in enqueued)
+
+
+async def test_job_result(client, pool, settings, pcapture):
+    job_id = client.enqueue_job(
+        "client_add", 1, 2, _job_id="client-result", _queue_name="client"
+    )
+
+    worker = create_worker(
+        settings_cls=settings,
+        functions=[client_add],
+        redis_pool=pool,
+        queue_name="client",
+        burst=True,
+        poll_delay=0,
+    )
+    with pcapture:
+        await worker.main()
+        await worker.close()
+
+    assert client.job_result(job_id, timeout=5, queue_name="client") == 3
+    future = client.job_result_future(job_id, timeout=5, queue_name="client")
+    assert await asyncio.wrap_future(future) == 3
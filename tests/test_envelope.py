@@ -0,0 +1,90 @@
+from hashlib import blake2b
+
+import pytest
+
+from just_jobs.envelope import peek, seal, unseal, verify
+
+KEY = b"secret"
+
+
+@pytest.mark.parametrize("compressor", [None, "zlib"])
+@pytest.mark.parametrize("digest_size", [32, 64])
+def test_roundtrip(compressor, digest_size):
+    packed = seal(b"payload", "dill", compressor, KEY, digest_size, b"meta")
+    envelope = unseal(packed, KEY, digest_size)
+
+    header = 2 + 3 + 2 * digest_size + 5 + (5 if compressor else 0) + 4
+    assert len(packed) == header + len(b"meta") + len(b"payload")
+    assert (envelope.codec, envelope.compressor) == ("dill", compressor)
+    assert isinstance(envelope.payload, memoryview)
+    assert envelope.metadata == b"meta"
+    assert envelope.payload == b"payload"
+
+
+def test_peek():
+    packed = seal(b"payload", "dill", None, KEY, metadata=b"meta")
+    tampered = packed[:-1] + b"!"
+
+    # the header is verified on its own, so tampering is only noticed on verification
+    envelope = peek(tampered, KEY)
+    assert envelope.metadata == b"meta"
+    assert verify(peek(packed, KEY), KEY).payload == b"payload"
+
+    with pytest.raises(ValueError, match="Invalid job signature"):
+        verify(envelope, KEY)
+
+
+def test_tampered_metadata():
+    packed = seal(b"payload", "dill", None, KEY, metadata=b"meta")
+
+    with pytest.raises(ValueError, match="Invalid job signature"):
+        peek(packed.replace(b"meta", b"mesa"), KEY)
+
+
+def test_truncated():
+    packed = seal(b"payload", "dill", None, KEY, metadata=b"meta")
+
+    with pytest.raises(ValueError, match="Invalid job signature"):
+        peek(packed[:-12], KEY)
+
+
+@pytest.mark.parametrize("digest_size", [1, 64])
+def test_mismatched_digest_size(digest_size):
+    packed = seal(b"payload", "dill", None, KEY, digest_size)
+
+    with pytest.raises(ValueError, match="Invalid job signature"):
+        unseal(packed, KEY)
+    with pytest.raises(ValueError, match="Invalid job signature"):
+        verify(peek(packed, KEY, digest_size), KEY)
+
+
+def test_wrong_key():
+    with pytest.raises(ValueError, match="Invalid job signature"):
+        unseal(seal(b"payload", "dill", None, KEY), b"other")
+
+
+def test_tampered_header():
+    packed = bytearray(seal(b"payload", "dill", None, KEY))
+    packed[3] ^= 1
+
+    with pytest.raises(ValueError, match="Invalid job signature"):
+        unseal(bytes(packed), KEY)
+
+
+def test_unsupported_version():
+    packed = bytearray(seal(b"payload", "dill", None, KEY))
+    packed[2] = 2
+
+    with pytest.raises(ValueError, match="Unsupported job envelope version 2"):
+        unseal(bytes(packed), KEY)
+
+
+def test_legacy():
+    signer = blake2b(key=KEY)
+    signer.update(b"pickle:zlib|")
+    signer.update(b"payload")
+    packed = signer.hexdigest().encode("utf-8") + b":pickle:zlib|payload"
+    envelope = unseal(packed, KEY)
+
+    assert (envelope.codec, envelope.compressor) == ("pickle", "zlib")
+    assert envelope.payload == b"payload"
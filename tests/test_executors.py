@@ -0,0 +1,303 @@
+import os
+import sys
+import threading
+import time
+from concurrent.futures import CancelledError, as_completed, wait
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import contextmanager
+
+import pytest
+
+from just_jobs.executors import (
+    CancelToken,
+    ProcessPool,
+    ThreadPool,
+    current_resources,
+)
+
+initialized = []
+
+
+def initialize(value):
+    initialized.append(value)
+
+
+def initialized_in_child():
+    return os.getpid(), initialized
+
+
+def fail():
+    raise ValueError("mock error")
+
+
+def crash():
+    os._exit(1)
+
+
+@pytest.fixture
+def pool():
+    pool = ProcessPool(2, initialize, ("ready",))
+    yield pool
+    pool.shutdown()
+
+
+def test_submit(pool):
+    pid, values = pool.submit(initialized_in_child).result()
+
+    assert pid != os.getpid()
+    assert values == ["ready"]
+    assert pool.submit(pow, 2, exp=3).result() == 8
+
+
+def test_submit_exception(pool):
+    with pytest.raises(ValueError, match="mock error"):
+        pool.submit(fail).result()
+
+    assert pool.submit(pow, 2, 3).result() == 8
+
+
+def test_child_crash(pool):
+    with pytest.raises(BrokenProcessPool):
+        pool.submit(crash).result()
+
+    # only the crashed child is replaced
+    assert pool.submit(pow, 2, 3).result() == 8
+
+
+def test_start(pool):
+    pool.start()
+    pids = {pool.submit(initialized_in_child).result()[0] for _ in range(20)}
+
+    assert len(pool._slots) == 2
+    assert len(pids) <= 2
+
+
+def test_start_initializer_error():
+    pool = ProcessPool(1, fail)
+
+    with pytest.raises(ValueError, match="mock error"):
+        pool.start()
+
+    pool.shutdown()
+
+
+def test_shutdown(pool):
+    pool.shutdown()
+
+    with pytest.raises(RuntimeError, match="after shutdown"):
+        pool.submit(pow, 2, 3)
+
+
+def getpid():
+    return os.getpid()
+
+
+def allocate(size):
+    global allocated
+    allocated = bytearray(size)
+    return os.getpid()
+
+
+def test_max_tasks_per_child():
+    pool = ProcessPool(1, max_tasks_per_child=2)
+    pids = [pool.submit(getpid).result() for _ in range(5)]
+    pool.shutdown()
+
+    assert pids[0] == pids[1] != pids[2] == pids[3] != pids[4]
+    assert pool.recycled == 2
+
+
+@pytest.mark.skipif(not sys.platform.startswith("linux"), reason="reads /proc")
+def test_max_memory_per_child():
+    pool = ProcessPool(1, max_memory_per_child=256 << 20)
+    small = pool.submit(allocate, 1 << 20).result()
+    large = pool.submit(allocate, 512 << 20).result()
+    after = pool.submit(getpid).result()
+    pool.shutdown()
+
+    assert small == large != after
+    assert pool.recycled == 1
+
+
+def test_recycle_warm():
+    pool = ProcessPool(1, max_tasks_per_child=1)
+    pool.start()
+    pids = [pool.submit(getpid).result() for _ in range(2)]
+    pool.shutdown()
+
+    assert pids[0] != pids[1]
+    assert pool.recycled == 2
+
+
+def wait_running(future):
+    while not future.running():
+        time.sleep(0.01)
+
+
+def test_thread_pool():
+    pool = ThreadPool(2)
+
+    assert pool.submit(pow, 2, 3).result() == 8
+    with pytest.raises(ValueError, match="mock error"):
+        pool.submit(fail).result()
+
+    pool.shutdown()
+
+
+def test_thread_pool_cancel():
+    pool = ThreadPool(1)
+    token = CancelToken()
+    stuck = pool.submit(token.wait)
+    wait_running(stuck)
+
+    assert stuck.cancel()
+    assert stuck.cancelled() and stuck.done()
+    with pytest.raises(CancelledError):
+        stuck.result()
+
+    # the slot is replaced rather than waiting for the thread to notice
+    assert pool.submit(pow, 2, 3).result(timeout=1) == 8
+
+    token.cancel()
+    pool.shutdown()
+
+
+def test_process_pool_cancel(pool):
+    stuck = pool.submit(time.sleep, 60)
+    wait_running(stuck)
+    waiting = threading.Thread(target=lambda: list(as_completed([stuck], timeout=5)))
+    waiting.start()
+    cancelled = []
+    stuck.add_done_callback(cancelled.append)
+
+    assert stuck.cancel()
+    assert stuck.cancelled() and cancelled == [stuck]
+    assert wait([stuck], timeout=5).done == {stuck}
+    with pytest.raises(CancelledError):
+        stuck.result()
+    waiting.join(timeout=5)
+    assert not waiting.is_alive()
+
+    assert pool.killed == 1
+    assert pool.submit(pow, 2, 3).result(timeout=5) == 8
+
+
+def initialize_slowly():
+    time.sleep(0.5)
+
+
+def test_process_pool_cancel_spawning(tmp_path):
+    pool = ProcessPool(1, initialize_slowly)
+    marker = tmp_path / "ran"
+    spawning = pool.submit(marker.touch)
+    wait_running(spawning)
+
+    assert spawning.cancel()
+    with pytest.raises(CancelledError):
+        spawning.result()
+
+    # the call is never handed to the child once it's up
+    assert pool.submit(pow, 2, 3).result(timeout=5) == 8
+    pool.shutdown()
+    assert not marker.exists()
+
+
+def test_cancel_token():
+    token = CancelToken()
+    assert not token.wait(0)
+    token.raise_if_cancelled()
+
+    token.cancel()
+    assert token.cancelled and token.wait()
+    with pytest.raises(CancelledError):
+        token.raise_if_cancelled()
+
+
+def test_resize():
+    pool = ThreadPool(1)
+    release = threading.Event()
+    futures = [pool.submit(release.wait) for _ in range(3)]
+
+    while pool.busy < 1:
+        time.sleep(0.01)
+    assert (pool.size, pool.busy, pool.pending) == (1, 1, 2)
+
+    # waiting calls get slots right away
+    pool.resize(3)
+    while pool.busy < 3:
+        time.sleep(0.01)
+    assert (pool.size, pool.pending) == (3, 0)
+
+    release.set()
+    pool.resize(1)
+    for future in futures:
+        future.result(timeout=1)
+
+    while len(pool._slots) > 1:
+        time.sleep(0.01)
+
+    assert pool.size == 1
+    assert pool.submit(pow, 2, 3).result() == 8
+    pool.shutdown()
+
+
+def test_stats():
+    pool = ThreadPool(2)
+    release = threading.Event()
+
+    pool.submit(pow, 2, 3).result()
+    with pytest.raises(ZeroDivisionError):
+        pool.submit(divmod, 1, 0).result()
+
+    stuck = pool.submit(release.wait)
+    while not pool.busy:
+        time.sleep(0.01)
+    assert stuck.cancel()
+
+    stats = pool.stats()
+    assert (stats.submitted, stats.completed, stats.failed) == (3, 2, 1)
+    assert (stats.cancelled, stats.busy, stats.pending) == (1, 0, 0)
+
+    release.set()
+    pool.shutdown()
+
+
+opened, closed = [], []
+
+
+@contextmanager
+def resources():
+    opened.append(threading.get_ident())
+    yield {"pid": os.getpid(), "thread": threading.get_ident()}
+    closed.append(threading.get_ident())
+
+
+def read_resources():
+    return current_resources()
+
+
+def test_thread_pool_resources():
+    pool = ThreadPool(2, resources)
+    release = threading.Event()
+
+    futures = [pool.submit(lambda: (release.wait(), read_resources())) for _ in "ab"]
+    release.set()
+    threads = {future.result()[1]["thread"] for future in futures}
+    assert len(threads) == 2
+    assert sorted(opened) == sorted(threads)
+
+    # each thread's resources are reused by its later calls
+    assert pool.submit(read_resources).result()["thread"] in threads
+
+    pool.shutdown()
+    assert sorted(closed) == sorted(threads)
+
+
+def test_process_pool_resources():
+    pool = ProcessPool(1, resources=resources)
+
+    first, second = (pool.submit(read_resources).result() for _ in range(2))
+    assert first == second
+    assert first["pid"] != os.getpid()
+
+    pool.shutdown()
@@ -1,11 +1,17 @@
 import asyncio
+import threading
+import time
+from contextlib import contextmanager
 from multiprocessing import current_process
 from os import getpid
 from threading import get_ident
+from typing import List
 
 import pytest
+from arq.worker import create_worker
 
-from just_jobs import Context, JobType, job
+from just_jobs import BaseSettings, BatchCall, Context, ExecutorPool, JobType, job
+from just_jobs.serialization import DeferredArgs
 
 
 @job()
@@ -37,6 +43,17 @@ def async_cpu_task(ctx: Context, val: str):
     return asyncio.run(task) if ctx else task
 
 
+@job(job_type=JobType.CPU_BOUND)
+async def coroutine_cpu_task(val: str):
+    await asyncio.sleep(0)
+    return f"{getpid()}{val}{get_ident()}"
+
+
+@job(job_type=JobType.CPU_BOUND, defer_args=True)
+def deferred_cpu_task(val: str, ctx: Context):
+    return f"{current_process().pid}{val}{get_ident()}"
+
+
 @pytest.mark.parametrize("func", [async_task, cpu_task, io_task, async_cpu_task])
 async def test_invoke_now(func):
     with pytest.deprecated_call():
@@ -44,7 +61,7 @@ async def test_invoke_now(func):
         assert res == f"{getpid()} on {get_ident()}"
 
 
-@pytest.mark.parametrize("func", [async_task, async_cpu_task])
+@pytest.mark.parametrize("func", [async_task, async_cpu_task, coroutine_cpu_task])
 async def test_invoke_async_now(func):
     res = await func(" on ")
     assert res == f"{getpid()} on {get_ident()}"
@@ -77,7 +94,9 @@ async def test_enqueue_job_io(enqueue_run_job):
     assert thread != str(get_ident())
 
 
-@pytest.mark.parametrize("func", [cpu_task, async_cpu_task])
+@pytest.mark.parametrize(
+    "func", [cpu_task, async_cpu_task, coroutine_cpu_task, deferred_cpu_task]
+)
 async def test_enqueue_job_cpu(func, enqueue_run_job):
     # test cpu is on different process
     job = await enqueue_run_job(func, " on ")
@@ -87,8 +106,359 @@ async def test_enqueue_job_cpu(func, enqueue_run_job):
     # assert thread != str(get_ident())
 
 
+def test_async_io_warning():
+    with pytest.warns(UserWarning, match="does not affect"):
+        job(job_type=JobType.IO_BOUND)(async_task.func)
+
+
+@job(job_type=JobType.CPU_BOUND)
+async def event_loop_task():
+    return getpid(), id(asyncio.get_running_loop())
+
+
+async def test_cpu_coroutine_event_loop(settings):
+    ctx = {}
+    await settings.on_startup(ctx)
+    try:
+        first, second = [await event_loop_task.run(ctx) for _ in range(2)]
+        assert first[0] != getpid()
+        # the process keeps its event loop between jobs
+        assert first == second
+    finally:
+        await settings.on_shutdown(ctx)
+
+
+def test_defer_args_not_cpu():
+    with pytest.raises(TypeError, match="Only CPU-bound"):
+        job(job_type=JobType.IO_BOUND, defer_args=True)(lambda: None)
+
+
 async def test_enqueue_job_fail(enqueue_run_job):
     job = await enqueue_run_job(failing_task)
 
     with pytest.raises(Exception, match="mock"):
         await job.result(poll_delay=0)
+
+
+@job(job_type=JobType.IO_BOUND)
+def io_identity_task(val: object):
+    return val
+
+
+async def test_io_job_skips_serialization(settings, pcapture):
+    # threads share the worker's memory, so arguments should not be copied
+    ctx, val = {}, object()
+
+    with pcapture:
+        await settings.on_startup(ctx)
+        res = await io_identity_task.run(ctx, val)
+        await settings.on_shutdown(ctx)
+
+    assert res is val
+
+
+async def test_cpu_job_preloaded():
+    Settings = BaseSettings(
+        "Settings", (), {"functions": [cpu_task], "process_warmup": True}
+    )
+    ctx = {}
+
+    await Settings.on_startup(ctx)
+    try:
+        pool = ctx["_executors"][JobType.CPU_BOUND]
+        assert pool.preloaded == {"cpu_task"}
+        assert len(pool._slots) == pool.max_workers
+
+        res = await cpu_task.run(ctx, " on ")
+        assert int(res.split(" on ")[0]) != getpid()
+    finally:
+        await Settings.on_shutdown(ctx)
+
+
+io_cancelled = threading.Event()
+
+
+@job(job_type=JobType.IO_BOUND)
+def cancellable_io_task(ctx: Context):
+    if ctx["cancel_token"].wait(5):
+        io_cancelled.set()
+
+
+@job(job_type=JobType.CPU_BOUND)
+def stuck_cpu_task():
+    time.sleep(60)
+
+
+async def test_io_job_timeout(settings):
+    ctx = {}
+    await settings.on_startup(ctx)
+    try:
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(cancellable_io_task.run(ctx), 0.1)
+
+        assert io_cancelled.wait(1)
+    finally:
+        await settings.on_shutdown(ctx)
+
+
+async def test_cpu_job_timeout(settings):
+    ctx = {}
+    await settings.on_startup(ctx)
+    try:
+        with pytest.raises(asyncio.TimeoutError):
+            await asyncio.wait_for(stuck_cpu_task.run(ctx), 0.5)
+
+        assert ctx["_executors"][JobType.CPU_BOUND].killed == 1
+        assert await cpu_task.run(ctx, " on ")
+    finally:
+        await settings.on_shutdown(ctx)
+
+
+@job(job_type=JobType.CPU_BOUND, executor="cpu-heavy")
+def heavy_cpu_task(val: str):
+    return f"{current_process().pid}{val}{get_ident()}"
+
+
+@job(job_type=JobType.IO_BOUND, executor="io-db")
+def db_io_task(ctx: Context, val: str):
+    return f"{val}{get_ident()}"
+
+
+def test_executor_async():
+    with pytest.raises(TypeError, match="can't target an executor pool"):
+        job(executor="io-db")(async_task.func)
+
+
+async def test_executor_pools():
+    Settings = BaseSettings(
+        "Settings",
+        (),
+        {
+            "functions": [cpu_task, heavy_cpu_task, db_io_task],
+            "executor_pools": {
+                "cpu-heavy": ExecutorPool(JobType.CPU_BOUND, max_workers=1),
+                "io-db": ExecutorPool(JobType.IO_BOUND, max_workers=2),
+            },
+        },
+    )
+    ctx = {}
+
+    await Settings.on_startup(ctx)
+    try:
+        assert await heavy_cpu_task.run(ctx, " on ")
+        assert await db_io_task.run(ctx, " on ")
+
+        stats = Settings.executor_stats(ctx)
+        assert stats.keys() == {"io-bound", "cpu-bound", "cpu-heavy", "io-db"}
+        assert (stats["cpu-heavy"].max_workers, stats["cpu-heavy"].completed) == (1, 1)
+        assert (stats["io-db"].max_workers, stats["io-db"].completed) == (2, 1)
+        assert stats["cpu-bound"].submitted == stats["io-bound"].submitted == 0
+    finally:
+        await Settings.on_shutdown(ctx)
+
+
+@contextmanager
+def executor_resources(executor: str):
+    yield {"executor": executor, "pid": getpid()}
+
+
+@job(job_type=JobType.IO_BOUND)
+def io_resources_task(ctx: Context):
+    return ctx["resources"]
+
+
+@job(job_type=JobType.CPU_BOUND)
+def cpu_resources_task(ctx: Context):
+    return ctx["resources"]
+
+
+async def test_worker_resources():
+    Settings = BaseSettings(
+        "Settings",
+        (),
+        {
+            "functions": [io_resources_task, cpu_resources_task],
+            "worker_resources": executor_resources,
+        },
+    )
+    ctx = {}
+
+    await Settings.on_startup(ctx)
+    try:
+        io = await io_resources_task.run(ctx)
+        assert io == {"executor": "io-bound", "pid": getpid()}
+
+        cpu = await cpu_resources_task.run(ctx)
+        assert cpu["executor"] == "cpu-bound"
+        assert cpu["pid"] != getpid()
+        assert await cpu_resources_task.run(ctx) == cpu
+    finally:
+        await Settings.on_shutdown(ctx)
+
+
+@job(job_type=JobType.IO_BOUND)
+def io_square(val: int, ctx: Context, offset: int = 0):
+    if val == 13:
+        raise ValueError("unlucky")
+
+    return val * val + offset
+
+
+@job(job_type=JobType.CPU_BOUND)
+def cpu_square(val: int):
+    return val * val
+
+
+@job()
+async def async_square(val: int):
+    await asyncio.sleep(0.01 * (val % 3))
+    return val * val
+
+
+@pytest.fixture
+async def map_worker(pool, settings, pcapture):
+    worker = create_worker(
+        settings_cls=settings,
+        functions=[io_square, cpu_square, async_square],
+        redis_pool=pool,
+        poll_delay=0.01,
+    )
+    with pcapture:
+        task = asyncio.ensure_future(worker.main())
+        yield
+        task.cancel()
+        await worker.close()
+
+
+@pytest.mark.parametrize("func", [io_square, cpu_square, async_square])
+async def test_map(func, settings, map_worker):
+    broker = settings.create_pool()
+    async with broker:
+        results = func.map(
+            broker, range(10), chunksize=3, max_in_flight=2, poll_delay=0
+        )
+        assert [result async for result in results] == [i * i for i in range(10)]
+
+
+async def test_map_unordered(settings, map_worker):
+    broker = settings.create_pool()
+    async with broker:
+        results = async_square.map(broker, range(12), ordered=False, poll_delay=0)
+        assert sorted([r async for r in results]) == [i * i for i in range(12)]
+
+
+async def test_map_error(settings, map_worker):
+    broker = settings.create_pool()
+    async with broker:
+        results = io_square.map(
+            broker, range(10, 20), chunksize=5, offset=1, poll_delay=0
+        )
+        assert [await results.__anext__() for _ in range(3)] == [101, 122, 145]
+        with pytest.raises(ValueError, match="unlucky"):
+            await results.__anext__()
+
+
+@pytest.mark.parametrize(
+    "options,match",
+    [
+        ({"chunksize": 0}, "chunks of at least 1 item"),
+        ({"max_in_flight": 0}, "at least 1 chunk in flight"),
+    ],
+)
+async def test_map_invalid(options, match):
+    # raised before the broker is ever used
+    results = io_square.map(None, range(10), **options)
+    with pytest.raises(ValueError, match=match):
+        await results.__anext__()
+
+
+batched = []
+
+
+@job(job_type=JobType.IO_BOUND, batch_size=5, batch_wait=0.5)
+def batched_task(ctx: Context, calls: List[BatchCall]):
+    batched.append(len(calls))
+    return [
+        ValueError("odd") if call.args[0] % 2 else call.args[0] + call.kwargs["add"]
+        for call in calls
+    ]
+
+
+def test_batch_options():
+    with pytest.raises(ValueError, match="at least 1"):
+        job(job_type=JobType.IO_BOUND, batch_size=0)(io_task.func)
+    with pytest.raises(TypeError, match="can't defer"):
+        job(job_type=JobType.CPU_BOUND, batch_size=2, defer_args=True)(cpu_task.func)
+
+
+async def test_enqueue_job_batched(pool, settings, pcapture):
+    jobs = [await pool.enqueue_job("batched_task", i, add=10) for i in range(5)]
+
+    worker = create_worker(
+        settings_cls=settings,
+        functions=[batched_task],
+        redis_pool=pool,
+        burst=True,
+        poll_delay=0,
+    )
+    with pcapture:
+        await worker.main()
+        await worker.close()
+
+    assert batched == [5]
+    assert await jobs[0].result(poll_delay=0) == 10
+    assert await jobs[4].result(poll_delay=0) == 14
+    with pytest.raises(ValueError, match="odd"):
+        await jobs[1].result(poll_delay=0)
+
+
+memoized = []
+
+
+@job(job_type=JobType.IO_BOUND, cache_ttl=60)
+def memoized_task(val: int):
+    memoized.append(val)
+    return val * 2
+
+
+async def test_memoized_job(settings, pool):
+    ctx = {"redis": pool}
+    await settings.on_startup(ctx)
+    try:
+        key = ctx["_cache"].key("memoized_task", (21,), {})
+        await pool.delete(key)
+
+        assert [await memoized_task.run(ctx, 21) for _ in range(3)] == [42] * 3
+        assert memoized == [21]
+
+        # other workers share results through redis
+        ctx["_cache"]._local.clear()
+        assert await memoized_task.run(ctx, 21) == 42
+        assert memoized == [21]
+        await pool.delete(key)
+    finally:
+        await settings.on_shutdown(ctx)
+
+
+async def test_memoized_job_packed(settings, pool):
+    ctx = {"redis": pool}
+    await settings.on_startup(ctx)
+    try:
+        key = ctx["_cache"].key("memoized_task", (4,), {})
+        await pool.delete(key)
+
+        # enqueued with its arguments packed, which are hashed without encoding them
+        packed = settings.job_serializer(
+            {"t": 1, "f": "memoized_task", "a": (4,), "k": {}, "et": 0}
+        )
+        (args,) = settings.job_deserializer(packed)["a"]
+        assert isinstance(args, DeferredArgs)
+
+        ctx["_cache"].encode_args = None
+        assert ctx["_cache"].key("memoized_task", (args,), {}) == key
+        assert await memoized_task.run(ctx, args) == 8
+        assert await memoized_task.run(ctx, args) == 8
+        assert memoized[-1:] == [4] and memoized.count(4) == 1
+        await pool.delete(key)
+    finally:
+        await settings.on_shutdown(ctx)
@@ -0,0 +1,64 @@
+import logging
+from io import StringIO
+
+from colorama import Fore, Style
+
+from just_jobs.log import LogListener, logger
+
+
+def test_listener():
+    stream = StringIO()
+    listener = LogListener(logging.StreamHandler(stream), logging.DEBUG)
+
+    listener.start()
+    logger.debug("hello")
+    listener.stop()
+    logger.debug("goodbye")
+
+    assert stream.getvalue() == "[justjobs] hello\n"
+
+
+def test_listener_styled():
+    stream = StringIO()
+    listener = LogListener(logging.StreamHandler(stream), styled=True)
+
+    listener.start()
+    logger.warning("careful")
+    listener.stop()
+
+    assert stream.getvalue() == f"{Fore.YELLOW}[justjobs] careful{Style.RESET_ALL}\n"
+
+
+def test_listener_formatter():
+    stream = StringIO()
+    handler = logging.StreamHandler(stream)
+    handler.setFormatter(logging.Formatter("%(levelname)s %(message)s"))
+    listener = LogListener(handler, styled=True)
+
+    listener.start()
+    logger.info("kept")
+    listener.stop()
+
+    assert stream.getvalue() == "INFO kept\n"
+
+
+def test_listener_isolated():
+    root, stream = StringIO(), StringIO()
+    root_handler = logging.StreamHandler(root)
+    logging.getLogger().addHandler(root_handler)
+    listener = LogListener(logging.StreamHandler(stream), logging.DEBUG)
+
+    try:
+        logger.setLevel(logging.WARNING)
+        listener.start()
+        logger.info("once")
+        listener.stop()
+        restored = (logger.level, logger.propagate)
+    finally:
+        logging.getLogger().removeHandler(root_handler)
+        logger.setLevel(logging.NOTSET)
+
+    # only written by the listener, and the logger is left as it was
+    assert stream.getvalue() == "[justjobs] once\n"
+    assert root.getvalue() == ""
+    assert restored == (logging.WARNING, True)
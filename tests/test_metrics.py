@@ -0,0 +1,84 @@
+from arq.worker import create_worker
+
+from just_jobs import BaseSettings, JobType, job
+from just_jobs.metrics import Histogram, PrometheusSink
+
+
+@job(job_type=JobType.IO_BOUND)
+def io_metered():
+    return 1
+
+
+@job(job_type=JobType.CPU_BOUND)
+def cpu_metered():
+    return 2
+
+
+@job()
+async def async_metered():
+    raise ValueError("failed")
+
+
+def test_histogram():
+    histogram = Histogram((0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 5):
+        histogram.observe(value)
+
+    assert histogram.counts == [2, 1, 1]
+    assert histogram.cumulative() == [2, 3, 4]
+    assert (histogram.sum, histogram.count) == (5.65, 4)
+
+
+def test_prometheus():
+    sink = PrometheusSink(buckets=(0.1, 1.0))
+    sink.observe('a "job"', "execute", 0.5)
+    sink.count('a "job"', "success")
+    sink.count('a "job"', "success")
+
+    rendered = sink.render()
+    labels = 'job="a \\"job\\"",phase="execute"'
+    assert f'just_jobs_job_phase_seconds_bucket{{{labels},le="0.1"}} 0' in rendered
+    assert f'just_jobs_job_phase_seconds_bucket{{{labels},le="1.0"}} 1' in rendered
+    assert f'just_jobs_job_phase_seconds_bucket{{{labels},le="+Inf"}} 1' in rendered
+    assert f"just_jobs_job_phase_seconds_count{{{labels}}} 1" in rendered
+    assert 'just_jobs_jobs_total{job="a \\"job\\"",outcome="success"} 2' in rendered
+    assert "# TYPE just_jobs_executor_busy gauge" in rendered
+
+
+async def test_worker_metrics(pool, settings, pcapture):
+    sink = PrometheusSink()
+    Settings = BaseSettings(
+        "Settings",
+        (),
+        {"redis_settings": settings.redis_settings, "metrics_sink": sink},
+    )
+    for name in ("io_metered", "cpu_metered", "async_metered"):
+        await pool.enqueue_job(name)
+
+    worker = create_worker(
+        settings_cls=Settings,
+        functions=[io_metered, cpu_metered, async_metered],
+        redis_pool=pool,
+        burst=True,
+        poll_delay=0,
+        job_serializer=Settings.job_serializer,
+        job_deserializer=Settings.job_deserializer,
+    )
+    with pcapture:
+        await worker.main()
+        assert 'just_jobs_executor_size{executor="io-bound"}' in sink.render()
+        await worker.close()
+
+    phases = {key: h.count for key, h in sink.histograms.items()}
+    assert phases[("io_metered", "queue")] == phases[("io_metered", "execute")] == 1
+    assert phases[("cpu_metered", "serialize")] == 1
+    assert phases[("async_metered", "execute")] == 1
+    assert all(phases[(name, "deserialize")] for name in ("io_metered", "cpu_metered"))
+    assert sink.counters == {
+        ("io_metered", "success"): 1,
+        ("cpu_metered", "success"): 1,
+        ("async_metered", "failure"): 1,
+    }
+
+    # the executors are no longer tracked once the worker stops
+    assert sink.executors() == {}
@@ -0,0 +1,50 @@
+import pytest
+
+from just_jobs.serialization import (
+    Codec,
+    Compressor,
+    get_codec,
+    get_compressor,
+    register_codec,
+    register_compressor,
+)
+
+
+def _failing_dumps(obj):
+    raise TypeError("mock error")
+
+
+def test_register_codec():
+    codec = Codec("test-codec", repr, eval)
+    register_codec(codec)
+    assert get_codec("test-codec") is codec
+
+    with pytest.raises(ValueError, match="already registered"):
+        register_codec(codec)
+
+
+@pytest.mark.parametrize("name", ["", "bad|name", "bad:name"])
+def test_register_codec_invalid(name):
+    with pytest.raises(ValueError, match="Invalid codec name"):
+        register_codec(Codec(name, repr, eval))
+
+
+def test_codec_fallback():
+    codec = Codec("test-fallback", _failing_dumps, eval, fallback="pickle")
+    used, _ = codec.encode({"a": 1})
+    assert used is get_codec("pickle")
+
+    with pytest.raises(TypeError, match="mock error"):
+        Codec("test-nofallback", _failing_dumps, eval).encode({"a": 1})
+
+
+def test_register_compressor():
+    compressor = Compressor("test-compressor", bytes, bytes)
+    register_compressor(compressor)
+    assert get_compressor("test-compressor") is compressor
+
+    with pytest.raises(ValueError, match="already registered"):
+        register_compressor(compressor)
+
+    with pytest.raises(ValueError, match="Invalid compressor name"):
+        register_compressor(Compressor("bad|name", bytes, bytes))
@@ -1,9 +1,22 @@
+import logging
+import os
 from concurrent.futures import Executor
+from hashlib import blake2b
+from io import StringIO
 
+import dill
 import pytest
 
-from just_jobs import BaseSettings
+from just_jobs import BaseSettings, ExecutorPool, JobType, job
 from just_jobs.broker import Broker
+from just_jobs.envelope import seal, unseal
+from just_jobs.serialization import DeferredArgs, MapChunk
+from just_jobs.settings import SERIALIZATION_SECRET
+
+
+@job(job_type=JobType.CPU_BOUND, defer_args=True)
+def deferred_task(a: int, b: int):
+    return a + b
 
 
 def test_serialization(settings):
@@ -19,25 +32,268 @@ def test_serialization_bad_signature(settings):
     payload = {"function": print, "args": set("hello world")}
 
     serialized = settings.job_serializer(payload)
-    payloadb = serialized.split(b"|", 1)[1]
-    tampered = b"invalidsignature|" + payloadb
+    tampered = serialized[:-1] + bytes((serialized[-1] ^ 1,))
 
     with pytest.raises(ValueError, match="Invalid job signature"):
         settings.job_deserializer(tampered)
 
 
-async def test_lifecycle(settings, pcapture):
+def test_serialization_deferred(settings):
+    payload = {"f": "deferred_task", "a": (1,), "k": {"b": 2}}
+
+    deserialized = settings.job_deserializer(settings.job_serializer(payload))
+    (deferred,) = deserialized["a"]
+    assert isinstance(deferred, DeferredArgs)
+    assert deferred.load() == ((1,), {"b": 2})
+
+    # results echo the deferred arguments, but are always decoded
+    result = settings.job_serializer({**deserialized, "r": 3})
+    assert settings.job_deserializer(result) == {**payload, "r": 3}
+
+
+@pytest.mark.parametrize("codec", ["dill", "pickle", "pickle-dill", "msgpack"])
+def test_serialization_codecs(codec):
+    if codec == "msgpack":
+        pytest.importorskip("msgpack")
+
+    Settings = BaseSettings("Settings", (), {"job_codec": codec})
+    payload = {"t": 1, "f": "task", "a": [1, "two"], "k": {"three": 3.0}, "et": 0}
+
+    serialized = Settings.job_serializer(payload)
+    assert unseal(serialized, SERIALIZATION_SECRET).codec == codec
+    assert Settings.job_deserializer(serialized) == payload
+
+    mapped = {**payload, "a": [MapChunk([1, [2, 3]])]}
+    assert Settings.job_deserializer(Settings.job_serializer(mapped)) == mapped
+
+
+def test_serialization_mixed_codecs(settings):
+    payload = {"function": print, "args": set("hello world")}
+    Settings = BaseSettings("Settings", (), {"job_codec": "pickle-dill"})
+
+    # print can be pickled, but lambdas fall back to dill
+    serialized = Settings.job_serializer(payload)
+    fallback = Settings.job_serializer({**payload, "function": lambda: None})
+    assert unseal(serialized, SERIALIZATION_SECRET).codec == "pickle-dill"
+    assert unseal(fallback, SERIALIZATION_SECRET).codec == "dill"
+
+    assert settings.job_deserializer(serialized) == payload
+    assert settings.job_deserializer(fallback)["args"] == payload["args"]
+
+
+def test_serialization_legacy(settings):
+    # before codecs were recorded, payloads were always signed dill
+    serialized = dill.dumps({"args": set("hello world")})
+    signer = blake2b(key=SERIALIZATION_SECRET)
+    signer.update(serialized)
+    legacy = (signer.hexdigest() + "|").encode("utf-8") + serialized
+
+    assert settings.job_deserializer(legacy) == {"args": set("hello world")}
+
+    with pytest.raises(ValueError, match="Invalid job signature"):
+        settings.job_deserializer(b"invalidsignature|" + serialized)
+
+
+def test_job_header(settings):
+    payload = {"t": 2, "f": "task", "a": (b"x" * 1024,), "k": {}, "et": 1690000000000}
+    serialized = settings.job_serializer(payload)
+    tampered = serialized[:-1] + bytes((serialized[-1] ^ 1,))
+
+    header = settings.job_header(tampered)
+    assert (header.function, header.job_try) == ("task", 2)
+    assert header.enqueue_time.timestamp() == 1690000000
+    assert not header.finished
+
+    with pytest.raises(ValueError, match="Invalid job signature"):
+        header.args
+
+    header = settings.job_header(serialized)
+    assert header.args == payload["a"]
+    assert header.load() == payload
+
+
+@pytest.mark.parametrize(
+    "payload",
+    [
+        {"t": None, "f": "task", "a": (), "k": {}, "et": 0},
+        {"t": 1, "f": "task", "a": (), "k": {}, "r": None, "s": False, "et": 5},
+        # can't be packed into the header, so it's kept in the payload
+        {"t": 1.5, "f": "task", "a": (), "k": {}, "et": "now"},
+    ],
+)
+def test_job_header_roundtrip(settings, payload):
+    serialized = settings.job_serializer(payload)
+    header = settings.job_header(serialized)
+
+    assert settings.job_deserializer(serialized) == payload
+    assert header.job_try == payload["t"]
+    assert header.success is payload.get("s")
+
+
+def test_job_header_deferred(settings):
+    payload = {"t": 1, "f": "deferred_task", "a": (1,), "k": {"b": 2}, "et": 0}
+    header = settings.job_header(settings.job_serializer(payload))
+
+    assert (header.args, header.kwargs) == ((1,), {"b": 2})
+
+
+def test_job_header_legacy(settings):
+    serialized = dill.dumps({"t": 1, "f": "task", "a": (), "k": {}, "et": 0})
+    signer = blake2b(key=SERIALIZATION_SECRET)
+    signer.update(serialized)
+    legacy = (signer.hexdigest() + "|").encode("utf-8") + serialized
+
+    header = settings.job_header(legacy)
+    assert (header.function, header.job_try, header.args) == ("task", 1, ())
+
+
+_exploited = []
+
+
+class _Exploit:
+    def __reduce__(self):
+        return (_exploited.append, (True,))
+
+
+def test_job_header_tampered(settings):
+    # the payloads of results and cache entries have no header to inspect instead
+    serialized = settings.job_serializer({"r": 42})
+    envelope = unseal(serialized, SERIALIZATION_SECRET)
+    assert not envelope.metadata
+
+    tampered = serialized[: -len(envelope.payload)] + dill.dumps(_Exploit())
+    with pytest.raises(ValueError, match="Invalid job signature"):
+        settings.job_header(tampered)
+    assert not _exploited
+
+
+def test_serialization_codec_tampered(settings):
+    serialized = settings.job_serializer({"args": (1, 2)})
+
+    with pytest.raises(ValueError, match="Invalid job signature"):
+        settings.job_deserializer(serialized.replace(b"\x04dill", b"\x04pkl_", 1))
+
+
+@pytest.mark.parametrize("compressor", ["zlib", "lzma"])
+def test_serialization_compression(compressor):
+    Settings = BaseSettings(
+        "Settings",
+        (),
+        {"job_compression": compressor, "job_compression_threshold": 1024},
+    )
+    small, large = {"args": b"x" * 16}, {"args": b"x" * 4096}
+    random = {"args": os.urandom(4096)}
+
+    serialized = [Settings.job_serializer(p) for p in (small, large, random)]
+    envelopes = [unseal(s, SERIALIZATION_SECRET) for s in serialized]
+    assert [e.compressor for e in envelopes] == [None, compressor, None]
+    assert len(serialized[1]) < 4096
+
+    for payload, packed in zip((small, large, random), serialized):
+        assert Settings.job_deserializer(packed) == payload
+
+    stats = Settings.compression_stats
+    assert (stats.attempted, stats.compressed, stats.decompressed) == (2, 1, 1)
+    assert stats.ratio > 1
+    assert stats.compress_seconds > 0
+
+
+def test_serialization_compression_tampered():
+    Settings = BaseSettings(
+        "Settings", (), {"job_compression": "zlib", "job_compression_threshold": 0}
+    )
+    serialized = Settings.job_serializer({"args": b"x" * 4096})
+
+    with pytest.raises(ValueError, match="Invalid job signature"):
+        Settings.job_deserializer(serialized.replace(b"\x04zlib", b"\x04lzma", 1))
+
+
+def test_unknown_compressor():
+    with pytest.raises(ValueError, match="No compressor named"):
+        BaseSettings("Settings", (), {"job_compression": "unknown"})
+
+
+@pytest.mark.parametrize("size", [32, 64])
+def test_signature_size(size):
+    Settings = BaseSettings("Settings", (), {"job_signature_size": size})
+    serialized = Settings.job_serializer({"args": (1, 2)})
+
+    assert serialized[4] == size
+    assert Settings.job_deserializer(serialized) == {"args": (1, 2)}
+
+
+@pytest.mark.parametrize("size", [1, 64])
+def test_mismatched_signature_size(size):
+    # signed with the right key, though a short digest could be guessed without it
+    forged = seal(
+        dill.dumps({"args": (1, 2)}), "dill", None, SERIALIZATION_SECRET, size
+    )
+
+    with pytest.raises(ValueError, match="Invalid job signature"):
+        BaseSettings("Settings", (), {}).job_deserializer(forged)
+    with pytest.raises(ValueError, match="Invalid job signature"):
+        BaseSettings("Settings", (), {}).job_header(forged)
+
+
+def test_invalid_signature_size():
+    with pytest.raises(ValueError, match="either 32 or 64 bytes"):
+        BaseSettings("Settings", (), {"job_signature_size": 16})
+
+
+def test_unknown_codec():
+    with pytest.raises(ValueError, match="No codec named"):
+        BaseSettings("Settings", (), {"job_codec": "unknown"})
+
+
+@job(job_type=JobType.IO_BOUND, executor="io-db")
+def db_task():
+    pass
+
+
+@pytest.mark.parametrize(
+    "pools,match",
+    [
+        ({"io-bound": ExecutorPool(JobType.IO_BOUND)}, "is reserved"),
+        ({}, "isn't declared"),
+        ({"io-db": ExecutorPool(JobType.CPU_BOUND)}, "is io-bound, but"),
+    ],
+)
+def test_invalid_executor_pools(pools, match):
+    with pytest.raises(ValueError, match=match):
+        BaseSettings("Settings", (), {"functions": [db_task], "executor_pools": pools})
+
+
+async def test_lifecycle(settings, caplog):
     context = {}
 
-    with pcapture as target:
+    with caplog.at_level(logging.INFO, logger="just_jobs"):
         await settings.on_startup(context)
         assert "_executors" in context
         assert all([isinstance(v, Executor) for v in context["_executors"].values()])
 
         await settings.on_shutdown(context)
         assert "_executors" not in context
+        assert "_logging" not in context
+
+    # records are only written by the worker's own handler, not propagated to the root
+    assert caplog.records == []
+
+
+async def test_lifecycle_log_handler():
+    stream = StringIO()
+    Settings = BaseSettings(
+        "Settings", (), {"log_handler": logging.StreamHandler(stream)}
+    )
+
+    context = {}
+    await Settings.on_startup(context)
+    await Settings.on_shutdown(context)
 
-    assert target.getvalue().count("[justjobs]") == 2
+    # the stream isn't a terminal, so records aren't styled
+    assert stream.getvalue() == (
+        "[justjobs] Starting executors...\n"
+        "[justjobs] Gracefully shutdown executors ✔\n"
+    )
 
 
 def test_create_pool(settings):
@@ -0,0 +1,140 @@
+from collections import Counter
+from contextlib import redirect_stdout
+from io import StringIO
+
+import pytest
+from arq.connections import RedisSettings
+from arq.constants import default_queue_name, result_key_prefix
+from arq.worker import create_worker
+
+from just_jobs import BaseSettings, job
+from just_jobs.broker import JobRequest
+from just_jobs.sharding import HashRing
+
+
+@job()
+async def sharded_double(x: int) -> int:
+    return x * 2
+
+
+@pytest.fixture(scope="module")
+def sharded_settings(settings):
+    host = settings.redis_settings.host
+    return BaseSettings(
+        "Settings",
+        (),
+        {
+            "functions": [sharded_double],
+            "redis_shards": [
+                RedisSettings(host=host, database=1),
+                RedisSettings(host=host, database=2),
+            ],
+        },
+    )
+
+
+def test_hash_ring():
+    keys = [str(i) for i in range(3000)]
+    ring = HashRing(["a", "b", "c"])
+    placed = {key: ring.node(key) for key in keys}
+    assert all(800 < n < 1200 for n in Counter(placed.values()).values())
+
+    # adding a node only moves the keys that now belong to it
+    grown = HashRing(["a", "b", "c", "d"])
+    moved = [key for key in keys if grown.node(key) != placed[key]]
+    assert all(grown.node(key) == "d" for key in moved)
+    assert 500 < len(moved) < 1000
+
+    with pytest.raises(ValueError, match="at least one"):
+        HashRing([])
+    with pytest.raises(ValueError, match="unique"):
+        HashRing(["a", "a"])
+
+
+def test_shard_settings(sharded_settings):
+    shard = sharded_settings.shard_settings(1)
+    assert shard.redis_settings.database == 2
+    assert shard.functions == [sharded_double]
+    assert shard.job_serializer.__self__ is shard
+
+    with pytest.raises(AttributeError, match="redis_shards"):
+        BaseSettings("Settings", (), {}).create_sharded_pool()
+
+
+def test_shard_settings_inherited(sharded_settings):
+    class Base(metaclass=BaseSettings):
+        queue_name = "inherited"
+        functions = [sharded_double]
+
+    class Settings(Base):
+        redis_shards = sharded_settings.redis_shards
+
+    # arq only reads the class' own options, so inherited ones must be among them
+    shard = Settings.shard_settings(0)
+    assert vars(shard)["queue_name"] == "inherited"
+    assert vars(shard)["functions"] == [sharded_double]
+    assert vars(shard)["redis_settings"].database == 1
+    assert issubclass(shard, Settings)
+
+
+def test_shard_settings_metaclass(sharded_settings):
+    class CustomSettings(BaseSettings):
+        def job_serializer(cls, job):
+            return b"custom" + super().job_serializer(job)
+
+    class Settings(metaclass=CustomSettings):
+        redis_shards = sharded_settings.redis_shards
+
+    # the shard's hooks are bound from the class' own metaclass
+    shard = Settings.shard_settings(1)
+    assert type(shard) is CustomSettings
+    assert shard.job_serializer({}).startswith(b"custom")
+
+
+async def test_sharded_broker(sharded_settings):
+    async with sharded_settings.create_sharded_pool() as broker:
+        jobs = await broker.enqueue_jobs(
+            JobRequest("sharded_double", (i,)) for i in range(20)
+        )
+        jobs.append(await broker.enqueue_job("sharded_double", 20, _job_id="single"))
+        assert await broker.enqueue_job("sharded_double", 20, _job_id="single") is None
+
+        pools = await broker.pools()
+        for job in jobs:
+            node = broker.node(job.job_id)
+            assert await pools[node].exists(f"arq:job:{job.job_id}")
+
+        headers = await broker.queued_job_headers()
+        assert len(headers) == 21
+        # both nodes got a share of the queue
+        assert all([await pool.zcard(default_queue_name) for pool in pools.values()])
+
+        for index in range(2):
+            worker = create_worker(
+                sharded_settings.shard_settings(index), burst=True, poll_delay=0
+            )
+            with redirect_stdout(StringIO()):
+                await worker.main()
+                await worker.close()
+
+        for i, job in enumerate(jobs):
+            assert await (await broker.job(job.job_id)).result(timeout=5) == i * 2
+        header = await broker.job_header("single")
+        assert header.function == "sharded_double"
+
+        for node, pool in pools.items():
+            results = [j.job_id for j in jobs if broker.node(j.job_id) == node]
+            await pool.delete(*[result_key_prefix + job_id for job_id in results])
+
+
+async def test_shard_queues(sharded_settings):
+    async with sharded_settings.create_sharded_pool(shard_queues=True) as broker:
+        jobs = await broker.enqueue_jobs(
+            (JobRequest("sharded_double", (i,)) for i in range(10)), queue_name="q"
+        )
+        pools = await broker.pools()
+        node = broker.node("", "q")
+        assert await pools[node].zcard("q") == 10
+        assert len(await broker.queued_job_headers(queue_name="q")) == 10
+
+        await pools[node].delete("q", *[f"arq:job:{job.job_id}" for job in jobs])
@@ -0,0 +1,72 @@
+import os
+import sys
+
+import pytest
+
+from just_jobs import BaseSettings, JobType, job
+
+pytestmark = pytest.mark.skipif(
+    sys.version_info < (3, 8), reason="shared memory requires Python 3.8+"
+)
+
+
+class SharedSettings(metaclass=BaseSettings):
+    shared_memory_threshold = 1024
+
+
+@job(job_type=JobType.CPU_BOUND)
+def reverse_task(blob: bytes, small: bytes):
+    return bytearray(blob[::-1]), small
+
+
+@job(job_type=JobType.CPU_BOUND)
+def failing_cpu_task(blob: bytes):
+    raise ValueError(f"mock error {len(blob)}")
+
+
+@job(job_type=JobType.CPU_BOUND, defer_args=True)
+def deferred_len_task(blob: bytes):
+    return len(blob)
+
+
+def segments():
+    return set(os.listdir("/dev/shm")) if os.path.isdir("/dev/shm") else set()
+
+
+@pytest.fixture
+async def ctx(pcapture):
+    context = {}
+
+    with pcapture:
+        await SharedSettings.on_startup(context)
+        yield context
+        await SharedSettings.on_shutdown(context)
+
+
+async def test_shared_roundtrip(ctx):
+    before = segments()
+    blob = os.urandom(1 << 20)
+
+    res = await reverse_task.run(ctx, blob, b"small")
+
+    assert res == (bytearray(blob[::-1]), b"small")
+    assert segments() == before
+
+
+async def test_shared_failure(ctx):
+    before = segments()
+
+    with pytest.raises(ValueError, match="mock error 4096"):
+        await failing_cpu_task.run(ctx, b"x" * 4096)
+
+    assert segments() == before
+
+
+async def test_shared_deferred(ctx):
+    deferred = SharedSettings.job_deserializer(
+        SharedSettings.job_serializer(
+            {"f": "deferred_len_task", "a": (b"x" * 4096,), "k": {}}
+        )
+    )
+
+    assert await deferred_len_task.run(ctx, *deferred["a"]) == 4096
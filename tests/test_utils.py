@@ -2,7 +2,7 @@ import pytest
 from colorama import Fore, Style
 
 from just_jobs import Context
-from just_jobs.utils import convert_kwargs, styled_text
+from just_jobs.utils import CallPlan, convert_kwargs, styled_text
 
 
 def test_styled_text(pcapture):
@@ -67,3 +67,30 @@ def test_convert_kwargs_multictx():
 
     with pytest.raises(AttributeError, match="Context should only"):
         convert_kwargs({}, f6, (0, 1), {"z": 2})
+
+
+def f7(ctx: Context, x: int, *rest: int, y: int = 0, **extra: int):
+    return ctx, x, rest, y, extra
+
+
+@pytest.mark.parametrize(
+    "func,args,kwargs,expected",
+    [
+        (f0, (0, 1), {}, ((), {"x": 0, "y": 1})),
+        (f5, (0, 1), {"z": 2}, ((), {"x": 0, "ctx": {}, "y": 1, "z": 2})),
+        (f7, (0,), {"w": 3}, ((), {"ctx": {}, "x": 0, "w": 3})),
+        (f7, (0, 1, 2), {"y": 3}, (({}, 0, 1, 2), {"y": 3})),
+    ],
+    ids=["defaults", "context", "varkw", "varargs"],
+)
+def test_call_plan(func, args, kwargs, expected):
+    plan = CallPlan.compile(func)
+    assert plan.bind({}, args, kwargs) == expected
+
+    nargs, nkwargs = expected
+    func(*nargs, **nkwargs)
+
+
+def test_call_plan_too_many_args():
+    with pytest.raises(TypeError, match="more positional arguments"):
+        CallPlan.compile(f1).bind({}, (0, 1, 2), {})